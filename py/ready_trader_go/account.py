@@ -15,11 +15,20 @@
 #     You should have received a copy of the GNU Affero General Public
 #     License along with Ready Trader Go.  If not, see
 #     <https://www.gnu.org/licenses/>.
+from typing import Tuple
+
 from .types import Instrument, Side
 
 
+# The fields of a CompetitorAccount which change during a match
+ACCOUNT_FIELDS: Tuple[str, ...] = ("account_balance", "buy_volume", "etf_position", "future_position", "max_drawdown",
+                                   "max_profit", "profit_or_loss", "sell_volume", "total_fees")
+
+
 class CompetitorAccount(object):
     """A competitors account."""
+    __slots__ = ("account_balance", "buy_volume", "etf_clamp", "etf_position", "future_position", "max_drawdown",
+                 "max_profit", "profit_or_loss", "sell_volume", "tick_size", "total_fees")
 
     def __init__(self, tick_size: float, etf_clamp: float):
         """Initialise a new instance of the CompetitorAccount class."""
@@ -35,6 +44,25 @@ class CompetitorAccount(object):
         self.tick_size: int = int(tick_size * 100.0)
         self.total_fees: int = 0
 
+    def clamp_etf_price(self, future_price: int, etf_price: int) -> int:
+        """Return the ETF price clamped to within the ETF clamp of the future price, as used to value positions."""
+        delta: int = round(self.etf_clamp * future_price)
+        delta -= delta % self.tick_size
+        min_price: int = future_price - delta
+        max_price: int = future_price + delta
+        return min_price if etf_price < min_price else max_price if etf_price > max_price else etf_price
+
+    def flatten(self, future_price: int, etf_price: int) -> None:
+        """Close both positions at the given prices, moving their value into the account balance.
+
+        The ETF position is valued at the clamped ETF price, so the profit or
+        loss at these prices is unchanged.
+        """
+        self.account_balance += (self.future_position * future_price
+                                 + self.etf_position * self.clamp_etf_price(future_price, etf_price))
+        self.etf_position = 0
+        self.future_position = 0
+
     def transact(self, instrument: Instrument, side: Side, price: float, volume: int, fee: int) -> None:
         """Update this account with the specified transaction."""
         if side == Side.SELL:
@@ -60,11 +88,7 @@ class CompetitorAccount(object):
 
     def update(self, future_price: int, etf_price: int) -> None:
         """Update this account using the specified prices."""
-        delta: int = round(self.etf_clamp * future_price)
-        delta -= delta % self.tick_size
-        min_price: int = future_price - delta
-        max_price: int = future_price + delta
-        clamped: int = min_price if etf_price < min_price else max_price if etf_price > max_price else etf_price
+        clamped: int = self.clamp_etf_price(future_price, etf_price)
         self.profit_or_loss = self.account_balance + self.future_position * future_price + self.etf_position * clamped
         if self.profit_or_loss > self.max_profit:
             self.max_profit = self.profit_or_loss
@@ -0,0 +1,125 @@
+# Copyright 2021 Optiver Asia Pacific Pty. Ltd.
+#
+# This file is part of Ready Trader Go.
+#
+#     Ready Trader Go is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU Affero General Public License
+#     as published by the Free Software Foundation, either version 3 of
+#     the License, or (at your option) any later version.
+#
+#     Ready Trader Go is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public
+#     License along with Ready Trader Go.  If not, see
+#     <https://www.gnu.org/licenses/>.
+import operator
+
+from typing import List, Union
+
+import numpy as np
+
+from .account import AccountFactory, CompetitorAccount
+
+
+INITIAL_CAPACITY: int = 16
+
+# Integer columns, copied from the accounts' own fields before each update. The profit or loss columns are
+# floating point because an account may be updated with a midpoint price that is a half tick (see
+# Competitor.on_hedge_message); they still hold whole numbers exactly.
+COLUMNS = ("account_balance", "etf_position", "future_position")
+PROFIT_COLUMNS = ("max_drawdown", "max_profit", "profit_or_loss")
+
+
+def profit_or_loss(account_balances: np.ndarray, etf_positions: np.ndarray, future_positions: np.ndarray,
+                   etf_prices: np.ndarray, future_prices: np.ndarray, etf_clamp: float,
+                   tick_size: float) -> np.ndarray:
+    """Return the profit or loss of any number of accounts at once.
+
+    This is a vectorised form of CompetitorAccount.update: the ETF price is
+    clamped to within etf_clamp of the future price (rounded down to a whole
+    number of ticks) and positions are valued at the resulting prices. All
+    amounts are integers in cents and the arguments are broadcast together.
+    """
+    tick: int = int(tick_size * 100.0)
+    delta: np.ndarray = np.rint(etf_clamp * np.asarray(future_prices)).astype(np.int64)
+    delta -= delta % tick
+    clamped: np.ndarray = np.clip(etf_prices, future_prices - delta, future_prices + delta)
+    return account_balances + future_positions * future_prices + etf_positions * clamped
+
+
+def _profit_column(name: str) -> property:
+    """Return a property for a profit or loss field held in a column of the account store."""
+    def getter(account: "StoredAccount") -> Union[int, float]:
+        value: float = float(getattr(account.store, name)[account.index])
+        return int(value) if value.is_integer() else value
+
+    def setter(account: "StoredAccount", value: Union[int, float]) -> None:
+        getattr(account.store, name)[account.index] = value
+
+    return property(getter, setter)
+
+
+class StoredAccount(CompetitorAccount):
+    """A competitor's account whose profit or loss fields are held in a row of an AccountStore.
+
+    Individual transactions and updates behave exactly as they do for a
+    CompetitorAccount. The fields changed by each fill stay Python ints, so
+    transactions are as fast as for a CompetitorAccount, and are copied into
+    the store's columns when it updates every account.
+    """
+    __slots__ = ("index", "store")
+
+    def __init__(self, store: "AccountStore", index: int, tick_size: float, etf_clamp: float):
+        """Initialise a new instance of the StoredAccount class."""
+        self.index: int = index
+        self.store: AccountStore = store
+        super().__init__(tick_size, etf_clamp)
+
+    max_drawdown = _profit_column("max_drawdown")
+    max_profit = _profit_column("max_profit")
+    profit_or_loss = _profit_column("profit_or_loss")
+
+
+class AccountStore(AccountFactory):
+    """A factory for competitor accounts that keeps them in columns of NumPy arrays.
+
+    Copying every account's balance and positions into one array per field
+    allows the profit or loss of all accounts to be updated in a single
+    vectorised pass.
+    """
+
+    def __init__(self, etf_clamp: float, tick_size: float):
+        """Initialise a new instance of the AccountStore class."""
+        super().__init__(etf_clamp, tick_size)
+        self.accounts: List[StoredAccount] = list()
+        self.count: int = 0
+        for name in COLUMNS:
+            setattr(self, name, np.zeros(INITIAL_CAPACITY, np.int64))
+        for name in PROFIT_COLUMNS:
+            setattr(self, name, np.zeros(INITIAL_CAPACITY, np.float64))
+
+    def create(self) -> StoredAccount:
+        """Return a new account held in this store."""
+        if self.count == len(self.account_balance):
+            for name in COLUMNS + PROFIT_COLUMNS:
+                column: np.ndarray = getattr(self, name)
+                setattr(self, name, np.concatenate((column, np.zeros_like(column))))
+        account = StoredAccount(self, self.count, self.tick_size, self.etf_clamp)
+        self.accounts.append(account)
+        self.count += 1
+        return account
+
+    def update(self, future_price: int, etf_price: int) -> None:
+        """Update every account in this store using the specified prices."""
+        n: int = self.count
+        for name in COLUMNS:
+            getattr(self, name)[:n] = np.fromiter(map(operator.attrgetter(name), self.accounts), np.int64, n)
+        pnl: np.ndarray = profit_or_loss(self.account_balance[:n], self.etf_position[:n], self.future_position[:n],
+                                         etf_price, future_price, self.etf_clamp, self.tick_size)
+        self.profit_or_loss[:n] = pnl
+        max_profit: np.ndarray = self.max_profit[:n]
+        np.maximum(max_profit, pnl, out=max_profit)
+        np.maximum(self.max_drawdown[:n], max_profit - pnl, out=self.max_drawdown[:n])
@@ -0,0 +1,257 @@
+# Copyright 2021 Optiver Asia Pacific Pty. Ltd.
+#
+# This file is part of Ready Trader Go.
+#
+#     Ready Trader Go is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU Affero General Public License
+#     as published by the Free Software Foundation, either version 3 of
+#     the License, or (at your option) any later version.
+#
+#     Ready Trader Go is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public
+#     License along with Ready Trader Go.  If not, see
+#     <https://www.gnu.org/licenses/>.
+import asyncio
+import json
+import logging
+import math
+import pathlib
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .account import AccountFactory
+from .account_store import profit_or_loss
+from .match_events import MatchEvent, MatchEventOperation
+from .messages import (AMEND_EVENT_MESSAGE, AMEND_EVENT_MESSAGE_SIZE, CANCEL_EVENT_MESSAGE, CANCEL_EVENT_MESSAGE_SIZE,
+                       HEDGE_EVENT_MESSAGE, HEDGE_EVENT_MESSAGE_SIZE, INSERT_EVENT_MESSAGE, INSERT_EVENT_MESSAGE_SIZE,
+                       LOGIN_EVENT_MESSAGE, LOGIN_EVENT_MESSAGE_SIZE, RESYNC_EVENT_MESSAGE_SIZE, TRADE_EVENT_MESSAGE,
+                       TRADE_EVENT_MESSAGE_SIZE, Connection, MessageType)
+from .replay import MatchState, iter_rows
+from .types import Instrument
+
+
+DEFAULT_ETF_CLAMP: float = 0.002
+DEFAULT_TICK_SIZE: float = 0.01
+TICK_INTERVAL: float = 0.5  # seconds of match time between samples, as shown by the heads-up display
+
+TRADE_DTYPE = np.dtype([("time", "f8"), ("team", "i4"), ("order_id", "i8"), ("side", "i1"), ("volume", "i8"),
+                        ("price", "i8"), ("fee", "i8")])
+
+
+def read_instrument_config(path: pathlib.Path = pathlib.Path("exchange.json")) -> Tuple[float, float]:
+    """Return the ETF clamp and tick size from an exchange configuration file, or the defaults if there is none."""
+    if not path.exists():
+        return DEFAULT_ETF_CLAMP, DEFAULT_TICK_SIZE
+    with path.open("r") as config_file:
+        instrument = json.load(config_file)["Instrument"]
+    return instrument["EtfClamp"], instrument["TickSize"]
+
+
+class MatchSeries:
+    """The series derived from the events of a match, sampled every TICK_INTERVAL seconds.
+
+    Series with a team dimension have one row per team (in the order of the
+    teams attribute) and one column per sample. Prices and amounts are in
+    cents. Midpoint prices are NaN while an order book is one-sided and
+    profit or loss is zero until both instruments have traded.
+    """
+
+    def __init__(self, teams: List[str], times: np.ndarray, midpoint_prices: np.ndarray,
+                 last_traded_prices: np.ndarray, account_balances: np.ndarray, etf_positions: np.ndarray,
+                 future_positions: np.ndarray, total_fees: np.ndarray, active_order_counts: np.ndarray,
+                 trades: np.ndarray, etf_clamp: float, tick_size: float):
+        """Initialise a new instance of the MatchSeries class."""
+        self.account_balances: np.ndarray = account_balances
+        self.active_order_counts: np.ndarray = active_order_counts
+        self.etf_positions: np.ndarray = etf_positions
+        self.future_positions: np.ndarray = future_positions
+        self.last_traded_prices: np.ndarray = last_traded_prices
+        self.midpoint_prices: np.ndarray = midpoint_prices
+        self.teams: List[str] = teams
+        self.times: np.ndarray = times
+        self.total_fees: np.ndarray = total_fees
+        self.trades: np.ndarray = trades
+
+        # Accounts are only updated once there is a traded price for both instruments
+        self.priced: np.ndarray = (last_traded_prices >= 0).all(axis=0)
+        future_prices: np.ndarray = np.where(self.priced, last_traded_prices[Instrument.FUTURE], 0)
+        etf_prices: np.ndarray = np.where(self.priced, last_traded_prices[Instrument.ETF], 0)
+        self.profit_or_loss: np.ndarray = np.where(
+            self.priced, profit_or_loss(account_balances, etf_positions, future_positions, etf_prices, future_prices,
+                                        etf_clamp, tick_size), 0)
+        self.max_profit: np.ndarray = np.maximum.accumulate(np.maximum(self.profit_or_loss, 0), axis=1)
+        self.max_drawdown: np.ndarray = np.maximum.accumulate(self.max_profit - self.profit_or_loss, axis=1)
+
+    def save(self, filename: pathlib.Path) -> None:
+        """Store these series in a NumPy .npz file."""
+        np.savez_compressed(filename, teams=np.array(self.teams), times=self.times,
+                            midpoint_prices=self.midpoint_prices, last_traded_prices=self.last_traded_prices,
+                            account_balances=self.account_balances, etf_positions=self.etf_positions,
+                            future_positions=self.future_positions, total_fees=self.total_fees,
+                            active_order_counts=self.active_order_counts, trades=self.trades,
+                            profit_or_loss=self.profit_or_loss, max_profit=self.max_profit,
+                            max_drawdown=self.max_drawdown)
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        """Return the final metrics of each team."""
+        last: int = len(self.times) - 1
+        trade_counts: np.ndarray = np.bincount(self.trades["team"], minlength=len(self.teams))
+        traded_volumes: np.ndarray = np.bincount(self.trades["team"], self.trades["volume"], len(self.teams))
+        return {team: {"ProfitOrLoss": int(self.profit_or_loss[i, last]) if last >= 0 else 0,
+                       "MaxDrawdown": int(self.max_drawdown[i, last]) if last >= 0 else 0,
+                       "TotalFees": int(self.total_fees[i, last]) if last >= 0 else 0,
+                       "TradeCount": int(trade_counts[i]),
+                       "TradedVolume": int(traded_volumes[i])}
+                for i, team in enumerate(self.teams)}
+
+
+class MatchAnalyser:
+    """Derives the series shown by the heads-up display from the rows of a match events file.
+
+    Rows are given to add_row in the order they occur; finish returns the
+    resulting MatchSeries.
+    """
+
+    def __init__(self, etf_clamp: float, tick_size: float, tick_interval: float = TICK_INTERVAL):
+        """Initialise a new instance of the MatchAnalyser class."""
+        self.etf_clamp: float = etf_clamp
+        self.state: MatchState = MatchState(AccountFactory(etf_clamp, tick_size))
+        self.tick_interval: float = tick_interval
+        self.tick_size: float = tick_size
+
+        self.__next_tick: float = tick_interval
+        self.__now: float = 0.0
+        self.__teams: Dict[str, int] = dict()
+
+        # One entry per sample
+        self.__accounts: List[List[Tuple[int, int, int, int, int]]] = list()
+        self.__last_traded_prices: List[Tuple[int, ...]] = list()
+        self.__midpoint_prices: List[Tuple[float, ...]] = list()
+        self.__times: List[float] = list()
+
+        self.__trades: List[Tuple[float, int, int, int, int, int, int]] = list()
+
+    def __sample(self, now: float) -> None:
+        """Record the state of the match at the given time."""
+        state: MatchState = self.state
+        self.__times.append(now)
+        self.__midpoint_prices.append(tuple(math.nan if p is None else p
+                                            for p in (book.midpoint_price() for book in state.books)))
+        self.__last_traded_prices.append(tuple(-1 if p is None else p for p in state.last_traded_prices))
+        accounts = state.accounts
+        self.__accounts.append([(accounts[team].account_balance, accounts[team].etf_position,
+                                 accounts[team].future_position, accounts[team].total_fees,
+                                 sum(1 for _ in state.active_orders(team)))
+                                for team in self.__teams])
+
+    def add_row(self, row: List[str]) -> None:
+        """Apply a row of a match events file, sampling the state at any ticks that occur before it."""
+        tm: float = float(row[0])
+        while tm > self.__next_tick:
+            self.__sample(self.__next_tick)
+            self.__next_tick += self.tick_interval
+        self.__now = tm
+
+        team: str = row[1]
+        if team and team not in self.__teams:
+            self.__teams[team] = len(self.__teams)
+
+        event = self.state.apply(row)
+        if event is not None and event[0] == MatchEventOperation.TRADE:
+            team, tm, order_id, side, volume, price, fee = event[1]
+            self.__trades.append((tm, self.__teams[team], order_id, side, volume, price, fee))
+
+    def add_rows(self, rows: Iterable[List[str]]) -> None:
+        """Apply each of the given rows of a match events file."""
+        for row in rows:
+            self.add_row(row)
+
+    def finish(self) -> MatchSeries:
+        """Sample the state at the time of the last row and return the series for the match."""
+        if not self.__times or self.__times[-1] < self.__now:
+            self.__sample(self.__now)
+
+        team_count: int = len(self.__teams)
+        sample_count: int = len(self.__times)
+        accounts: np.ndarray = np.zeros((5, team_count, sample_count), np.int64)
+        for i, sample in enumerate(self.__accounts):
+            if sample:
+                accounts[:, :len(sample), i] = np.array(sample, np.int64).T
+
+        return MatchSeries(list(self.__teams), np.array(self.__times), np.array(self.__midpoint_prices).T,
+                           np.array(self.__last_traded_prices, np.int64).T, accounts[0], accounts[1], accounts[2],
+                           accounts[3], accounts[4], np.array(self.__trades, TRADE_DTYPE), self.etf_clamp,
+                           self.tick_size)
+
+
+class HudAnalysisConnection(Connection):
+    """A connection to the heads-up display port of an exchange simulator that feeds a MatchAnalyser."""
+
+    def __init__(self, analyser: MatchAnalyser):
+        """Initialise a new instance of the HudAnalysisConnection class."""
+        super().__init__()
+        self.analyser: MatchAnalyser = analyser
+        self.closed: asyncio.Future = asyncio.get_event_loop().create_future()
+        self.__logger = logging.getLogger("ANALYTICS")
+        self.__teams: Dict[int, str] = {0: ""}
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        """Callback when the connection to the exchange simulator is lost."""
+        super().connection_lost(exc)
+        if not self.closed.done():
+            self.closed.set_result(None)
+
+    def on_message(self, typ: int, data: bytes, start: int, length: int) -> None:
+        """Convert an event from the exchange simulator to a match events row and analyse it."""
+        if typ == MessageType.INSERT_EVENT and length == INSERT_EVENT_MESSAGE_SIZE:
+            now, team, order_id, instrument, side, volume, price, lifespan = INSERT_EVENT_MESSAGE.unpack_from(data,
+                                                                                                              start)
+            self.__add_row(now, team, MatchEventOperation.INSERT, order_id, instrument, "AB"[side], volume, price,
+                           "FG"[lifespan], "")
+        elif typ == MessageType.AMEND_EVENT and length == AMEND_EVENT_MESSAGE_SIZE:
+            now, team, order_id, volume_delta = AMEND_EVENT_MESSAGE.unpack_from(data, start)
+            self.__add_row(now, team, MatchEventOperation.AMEND, order_id, "", "", volume_delta, "", "", "")
+        elif typ == MessageType.CANCEL_EVENT and length == CANCEL_EVENT_MESSAGE_SIZE:
+            now, team, order_id = CANCEL_EVENT_MESSAGE.unpack_from(data, start)
+            self.__add_row(now, team, MatchEventOperation.CANCEL, order_id, "", "", "", "", "", "")
+        elif typ == MessageType.TRADE_EVENT and length == TRADE_EVENT_MESSAGE_SIZE:
+            now, team, order_id, side, instrument, volume, price, fee = TRADE_EVENT_MESSAGE.unpack_from(data, start)
+            self.__add_row(now, team, MatchEventOperation.TRADE, order_id, instrument, "AB"[side], volume, price,
+                           "", fee)
+        elif typ == MessageType.HEDGE_EVENT and length == HEDGE_EVENT_MESSAGE_SIZE:
+            now, team, side, instrument, volume, price = HEDGE_EVENT_MESSAGE.unpack_from(data, start)
+            self.__add_row(now, team, MatchEventOperation.HEDGE, 0, instrument, "AB"[side], volume, price, "", "")
+        elif typ == MessageType.LOGIN_EVENT and length == LOGIN_EVENT_MESSAGE_SIZE:
+            name, team = LOGIN_EVENT_MESSAGE.unpack_from(data, start)
+            self.__teams[team] = name.rstrip(b"\0").decode()
+        elif typ == MessageType.RESYNC_EVENT and length == RESYNC_EVENT_MESSAGE_SIZE:
+            self.__logger.warning("analysis fell behind the exchange simulator, results will be inaccurate")
+
+    def __add_row(self, now: float, team: int, operation: MatchEventOperation, *fields) -> None:
+        """Analyse an event in the form of a match events row."""
+        self.analyser.add_row([repr(now), self.__teams[team], MatchEvent.OPERATION_NAMES[operation],
+                               *(str(f) for f in fields)])
+
+
+def analyse_file(path: pathlib.Path, etf_clamp: float, tick_size: float,
+                 tick_interval: float = TICK_INTERVAL) -> MatchSeries:
+    """Return the series for the match recorded in a match events file."""
+    analyser = MatchAnalyser(etf_clamp, tick_size, tick_interval)
+    analyser.add_rows(row for _, row in iter_rows(path))
+    return analyser.finish()
+
+
+async def analyse_live(host: str, port: int, etf_clamp: float, tick_size: float,
+                       tick_interval: float = TICK_INTERVAL) -> MatchSeries:
+    """Return the series for a match received from an exchange simulator's heads-up display port."""
+    analyser = MatchAnalyser(etf_clamp, tick_size, tick_interval)
+    connection = HudAnalysisConnection(analyser)
+    await asyncio.get_event_loop().create_connection(lambda: connection, host, port)
+    await connection.closed
+    return analyser.finish()
@@ -16,20 +16,30 @@
 #     License along with Ready Trader Go.  If not, see
 #     <https://www.gnu.org/licenses/>.
 import asyncio
+import atexit
 import json
 import logging
 import pathlib
 import signal
 import sys
 
-from typing import Callable, Optional
+from typing import Callable, Optional, Tuple
+
+from .loop_monitor import LoopMonitor
+from .queued_logging import DEFAULT_BATCH_SIZE, QueuedLogging
 
 
 class Application(object):
     """Standard application setup."""
 
-    def __init__(self, name: str, config_validator: Optional[Callable] = None):
-        """Initialise a new instance of the Application class."""
+    def __init__(self, name: str, config_validator: Optional[Callable] = None, log_name: Optional[str] = None):
+        """Initialise a new instance of the Application class.
+
+        The configuration is read from name.json and the log is written to
+        name.log, or to log_name.log if log_name is given, by a background
+        thread. If the configuration has a LoopMonitor section, the event loop
+        is monitored while the application runs.
+        """
         self.event_loop: asyncio.AbstractEventLoop = asyncio.get_event_loop()
         self.logger = logging.getLogger("APP")
         self.name: str = name
@@ -54,13 +64,35 @@ class Application(object):
         elif config_validator is not None:
             raise Exception("configuration file does not exist: %s" % str(config_path))
 
-        logging.basicConfig(filename=f'{name}.log', format="%(asctime)s [%(levelname)-7s] [%(name)s] %(message)s",
-                            level=logging.INFO)
+        self.queued_logging: Optional[QueuedLogging] = None
+        if not logging.getLogger().handlers:
+            level, rate_limit, batch_size = self.__logging_settings()
+            self.queued_logging = QueuedLogging(f'{log_name or name}.log', level, rate_limit, batch_size)
+            self.queued_logging.start()
+            atexit.register(self.queued_logging.stop)
 
         self.logger.info("%s started with arguments={%s}", self.name, ", ".join(sys.argv))
         if self.config is not None:
             self.logger.info("configuration=%s", json.dumps(self.config, separators=(',', ':')))
 
+        self.loop_monitor: Optional[LoopMonitor] = None
+        if type(self.config) is dict and "LoopMonitor" in self.config:
+            self.loop_monitor = LoopMonitor.from_config(self.event_loop, self.config["LoopMonitor"])
+
+    def __logging_settings(self) -> Tuple[int, Optional[float], int]:
+        """Return the log level, rate limit and batch size from the optional Logging configuration section."""
+        settings = self.config.get("Logging", {}) if type(self.config) is dict else {}
+        if type(settings) is not dict:
+            raise Exception("Logging configuration should be a JSON object")
+        level = settings.get("Level", "INFO")
+        if level not in ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"):
+            raise Exception("Logging.Level configuration should be one of DEBUG, INFO, WARNING, ERROR or CRITICAL")
+        rate_limit = settings.get("RateLimit")
+        batch_size = settings.get("BatchSize", DEFAULT_BATCH_SIZE)
+        if (rate_limit is not None and type(rate_limit) is not float) or type(batch_size) is not int:
+            raise Exception("Element of inappropriate type in Logging configuration")
+        return getattr(logging, level), rate_limit, batch_size
+
     def on_signal(self, signum: int) -> None:
         """Called when a signal is received."""
         sig_name = "SIGINT" if signum == signal.SIGINT else "SIGTERM"
@@ -71,14 +103,21 @@ class Application(object):
         """Start the application's event loop."""
         loop = self.event_loop
 
+        if self.loop_monitor is not None:
+            self.loop_monitor.start()
+
         try:
             loop.run_forever()
         except Exception as e:
             self.logger.error("application raised an exception:", exc_info=e)
             raise
         finally:
+            if self.loop_monitor is not None:
+                self.loop_monitor.stop()
             self.logger.info("closing event loop")
             try:
                 loop.run_until_complete(loop.shutdown_asyncgens())
             finally:
                 loop.close()
+                if self.queued_logging is not None:
+                    self.queued_logging.stop()
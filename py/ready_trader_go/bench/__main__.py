@@ -0,0 +1,126 @@
+# Copyright 2021 Optiver Asia Pacific Pty. Ltd.
+#
+# This file is part of Ready Trader Go.
+#
+#     Ready Trader Go is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU Affero General Public License
+#     as published by the Free Software Foundation, either version 3 of
+#     the License, or (at your option) any later version.
+#
+#     Ready Trader Go is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public
+#     License along with Ready Trader Go.  If not, see
+#     <https://www.gnu.org/licenses/>.
+"""Run the exchange simulator benchmark suite.
+
+Run with "python -m ready_trader_go.bench" from a directory containing the
+ready_trader_go package. Results can be saved as JSON and compared with an
+earlier run, in which case the exit status is one if any benchmark has
+slowed by more than the threshold.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+
+from typing import Any, Dict, Optional, Sequence
+
+from .suite import BENCHMARKS, DEFAULT_SIZES
+
+DEFAULT_REPEAT: int = 5
+DEFAULT_THRESHOLD: float = 0.1
+QUICK_SCALE: int = 10
+
+
+def git_commit() -> Optional[str]:
+    """Return the commit of the git working tree holding this package, if there is one."""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, check=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def machine_info() -> Dict[str, Any]:
+    """Return a description of this machine and Python interpreter."""
+    return {"Platform": platform.platform(),
+            "Processor": platform.processor() or platform.machine(),
+            "CpuCount": os.cpu_count(),
+            "Python": "%s %s" % (platform.python_implementation(), platform.python_version()),
+            "Commit": git_commit(),
+            "Time": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds")}
+
+
+def run(names: Sequence[str], repeat: int, quick: bool) -> Dict[str, Any]:
+    """Run the named benchmarks, printing each result as it arrives, and return the results."""
+    results: Dict[str, Any] = {"Machine": machine_info(), "Repeat": repeat, "Benchmarks": dict()}
+    print("%-24s %10s %16s  %s" % ("benchmark", "size", "rate", "unit"))
+    for name in names:
+        size: int = DEFAULT_SIZES[name] // QUICK_SCALE if quick else DEFAULT_SIZES[name]
+        result = BENCHMARKS[name](size, repeat)
+        results["Benchmarks"][name] = {"Size": size, "Rate": result.rate, "Unit": result.unit}
+        print("%-24s %10d %16.1f  %s" % (name, size, result.rate, result.unit), flush=True)
+    return results
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> bool:
+    """Print how each benchmark compares with a baseline and return True if none has slowed beyond the threshold."""
+    passed: bool = True
+    print()
+    print("%-24s %16s %16s %8s" % ("benchmark", "baseline", "rate", "change"))
+    for name, result in results["Benchmarks"].items():
+        if name not in baseline["Benchmarks"]:
+            continue
+        before: float = baseline["Benchmarks"][name]["Rate"]
+        change: float = result["Rate"] / before - 1.0
+        regressed: bool = change < -threshold
+        passed = passed and not regressed
+        print("%-24s %16.1f %16.1f %+7.1f%%%s" % (name, before, result["Rate"], change * 100.0,
+                                                  "  REGRESSION" if regressed else ""))
+    return passed
+
+
+def main() -> None:
+    """Parse the command line, run the benchmarks and save or compare the results."""
+    parser = argparse.ArgumentParser(prog="python -m ready_trader_go.bench",
+                                     description="Run the exchange simulator benchmark suite.")
+    parser.add_argument("--only", choices=list(BENCHMARKS), metavar="BENCHMARK", nargs="+",
+                        help="run only the named benchmarks (%s)" % ", ".join(BENCHMARKS))
+    parser.add_argument("--repeat", default=DEFAULT_REPEAT, type=int,
+                        help="number of times to run each benchmark, keeping the fastest (default %d)"
+                             % DEFAULT_REPEAT)
+    parser.add_argument("--quick", action="store_true",
+                        help="run each benchmark at a tenth of its usual size")
+    parser.add_argument("--output", metavar="FILENAME",
+                        help="write the results, with a description of this machine, to a JSON file")
+    parser.add_argument("--compare", metavar="FILENAME",
+                        help="compare the results with those in a JSON file written by an earlier run")
+    parser.add_argument("--threshold", default=DEFAULT_THRESHOLD, type=float,
+                        help="fractional slowdown counted as a regression when comparing (default %g)"
+                             % DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    baseline: Optional[Dict[str, Any]] = None
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+
+    results = run(args.only or list(BENCHMARKS), args.repeat, args.quick)
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+
+    if baseline is not None and not compare(results, baseline, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# Copyright 2021 Optiver Asia Pacific Pty. Ltd.
+#
+# This file is part of Ready Trader Go.
+#
+#     Ready Trader Go is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU Affero General Public License
+#     as published by the Free Software Foundation, either version 3 of
+#     the License, or (at your option) any later version.
+#
+#     Ready Trader Go is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public
+#     License along with Ready Trader Go.  If not, see
+#     <https://www.gnu.org/licenses/>.
+"""Measure the memory used by, and attribute access to, many competitors.
+
+Run with "python -m ready_trader_go.bench.competitors" from a directory
+containing the ready_trader_go package.
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from typing import List, Sequence, Tuple
+
+from ..account import AccountFactory
+from ..competitor import Competitor
+from ..execution import ExecutionConnection
+from ..limiter import FrequencyLimiter
+from ..order_book import OrderBook
+from ..timer_wheel import TimerWheel
+from ..types import Instrument
+from ..unhedged_lots import UnhedgedLotsFactory
+
+
+DEFAULT_COUNTS: Tuple[int, ...] = (1000, 10000)
+DEFAULT_REPEAT: int = 20
+
+
+def create_competitors(count: int) -> List[ExecutionConnection]:
+    """Return the given number of execution connections, each with a logged in competitor."""
+    account_factory = AccountFactory(0.002, 1.0)
+    login_timers = TimerWheel(1.0, time.monotonic)
+    unhedged_lots_factory = UnhedgedLotsFactory(TimerWheel(0.25, time.monotonic))
+    etf_book = OrderBook(Instrument.ETF, 0.0, 0.0)
+    future_book = OrderBook(Instrument.FUTURE, 0.0, 0.0)
+
+    connections: List[ExecutionConnection] = list()
+    for i in range(count):
+        connection = ExecutionConnection(None, FrequencyLimiter(1.0, 50), None, login_timers)
+        connection.login_timeout.cancel()
+        connection.competitor = Competitor("Team%d" % i, connection, etf_book, future_book, account_factory.create(),
+                                           None, None, 100, 10, 200, 1.0, unhedged_lots_factory, None)
+        connections.append(connection)
+    return connections
+
+
+def touch(connection: ExecutionConnection, now: float) -> int:
+    """Read and write the attributes used when a message from a competitor is handled."""
+    connection.frequency_limiter.check_event(now)
+    competitor: Competitor = connection.competitor
+    account = competitor.account
+    competitor.last_client_order_id += 1
+    competitor.active_volume += 1
+    competitor.active_volume -= 1
+    account.etf_position += 1
+    account.etf_position -= 1
+    return (competitor.unhedged_etf_lots.relative_position + account.future_position + len(competitor.orders)
+            + competitor.position_limit)
+
+
+def measure(count: int, repeat: int) -> Tuple[float, float]:
+    """Return the bytes allocated per competitor and the nanoseconds taken to touch each one."""
+    gc.collect()
+    tracemalloc.start()
+    before: int = tracemalloc.get_traced_memory()[0]
+    connections = create_competitors(count)
+    after: int = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    now: float = 0.0
+    best: float = float("inf")
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        for connection in connections:
+            touch(connection, now)
+        best = min(best, time.perf_counter() - start)
+        now += 0.01
+
+    return (after - before) / count, best * 1e9 / count
+
+
+def main(counts: Sequence[int] = DEFAULT_COUNTS, repeat: int = DEFAULT_REPEAT) -> None:
+    """Run the benchmark for each number of competitors and print the results."""
+    print("%12s %20s %16s" % ("competitors", "bytes/competitor", "ns/touch"))
+    for count in counts:
+        bytes_per_competitor, nanoseconds = measure(count, repeat)
+        print("%12d %20.1f %16.1f" % (count, bytes_per_competitor, nanoseconds))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the memory used by, and attribute access to, competitors.")
+    parser.add_argument("--counts", default=DEFAULT_COUNTS, nargs="+", type=int,
+                        help="numbers of competitors to measure (default %s)" % " ".join(map(str, DEFAULT_COUNTS)))
+    parser.add_argument("--repeat", default=DEFAULT_REPEAT, type=int,
+                        help="number of times to touch every competitor, keeping the fastest (default %d)"
+                             % DEFAULT_REPEAT)
+    args = parser.parse_args()
+    main(args.counts, args.repeat)
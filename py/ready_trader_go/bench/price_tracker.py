@@ -0,0 +1,409 @@
+# Copyright 2021 Optiver Asia Pacific Pty. Ltd.
+#
+# This file is part of Ready Trader Go.
+#
+#     Ready Trader Go is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU Affero General Public License
+#     as published by the Free Software Foundation, either version 3 of
+#     the License, or (at your option) any later version.
+#
+#     Ready Trader Go is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public
+#     License along with Ready Trader Go.  If not, see
+#     <https://www.gnu.org/licenses/>.
+"""Check BestPriceTracker and OrderBook against the sorted-list code they replaced.
+
+The same random operations are applied to the current classes and to
+reference copies of the sorted-list implementations, and the best prices,
+cross checks, fills, top levels and trade ticks are compared after every
+operation. Run with "python -m ready_trader_go.bench.price_tracker" from a
+directory containing the ready_trader_go package; the exit status is one if
+any difference is found.
+"""
+import argparse
+import bisect
+import collections
+import random
+import sys
+import time
+
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from ..order_book import IOrderListener, Order, OrderBook, TOP_LEVEL_COUNT
+from ..price_tracker import BestPriceTracker
+from ..types import Instrument, Lifespan, Side
+
+
+DEFAULT_COUNT: int = 200000
+DEFAULT_SEED: int = 42
+LEVEL_COUNT: int = 40
+MID_PRICE: int = 10000
+TICK_SIZE: int = 100
+
+
+class MismatchError(Exception):
+    """Raised when the current and reference implementations disagree."""
+
+
+class SortedListPrices(object):
+    """The bisected list of every order price that Competitor used before BestPriceTracker."""
+
+    def __init__(self, side: Side):
+        """Initialise a new instance of the SortedListPrices class."""
+        self.__prices: List[int] = list()
+        self.__sign: int = 1 if side == Side.BUY else -1
+
+    def add(self, price: int) -> None:
+        """Add an order at the given price."""
+        bisect.insort(self.__prices, self.__sign * price)
+
+    def best(self) -> Optional[int]:
+        """Return the best price, or None if there are no orders."""
+        return self.__sign * self.__prices[-1] if self.__prices else None
+
+    def crosses(self, price: int) -> bool:
+        """Return True if an order on the other side of the market at the given price would cross the best price."""
+        return bool(self.__prices) and self.__sign * price <= self.__prices[-1]
+
+    def remove(self, price: int) -> None:
+        """Remove an order at the given price."""
+        self.__prices.pop(bisect.bisect(self.__prices, self.__sign * price) - 1)
+
+
+class SortedListOrderBook(object):
+    """The order book as it was before BestPriceTracker, with its price levels held in sorted lists."""
+
+    def __init__(self, instrument: Instrument, maker_fee: float, taker_fee: float):
+        """Initialise a new instance of the SortedListOrderBook class."""
+        self.instrument: Instrument = instrument
+        self.maker_fee: float = maker_fee
+        self.taker_fee: float = taker_fee
+
+        self.__ask_prices: List[int] = []
+        self.__ask_ticks: Dict[int, int] = collections.defaultdict(int)
+        self.__bid_prices: List[int] = []
+        self.__bid_ticks: Dict[int, int] = collections.defaultdict(int)
+        self.__last_traded_price: Optional[int] = None
+        self.__levels: Dict[int, Deque[Order]] = {}
+        self.__total_volumes: Dict[int, int] = {}
+
+    def amend(self, now: float, order: Order, new_volume: int) -> None:
+        """Amend an order in this order book by decreasing its volume."""
+        if order.remaining_volume > 0:
+            fill_volume = order.volume - order.remaining_volume
+            diff = order.volume - (fill_volume if new_volume < fill_volume else new_volume)
+            self.remove_volume_from_level(order.price, diff, order.side)
+            order.volume -= diff
+            order.remaining_volume -= diff
+            if order.listener:
+                order.listener.on_order_amended(now, order, diff)
+
+    def best_ask(self) -> Optional[int]:
+        """Return the current best ask price, or None if there are no ask orders."""
+        return -self.__ask_prices[-1] if self.__ask_prices else None
+
+    def best_bid(self) -> Optional[int]:
+        """Return the current best bid price, or None if there are no bid orders."""
+        return self.__bid_prices[-1] if self.__bid_prices else None
+
+    def cancel(self, now: float, order: Order) -> None:
+        """Cancel an order in this order book."""
+        if order.remaining_volume > 0:
+            self.remove_volume_from_level(order.price, order.remaining_volume, order.side)
+            remaining = order.remaining_volume
+            order.remaining_volume = 0
+            if order.listener:
+                order.listener.on_order_cancelled(now, order, remaining)
+
+    def insert(self, now: float, order: Order) -> None:
+        """Insert a new order into this order book."""
+        if order.side == Side.SELL and self.__bid_prices and order.price <= self.__bid_prices[-1]:
+            self.trade_ask(now, order)
+        elif order.side == Side.BUY and self.__ask_prices and order.price >= -self.__ask_prices[-1]:
+            self.trade_bid(now, order)
+
+        if order.remaining_volume > 0:
+            if order.lifespan == Lifespan.FILL_AND_KILL:
+                remaining = order.remaining_volume
+                order.remaining_volume = 0
+                if order.listener:
+                    order.listener.on_order_cancelled(now, order, remaining)
+            else:
+                self.place(now, order)
+
+    def last_traded_price(self) -> Optional[int]:
+        """Return the last traded price."""
+        return self.__last_traded_price
+
+    def place(self, now: float, order: Order) -> None:
+        """Place an order that does not match any existing order in this order book."""
+        price = order.price
+
+        if price not in self.__levels:
+            self.__levels[price] = collections.deque()
+            self.__total_volumes[price] = 0
+            if order.side == Side.SELL:
+                bisect.insort_left(self.__ask_prices, -price)
+            else:
+                bisect.insort_left(self.__bid_prices, price)
+
+        self.__levels[price].append(order)
+        self.__total_volumes[price] += order.remaining_volume
+
+        if order.listener:
+            order.listener.on_order_placed(now, order)
+
+    def remove_volume_from_level(self, price: int, volume: int, side: Side) -> None:
+        if self.__total_volumes[price] == volume:
+            del self.__levels[price]
+            del self.__total_volumes[price]
+            if side == Side.SELL:
+                self.__ask_prices.pop(bisect.bisect(self.__ask_prices, -price) - 1)
+            elif side == Side.BUY:
+                self.__bid_prices.pop(bisect.bisect(self.__bid_prices, price) - 1)
+        else:
+            self.__total_volumes[price] -= volume
+
+    def top_levels(self, ask_prices: List[int], ask_volumes: List[int], bid_prices: List[int],
+                   bid_volumes: List[int], depth: int = TOP_LEVEL_COUNT) -> None:
+        """Populate the supplied lists with the top levels for this book."""
+        i = 0
+        j = len(self.__ask_prices) - 1
+        while i < depth and j >= 0:
+            ask_prices[i] = -self.__ask_prices[j]
+            ask_volumes[i] = self.__total_volumes[ask_prices[i]]
+            i += 1
+            j -= 1
+        while i < depth:
+            ask_prices[i] = ask_volumes[i] = 0
+            i += 1
+
+        i = 0
+        j = len(self.__bid_prices) - 1
+        while i < depth and j >= 0:
+            bid_prices[i] = self.__bid_prices[j]
+            bid_volumes[i] = self.__total_volumes[bid_prices[i]]
+            i += 1
+            j -= 1
+        while i < depth:
+            bid_prices[i] = bid_volumes[i] = 0
+            i += 1
+
+    def trade_ask(self, now: float, order: Order) -> None:
+        """Check to see if any existing bid orders match the specified ask order."""
+        best_bid = self.__bid_prices[-1]
+
+        while order.remaining_volume > 0 and best_bid >= order.price and self.__total_volumes[best_bid] > 0:
+            self.trade_level(now, order, best_bid)
+            if self.__total_volumes[best_bid] == 0:
+                del self.__levels[best_bid]
+                del self.__total_volumes[best_bid]
+                self.__bid_prices.pop()
+                if not self.__bid_prices:
+                    break
+                best_bid = self.__bid_prices[-1]
+
+    def trade_bid(self, now: float, order: Order) -> None:
+        """Check to see if any existing ask orders match the specified bid order."""
+        best_ask = -self.__ask_prices[-1]
+
+        while order.remaining_volume > 0 and best_ask <= order.price and self.__total_volumes[best_ask] > 0:
+            self.trade_level(now, order, best_ask)
+            if self.__total_volumes[best_ask] == 0:
+                del self.__levels[best_ask]
+                del self.__total_volumes[best_ask]
+                self.__ask_prices.pop()
+                if not self.__ask_prices:
+                    break
+                best_ask = -self.__ask_prices[-1]
+
+    def trade_level(self, now: float, order: Order, best_price: int) -> None:
+        """Match the specified order with existing orders at the given level."""
+        remaining: int = order.remaining_volume
+        order_queue: Deque[Order] = self.__levels[best_price]
+        total_volume: int = self.__total_volumes[best_price]
+
+        while remaining > 0 and total_volume > 0:
+            while order_queue[0].remaining_volume == 0:
+                order_queue.popleft()
+            passive: Order = order_queue[0]
+            volume: int = remaining if remaining < passive.remaining_volume else passive.remaining_volume
+            fee: int = round(best_price * volume * self.maker_fee)
+            total_volume -= volume
+            remaining -= volume
+            passive.remaining_volume -= volume
+            passive.total_fees += fee
+            if passive.listener:
+                passive.listener.on_order_filled(now, passive, best_price, volume, fee)
+
+        self.__total_volumes[best_price] = total_volume
+        traded_volume_at_this_level: int = order.remaining_volume - remaining
+
+        if order.side == Side.BUY:
+            self.__ask_ticks[best_price] += traded_volume_at_this_level
+        else:
+            self.__bid_ticks[best_price] += traded_volume_at_this_level
+
+        fee: int = round(best_price * traded_volume_at_this_level * self.taker_fee)
+        order.remaining_volume = remaining
+        order.total_fees += fee
+        if order.listener:
+            order.listener.on_order_filled(now, order, best_price, traded_volume_at_this_level, fee)
+
+        self.__last_traded_price = best_price
+
+    def trade_ticks(self, ask_prices: List[int], ask_volumes: List[int], bid_prices: List[int],
+                    bid_volumes: List[int]) -> bool:
+        """Return True and populate the lists if there have been trades."""
+        if self.__ask_ticks or self.__bid_ticks:
+            prices = sorted(self.__ask_ticks.keys())[:TOP_LEVEL_COUNT]
+            volumes = tuple(self.__ask_ticks[p] for p in prices)
+            ask_prices[:] = prices + [0] * (TOP_LEVEL_COUNT - len(prices))
+            ask_volumes[:] = volumes + (0,) * (TOP_LEVEL_COUNT - len(volumes))
+
+            prices = sorted(self.__bid_ticks.keys(), reverse=True)[:TOP_LEVEL_COUNT]
+            volumes = tuple(self.__bid_ticks[p] for p in prices)
+            bid_prices[:] = prices + [0] * (TOP_LEVEL_COUNT - len(prices))
+            bid_volumes[:] = volumes + (0,) * (TOP_LEVEL_COUNT - len(volumes))
+
+            self.__ask_ticks.clear()
+            self.__bid_ticks.clear()
+
+            return True
+
+        return False
+
+
+class RecordingListener(IOrderListener):
+    """Record every order event so that two order books can be compared."""
+
+    def __init__(self):
+        """Initialise a new instance of the RecordingListener class."""
+        self.events: List[Tuple[Any, ...]] = list()
+
+    def on_order_amended(self, now: float, order: Order, volume_removed: int) -> None:
+        """Called when the order is amended."""
+        self.events.append(("amended", order.client_order_id, volume_removed))
+
+    def on_order_cancelled(self, now: float, order: Order, volume_removed: int) -> None:
+        """Called when the order is cancelled."""
+        self.events.append(("cancelled", order.client_order_id, volume_removed))
+
+    def on_order_placed(self, now: float, order: Order) -> None:
+        """Called when a good-for-day order is placed in the order book."""
+        self.events.append(("placed", order.client_order_id))
+
+    def on_order_filled(self, now: float, order: Order, price: int, volume: int, fee: int) -> None:
+        """Called when the order is partially or completely filled."""
+        self.events.append(("filled", order.client_order_id, price, volume, fee))
+
+
+def compare(step: int, what: str, expected: Any, actual: Any) -> None:
+    """Raise a MismatchError if the reference and current results differ."""
+    if expected != actual:
+        raise MismatchError("step %d: %s differ: expected %r, got %r" % (step, what, expected, actual))
+
+
+def random_price(rng: random.Random) -> int:
+    """Return a random price within LEVEL_COUNT ticks of the mid price."""
+    return MID_PRICE + rng.randint(-LEVEL_COUNT // 2, LEVEL_COUNT // 2) * TICK_SIZE
+
+
+def check_price_tracker(rng: random.Random, count: int) -> None:
+    """Compare BestPriceTracker with the sorted list of order prices over random adds and removes."""
+    trackers = (BestPriceTracker(Side.BUY), BestPriceTracker(Side.SELL))
+    references = (SortedListPrices(Side.BUY), SortedListPrices(Side.SELL))
+    prices: Tuple[List[int], List[int]] = ([], [])
+
+    for step in range(count):
+        i = rng.randrange(2)
+        if prices[i] and rng.random() < 0.5:
+            price = prices[i].pop(rng.randrange(len(prices[i])))
+            trackers[i].remove(price)
+            references[i].remove(price)
+        else:
+            price = random_price(rng)
+            prices[i].append(price)
+            trackers[i].add(price)
+            references[i].add(price)
+
+        compare(step, "best prices", references[i].best(), trackers[i].best())
+        price = random_price(rng)
+        compare(step, "cross checks at %d" % price, references[i].crosses(price), trackers[i].crosses(price))
+        compare(step, "order counts at %d" % price, prices[i].count(price), trackers[i].count(price))
+        compare(step, "distinct prices", len(set(prices[i])), len(trackers[i]))
+
+
+def check_order_book(rng: random.Random, count: int) -> None:
+    """Compare OrderBook with the sorted-list order book over random inserts, amends and cancels."""
+    book = OrderBook(Instrument.ETF, -0.0001, 0.0002)
+    reference = SortedListOrderBook(Instrument.ETF, -0.0001, 0.0002)
+    listener = RecordingListener()
+    reference_listener = RecordingListener()
+    live: List[Tuple[Order, Order]] = list()
+    current_levels: List[List[int]] = [[0] * TOP_LEVEL_COUNT for _ in range(4)]
+    reference_levels: List[List[int]] = [[0] * TOP_LEVEL_COUNT for _ in range(4)]
+
+    for step in range(count):
+        now: float = step * 0.001
+        action: float = rng.random()
+        if not live or action < 0.55:
+            lifespan = Lifespan.FILL_AND_KILL if rng.random() < 0.2 else Lifespan.GOOD_FOR_DAY
+            side = Side.BUY if rng.random() < 0.5 else Side.SELL
+            price = random_price(rng)
+            volume = rng.randint(1, 20)
+            order = Order(step, Instrument.ETF, lifespan, side, price, volume, listener)
+            reference_order = Order(step, Instrument.ETF, lifespan, side, price, volume, reference_listener)
+            book.insert(now, order)
+            reference.insert(now, reference_order)
+            live.append((order, reference_order))
+        elif action < 0.75:
+            order, reference_order = live[rng.randrange(len(live))]
+            new_volume = rng.randint(0, order.volume)
+            book.amend(now, order, new_volume)
+            reference.amend(now, reference_order, new_volume)
+        else:
+            order, reference_order = live[rng.randrange(len(live))]
+            book.cancel(now, order)
+            reference.cancel(now, reference_order)
+
+        compare(step, "order events", reference_listener.events, listener.events)
+        listener.events.clear()
+        reference_listener.events.clear()
+        live = [pair for pair in live if pair[0].remaining_volume > 0]
+
+        compare(step, "best bids", reference.best_bid(), book.best_bid())
+        compare(step, "best asks", reference.best_ask(), book.best_ask())
+        compare(step, "last traded prices", reference.last_traded_price(), book.last_traded_price())
+        book.top_levels(*current_levels)
+        reference.top_levels(*reference_levels)
+        compare(step, "top levels", reference_levels, current_levels)
+        compare(step, "trade tick flags", reference.trade_ticks(*reference_levels), book.trade_ticks(*current_levels))
+        compare(step, "trade ticks", reference_levels, current_levels)
+
+
+def main(count: int = DEFAULT_COUNT, seed: int = DEFAULT_SEED) -> None:
+    """Run both checks with the given number of random operations and exit with status one on a mismatch."""
+    for name, check in (("price tracker", check_price_tracker), ("order book", check_order_book)):
+        start: float = time.perf_counter()
+        try:
+            check(random.Random(seed), count)
+        except MismatchError as e:
+            print("%s: %s" % (name, e))
+            sys.exit(1)
+        print("%s: %d operations matched in %.1fs" % (name, count, time.perf_counter() - start))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check BestPriceTracker and OrderBook against the sorted-list code"
+                                                 " they replaced.")
+    parser.add_argument("--count", default=DEFAULT_COUNT, type=int,
+                        help="number of random operations in each check (default %d)" % DEFAULT_COUNT)
+    parser.add_argument("--seed", default=DEFAULT_SEED, type=int,
+                        help="seed for the random operations (default %d)" % DEFAULT_SEED)
+    args = parser.parse_args()
+    main(args.count, args.seed)
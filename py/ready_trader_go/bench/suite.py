@@ -0,0 +1,401 @@
+# Copyright 2021 Optiver Asia Pacific Pty. Ltd.
+#
+# This file is part of Ready Trader Go.
+#
+#     Ready Trader Go is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU Affero General Public License
+#     as published by the Free Software Foundation, either version 3 of
+#     the License, or (at your option) any later version.
+#
+#     Ready Trader Go is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public
+#     License along with Ready Trader Go.  If not, see
+#     <https://www.gnu.org/licenses/>.
+"""Benchmarks of the exchange simulator's core, from the order book up to a whole match.
+
+Each benchmark takes a size, does that much work as many times as asked
+and returns the best rate achieved. Run them all with
+"python -m ready_trader_go.bench".
+"""
+import asyncio
+import collections
+import os
+import random
+import tempfile
+import time
+
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional
+
+from ..journal import InputJournal
+from ..market_data_cache import market_data_events, read_market_data_image
+from ..market_events import MarketEventOperation
+from ..market_data_generator import MarketDataGenerator, write_csv, write_image
+from ..match_events import MatchEvents, MatchEventsWriter
+from ..messages import (HEADER, HEADER_SIZE, INSERT_MESSAGE, INSERT_MESSAGE_SIZE, CANCEL_MESSAGE, CANCEL_MESSAGE_SIZE,
+                        LOGIN_MESSAGE, LOGIN_MESSAGE_SIZE, Connection, MessageType)
+from ..order_book import IOrderListener, Order, OrderBook, TOP_LEVEL_COUNT
+from ..pubsub import PublisherFactory, SubscriberFactory
+from ..rematch import rematch
+from ..types import Instrument, Lifespan, Side
+from . import competitors
+
+
+MID_PRICE: int = 10000
+TICK_SIZE: int = 100
+
+
+class BenchmarkResult(NamedTuple):
+    """The best rate achieved by a benchmark and the unit of that rate."""
+    rate: float
+    unit: str
+
+
+def best_rate(repeat: int, run: Callable[[], int]) -> float:
+    """Call run the given number of times and return the most units of work it did per second."""
+    best: float = 0.0
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        count: int = run()
+        elapsed: float = time.perf_counter() - start
+        best = max(best, count / elapsed)
+    return best
+
+
+class RestingOrders(IOrderListener):
+    """Keep the orders resting in an order book in the order they were placed."""
+
+    def __init__(self):
+        """Initialise a new instance of the RestingOrders class."""
+        self.orders: Deque[Order] = collections.deque()
+
+    def on_order_placed(self, now: float, order: Order) -> None:
+        """Called when a good-for-day order is placed in the order book."""
+        self.orders.append(order)
+
+    def oldest(self) -> Optional[Order]:
+        """Return the oldest order which is still resting in the order book, if there is one."""
+        orders = self.orders
+        while orders and orders[0].remaining_volume == 0:
+            orders.popleft()
+        return orders[0] if orders else None
+
+
+def filled_order_book(levels: int, orders_per_level: int, volume: int) -> OrderBook:
+    """Return an ETF order book with resting orders at the given number of price levels each side of the mid."""
+    book = OrderBook(Instrument.ETF, -0.0001, 0.0002)
+    order_id: int = 0
+    for level in range(1, levels + 1):
+        for _ in range(orders_per_level):
+            order_id += 1
+            book.insert(0.0, Order(order_id, Instrument.ETF, Lifespan.GOOD_FOR_DAY, Side.BUY,
+                                   MID_PRICE - level * TICK_SIZE, volume))
+            order_id += 1
+            book.insert(0.0, Order(order_id, Instrument.ETF, Lifespan.GOOD_FOR_DAY, Side.SELL,
+                                   MID_PRICE + level * TICK_SIZE, volume))
+    return book
+
+
+def order_book_mix(size: int, repeat: int) -> BenchmarkResult:
+    """Measure a mix of inserts (a fifth of them fill-and-kill orders that trade), amends and cancels."""
+    rng = random.Random(1)
+    choices = [(rng.random(), rng.random(), rng.getrandbits(1), rng.randint(1, 5), rng.randint(1, 20))
+               for _ in range(size)]
+
+    def run() -> int:
+        book = OrderBook(Instrument.ETF, -0.0001, 0.0002)
+        resting = RestingOrders()
+        for order_id, (operation, lifespan, side, ticks, volume) in enumerate(choices, 1):
+            if operation < 0.5:
+                if lifespan < 0.2:
+                    price = MID_PRICE + TICK_SIZE if side == Side.BUY else MID_PRICE - TICK_SIZE
+                    book.insert(0.0, Order(order_id, Instrument.ETF, Lifespan.FILL_AND_KILL, Side(side), price,
+                                           volume, resting))
+                else:
+                    price = MID_PRICE - ticks * TICK_SIZE if side == Side.BUY else MID_PRICE + ticks * TICK_SIZE
+                    book.insert(0.0, Order(order_id, Instrument.ETF, Lifespan.GOOD_FOR_DAY, Side(side), price,
+                                           volume, resting))
+            elif operation < 0.6:
+                order = resting.oldest()
+                if order is not None and order.remaining_volume > 1:
+                    book.amend(0.0, order, order.volume - 1)
+            else:
+                order = resting.oldest()
+                if order is not None:
+                    book.cancel(0.0, order)
+        return size
+
+    return BenchmarkResult(best_rate(repeat, run), "operations/s")
+
+
+def order_book_top_levels(size: int, repeat: int) -> BenchmarkResult:
+    """Measure OrderBook.top_levels on a book with twenty price levels each side."""
+    book = filled_order_book(20, 5, 10)
+    ask_prices, ask_volumes, bid_prices, bid_volumes = ([0] * TOP_LEVEL_COUNT for _ in range(4))
+
+    def run() -> int:
+        top_levels = book.top_levels
+        for _ in range(size):
+            top_levels(ask_prices, ask_volumes, bid_prices, bid_volumes)
+        return size
+
+    return BenchmarkResult(best_rate(repeat, run), "calls/s")
+
+
+def order_book_trade_ticks(size: int, repeat: int) -> BenchmarkResult:
+    """Measure a one lot trade on each side of the book followed by OrderBook.trade_ticks."""
+    book = filled_order_book(20, 5, 10 * size * repeat)
+    ask_prices, ask_volumes, bid_prices, bid_volumes = ([0] * TOP_LEVEL_COUNT for _ in range(4))
+
+    def run() -> int:
+        for i in range(size):
+            book.insert(0.0, Order(i, Instrument.ETF, Lifespan.FILL_AND_KILL, Side.BUY, MID_PRICE + TICK_SIZE, 1))
+            book.insert(0.0, Order(i, Instrument.ETF, Lifespan.FILL_AND_KILL, Side.SELL, MID_PRICE - TICK_SIZE, 1))
+            book.trade_ticks(ask_prices, ask_volumes, bid_prices, bid_volumes)
+        return size
+
+    return BenchmarkResult(best_rate(repeat, run), "iterations/s")
+
+
+class CountingConnection(Connection):
+    """A connection which counts the messages it receives."""
+
+    def __init__(self):
+        """Initialise a new instance of the CountingConnection class."""
+        Connection.__init__(self)
+        self.message_count: int = 0
+
+    def on_message(self, typ: int, data: bytes, start: int, length: int) -> None:
+        """Count a message."""
+        self.message_count += 1
+
+
+def message_framing(size: int, repeat: int) -> BenchmarkResult:
+    """Measure packing insert and cancel messages and splitting a stream of them back into messages."""
+    insert_message = bytearray(INSERT_MESSAGE_SIZE)
+    cancel_message = bytearray(CANCEL_MESSAGE_SIZE)
+    HEADER.pack_into(insert_message, 0, INSERT_MESSAGE_SIZE, MessageType.INSERT_ORDER)
+    HEADER.pack_into(cancel_message, 0, CANCEL_MESSAGE_SIZE, MessageType.CANCEL_ORDER)
+
+    def run() -> int:
+        stream = bytearray()
+        for i in range(size // 2):
+            INSERT_MESSAGE.pack_into(insert_message, HEADER_SIZE, i, Side.BUY, MID_PRICE, 10, Lifespan.GOOD_FOR_DAY)
+            CANCEL_MESSAGE.pack_into(cancel_message, HEADER_SIZE, i)
+            stream += insert_message
+            stream += cancel_message
+
+        connection = CountingConnection()
+        data = bytes(stream)
+        for start in range(0, len(data), 4096):
+            connection.data_received(data[start:start + 4096])
+        return connection.message_count
+
+    return BenchmarkResult(best_rate(repeat, run), "messages/s")
+
+
+class CountingSubscription(asyncio.DatagramProtocol):
+    """A subscription which counts the datagrams it receives."""
+
+    def __init__(self):
+        """Initialise a new instance of the CountingSubscription class."""
+        self.datagram_count: int = 0
+
+    def datagram_received(self, data: bytes, address) -> None:
+        """Count a datagram."""
+        self.datagram_count += 1
+
+
+def pubsub_round_trip(size: int, repeat: int) -> BenchmarkResult:
+    """Measure publishing datagrams to a memory-mapped file and receiving them in the same process.
+
+    Datagrams are published in batches of half the ring so that none are
+    overwritten before they are read.
+    """
+    batch: int = 32
+    datagram = bytes(range(88))
+
+    async def round_trips(filename: str) -> int:
+        publisher = PublisherFactory("mmap", filename).create(asyncio.BaseProtocol())
+        subscription = CountingSubscription()
+        subscriber = SubscriberFactory("mmap", filename).create(subscription)
+        await asyncio.sleep(0)
+        sent: int = 0
+        while sent < size:
+            for _ in range(batch):
+                publisher.write(datagram)
+            sent += batch
+            while subscription.datagram_count < sent:
+                await asyncio.sleep(0)
+        subscriber.close()
+        publisher.close()
+        return sent
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename: str = os.path.join(directory, "info.dat")
+        return BenchmarkResult(best_rate(repeat, lambda: asyncio.run(round_trips(filename))), "datagrams/s")
+
+
+def market_data_files(directory: str, size: int) -> List[str]:
+    """Write the same generated market data, of about the given number of events, as CSV and as an image."""
+    generator = MarketDataGenerator(duration=size / 50.0, seed=1)
+    csv_filename: str = os.path.join(directory, "market_data.csv")
+    image_filename: str = os.path.join(directory, "market_data.rtgmd")
+    write_csv(csv_filename, generator.rows())
+    write_image(image_filename, generator.rows())
+    return [csv_filename, image_filename]
+
+
+def market_events_csv(size: int, repeat: int) -> BenchmarkResult:
+    """Measure parsing market events from a CSV market data file."""
+    with tempfile.TemporaryDirectory() as directory:
+        filename, _ = market_data_files(directory, size)
+
+        return BenchmarkResult(best_rate(repeat, lambda: sum(1 for _ in market_data_events(filename))), "events/s")
+
+
+def market_events_image(size: int, repeat: int) -> BenchmarkResult:
+    """Measure reading market events from a binary market data image."""
+    with tempfile.TemporaryDirectory() as directory:
+        _, filename = market_data_files(directory, size)
+        return BenchmarkResult(best_rate(repeat, lambda: sum(1 for _ in market_data_events(filename))), "events/s")
+
+
+def match_events_writer(size: int, repeat: int) -> BenchmarkResult:
+    """Measure creating match events and writing them to a CSV file on the writer thread."""
+    def run(filename: str) -> int:
+        loop = asyncio.new_event_loop()
+        match_events = MatchEvents()
+        writer = MatchEventsWriter(match_events, filename, loop)
+        writer.start()
+        for i in range(size // 2):
+            match_events.insert(i * 0.001, "TeamOne", i, Instrument.ETF, Side.BUY, 10, MID_PRICE,
+                                Lifespan.GOOD_FOR_DAY)
+            match_events.cancel(i * 0.001, "TeamOne", i, -10)
+        writer.finish()
+        writer.writer_task.join()
+        loop.close()
+        return size // 2 * 2
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename: str = os.path.join(directory, "match_events.csv")
+        return BenchmarkResult(best_rate(repeat, lambda: run(filename)), "events/s")
+
+
+def write_synthetic_journal(filename: str, market_data_filename: str, duration: float, names: List[str]) -> None:
+    """Write an input journal in which each team quotes one lot either side of the market every tick.
+
+    The quotes are priced from a moving average of the prices of the
+    good-for-day market orders in the ETF and each team cancels its
+    previous quotes before sending new ones.
+    """
+    columns = read_market_data_image(market_data_filename)
+    times, instruments, operations, prices, lifespans = columns[0], columns[1], columns[2], columns[6], columns[7]
+    journal = InputJournal(filename)
+    insert_message = bytearray(INSERT_MESSAGE_SIZE)
+    cancel_message = bytearray(CANCEL_MESSAGE_SIZE)
+    HEADER.pack_into(insert_message, 0, INSERT_MESSAGE_SIZE, MessageType.INSERT_ORDER)
+    HEADER.pack_into(cancel_message, 0, CANCEL_MESSAGE_SIZE, MessageType.CANCEL_ORDER)
+
+    connection_ids: List[int] = list()
+    for name in names:
+        connection_id = journal.connect(0.0)
+        login = HEADER.pack(LOGIN_MESSAGE_SIZE, MessageType.LOGIN) + LOGIN_MESSAGE.pack(name.encode(), b"secret")
+        journal.message(0.0, connection_id, MessageType.LOGIN, login, HEADER_SIZE, LOGIN_MESSAGE_SIZE)
+        connection_ids.append(connection_id)
+
+    row: int = 0
+    average: float = MID_PRICE
+    order_id: int = 0
+    for tick in range(1, int(duration / 0.05) + 1):
+        now: float = tick * 0.05
+        while row < len(times) and times[row] < now:
+            if (instruments[row] == Instrument.ETF and operations[row] == MarketEventOperation.INSERT
+                    and lifespans[row] == Lifespan.GOOD_FOR_DAY):
+                average += (prices[row] - average) * 0.05
+            row += 1
+        journal.on_market_timer_tick(None, now, tick)
+        if tick % 5:
+            continue
+
+        journal.on_timer_tick(None, now, tick // 5)
+        price: int = round(average / TICK_SIZE) * TICK_SIZE
+        for connection_id in connection_ids:
+            if order_id:
+                for previous in (order_id - 1, order_id):
+                    CANCEL_MESSAGE.pack_into(cancel_message, HEADER_SIZE, previous)
+                    journal.message(now, connection_id, MessageType.CANCEL_ORDER, cancel_message, HEADER_SIZE,
+                                    CANCEL_MESSAGE_SIZE)
+            for client_order_id, side, quote in ((order_id + 1, Side.BUY, price - TICK_SIZE),
+                                                 (order_id + 2, Side.SELL, price + TICK_SIZE)):
+                INSERT_MESSAGE.pack_into(insert_message, HEADER_SIZE, client_order_id, side, quote, 1,
+                                         Lifespan.GOOD_FOR_DAY)
+                journal.message(now, connection_id, MessageType.INSERT_ORDER, insert_message, HEADER_SIZE,
+                                INSERT_MESSAGE_SIZE)
+        order_id += 2
+
+    for connection_id in connection_ids:
+        journal.disconnect(duration, connection_id)
+    journal.close()
+
+
+def end_to_end_match(size: int, repeat: int) -> BenchmarkResult:
+    """Measure a whole match, rebuilt in-process from generated market data and a synthetic input journal.
+
+    The size is the number of market events; eight teams send about 170
+    messages per second between them.
+    """
+    duration: float = size / 50.0
+    names: List[str] = ["Team%d" % i for i in range(1, 9)]
+    config: Dict = {
+        "Engine": {"MarketEventInterval": 0.05, "Speed": 1.0, "TickInterval": 0.25},
+        "Fees": {"Maker": -0.0001, "Taker": 0.0002},
+        "Instrument": {"EtfClamp": 0.002, "TickSize": 1.00},
+        "Limits": {"ActiveOrderCountLimit": 10, "ActiveVolumeLimit": 200, "MessageFrequencyInterval": 1.0,
+                   "MessageFrequencyLimit": 50, "PositionLimit": 100},
+        "Traders": {name: "secret" for name in names}}
+
+    with tempfile.TemporaryDirectory() as directory:
+        _, config["Engine"]["MarketDataFile"] = market_data_files(directory, size)
+        journal_filename: str = os.path.join(directory, "input.jrn")
+        match_events_filename: str = os.path.join(directory, "match_events.csv")
+        write_synthetic_journal(journal_filename, config["Engine"]["MarketDataFile"], duration, names)
+        rate = best_rate(repeat, lambda: rematch(config, journal_filename, match_events_filename)["Records"])
+    return BenchmarkResult(rate, "journal records/s")
+
+
+def competitor_touch(size: int, repeat: int) -> BenchmarkResult:
+    """Measure the attribute reads and writes made when a message from a competitor is handled."""
+    _, nanoseconds = competitors.measure(size, repeat)
+    return BenchmarkResult(1e9 / nanoseconds, "touches/s")
+
+
+# Each benchmark and its default size
+BENCHMARKS: Dict[str, Callable[[int, int], BenchmarkResult]] = {
+    "order_book_mix": order_book_mix,
+    "order_book_top_levels": order_book_top_levels,
+    "order_book_trade_ticks": order_book_trade_ticks,
+    "message_framing": message_framing,
+    "pubsub_round_trip": pubsub_round_trip,
+    "market_events_csv": market_events_csv,
+    "market_events_image": market_events_image,
+    "match_events_writer": match_events_writer,
+    "end_to_end_match": end_to_end_match,
+    "competitor_touch": competitor_touch,
+}
+
+DEFAULT_SIZES: Dict[str, int] = {
+    "order_book_mix": 200000,
+    "order_book_top_levels": 200000,
+    "order_book_trade_ticks": 100000,
+    "message_framing": 200000,
+    "pubsub_round_trip": 100000,
+    "market_events_csv": 100000,
+    "market_events_image": 100000,
+    "match_events_writer": 100000,
+    "end_to_end_match": 20000,
+    "competitor_touch": 10000,
+}
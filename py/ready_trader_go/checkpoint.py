@@ -0,0 +1,154 @@
+# Copyright 2021 Optiver Asia Pacific Pty. Ltd.
+#
+# This file is part of Ready Trader Go.
+#
+#     Ready Trader Go is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU Affero General Public License
+#     as published by the Free Software Foundation, either version 3 of
+#     the License, or (at your option) any later version.
+#
+#     Ready Trader Go is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public
+#     License along with Ready Trader Go.  If not, see
+#     <https://www.gnu.org/licenses/>.
+import asyncio
+import json
+import logging
+import pathlib
+
+from typing import Any, Dict, Iterable, List
+
+from .competitor import Competitor, CompetitorManager
+from .market_events import MarketEventsReader
+from .match_events import MatchEvents
+from .order_book import Order, OrderBook
+from .timer import Timer
+from .types import Lifespan, Side
+
+
+CHECKPOINT_VERSION: int = 1
+
+
+def checkpoint_filename(filename: str, when: float) -> pathlib.Path:
+    """Return the name of the file for the checkpoint at the given time (e.g. checkpoint.600.json)."""
+    path = pathlib.Path(filename)
+    return path.with_name("%s.%d%s" % (path.stem, round(when), path.suffix))
+
+
+class MatchCheckpointer:
+    """Write the state of the exchange simulator to a file at given times during a match.
+
+    A checkpoint holds every resting order in both order books in
+    price-time priority, the number of market events processed and the
+    state of each competitor, so a match can be resumed from that time.
+    Competitors' resting orders are recorded but are not restored when a
+    match is resumed (see restore_match).
+
+    The state is taken on the event loop, exactly as it stands after the
+    market events processed so far, and the file is written by the event
+    loop's default executor.
+    """
+
+    def __init__(self, filename: str, times: Iterable[float], market_data_file: str, future_book: OrderBook,
+                 etf_book: OrderBook, market_events_reader: MarketEventsReader,
+                 competitor_manager: CompetitorManager):
+        """Initialise a new instance of the MatchCheckpointer class."""
+        self.__books: List[OrderBook] = [future_book, etf_book]
+        self.__competitor_manager: CompetitorManager = competitor_manager
+        self.__filename: str = filename
+        self.__logger: logging.Logger = logging.getLogger("CHECKPOINT")
+        self.__market_data_file: str = market_data_file
+        self.__market_events_reader: MarketEventsReader = market_events_reader
+        self.__times: List[float] = sorted(times, reverse=True)
+
+    def on_timer_tick(self, timer: Timer, now: float, _: int) -> None:
+        """Called on each timer tick to write a checkpoint if one is due."""
+        if self.__times and now >= self.__times[-1]:
+            while self.__times and now >= self.__times[-1]:
+                self.__times.pop()
+            self.write(now)
+
+    def to_dict(self, now: float) -> Dict[str, Any]:
+        """Return a representation of the state of the exchange simulator that can be stored as JSON.
+
+        The representation shares no mutable objects with the exchange
+        simulator, so it can be serialised on another thread.
+        """
+        books = list()
+        for book in self.__books:
+            orders = [[o.listener.name if isinstance(o.listener, Competitor) else "", o.client_order_id, o.side,
+                       o.price, o.volume, o.remaining_volume, o.lifespan, o.total_fees] for o in book.resting_orders()]
+            books.append({"LastTradedPrice": book.last_traded_price(), "Orders": orders})
+
+        return {"Version": CHECKPOINT_VERSION, "Time": now, "MarketDataFile": self.__market_data_file,
+                "MarketEventOffset": self.__market_events_reader.processed_event_count(), "OrderBooks": books,
+                "Competitors": {c.name: c.to_dict() for c in self.__competitor_manager.get_competitors()}}
+
+    def write(self, now: float) -> None:
+        """Take a checkpoint for the given time and write it to a file without blocking the event loop."""
+        filename = checkpoint_filename(self.__filename, now)
+        asyncio.get_running_loop().run_in_executor(None, self.write_file, filename, self.to_dict(now))
+
+    def write_file(self, filename: pathlib.Path, state: Dict[str, Any]) -> None:
+        """Write a checkpoint to the named file."""
+        try:
+            with filename.open("w") as checkpoint_file:
+                json.dump(state, checkpoint_file, separators=(",", ":"))
+        except OSError as e:
+            self.__logger.error("failed to write checkpoint: filename='%s'", filename, exc_info=e)
+        else:
+            self.__logger.info("wrote checkpoint: time=%.6f filename='%s'", state["Time"], filename)
+
+
+def restore_match(filename: str, market_data_file: str, future_book: OrderBook, etf_book: OrderBook,
+                  market_events_reader: MarketEventsReader, competitor_manager: CompetitorManager,
+                  match_events: MatchEvents) -> float:
+    """Restore the state of the exchange simulator from a checkpoint and return the match time to resume from.
+
+    Orders belonging to competitors are not restored, because a resumed
+    auto-trader cannot know about them, so the order books resume with only
+    the market's own orders. For the same reason, each competitor's positions
+    are closed at the last traded prices (or midpoint prices, if there have
+    been no trades) with their value moved into its account balance.
+    Restored market orders are recorded as insert events at the time of the
+    checkpoint.
+    """
+    logger = logging.getLogger("CHECKPOINT")
+    with open(filename) as checkpoint_file:
+        state: Dict[str, Any] = json.load(checkpoint_file)
+
+    if state.get("Version") != CHECKPOINT_VERSION:
+        raise Exception("Checkpoint file '%s' has an unsupported version" % filename)
+    if state["MarketDataFile"] != market_data_file:
+        logger.warning("checkpoint was taken with different market data: filename='%s'", state["MarketDataFile"])
+
+    now: float = state["Time"]
+    dropped: int = 0
+    for book, book_state in zip((future_book, etf_book), state["OrderBooks"]):
+        orders: List[Order] = list()
+        for team, order_id, side, price, volume, remaining, lifespan, fees in book_state["Orders"]:
+            if team:
+                dropped += 1
+                continue
+            order = Order(order_id, book.instrument, Lifespan(lifespan), Side(side), price, volume,
+                          market_events_reader)
+            order.remaining_volume = remaining
+            order.total_fees = fees
+            orders.append(order)
+            match_events.insert(now, "", order_id, book.instrument, order.side, remaining, price, order.lifespan)
+        book.restore(book_state["LastTradedPrice"], orders)
+
+    market_events_reader.start_offset = state["MarketEventOffset"]
+    future_price, etf_price = (round(book.last_traded_price() or book.midpoint_price() or 0)
+                               for book in (future_book, etf_book))
+    competitor_manager.restore(state["Competitors"], future_price, etf_price)
+
+    logger.info("restored checkpoint: time=%.6f filename='%s' market_events=%d competitors=%d dropped_orders=%d",
+                now, filename, state["MarketEventOffset"], len(state["Competitors"]), dropped)
+    if dropped:
+        logger.warning("%d resting orders belonging to competitors were not restored", dropped)
+    return now
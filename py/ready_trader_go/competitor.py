@@ -15,14 +15,14 @@
 #     You should have received a copy of the GNU Affero General Public
 #     License along with Ready Trader Go.  If not, see
 #     <https://www.gnu.org/licenses/>.
-import bisect
 import logging
 
-from typing import Any, Callable, Dict, Iterable, List, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
-from .account import AccountFactory, CompetitorAccount
+from .account import ACCOUNT_FIELDS, AccountFactory, CompetitorAccount
 from .match_events import MatchEvents
 from .order_book import IOrderListener, Order, OrderBook, MINIMUM_BID, MAXIMUM_ASK
+from .price_tracker import BestPriceTracker
 from .score_board import ScoreBoardWriter
 from .timer import Timer
 from .types import ICompetitor, IController, IExecutionConnection, Instrument, Lifespan, Side
@@ -31,6 +31,10 @@ from .unhedged_lots import UnhedgedLots, UnhedgedLotsFactory
 
 class Competitor(ICompetitor, IOrderListener):
     """A competitor in the Ready Trader Go competition."""
+    __slots__ = ("account", "active_volume", "active_volume_limit", "buy_prices", "controller", "error_count",
+                 "etf_book", "exec_connection", "future_book", "last_client_order_id", "logger", "match_events",
+                 "message_count", "name", "order_count_limit", "orders", "position_limit", "score_board",
+                 "sell_prices", "status", "tick_size", "unhedged_etf_lots")
 
     def __init__(self, name: str, exec_channel: IExecutionConnection, etf_book: OrderBook, future_book: OrderBook,
                  account: CompetitorAccount, match_events: MatchEvents, score_board: ScoreBoardWriter,
@@ -41,19 +45,21 @@ class Competitor(ICompetitor, IOrderListener):
         self.active_volume: int = 0
         self.active_volume_limit: int = active_volume_limit
         self.controller: IController = controller
+        self.error_count: int = 0
         self.etf_book: OrderBook = etf_book
         self.future_book: OrderBook = future_book
-        self.buy_prices: List[int] = list()
+        self.buy_prices: BestPriceTracker = BestPriceTracker(Side.BUY)
         self.exec_connection: IExecutionConnection = exec_channel
         self.last_client_order_id: int = -1
         self.logger: logging.Logger = logging.getLogger("COMPETITOR")
         self.match_events: MatchEvents = match_events
+        self.message_count: int = 0
         self.order_count_limit: int = order_count_limit
         self.name: str = name
         self.orders: Dict[int, Order] = dict()
         self.position_limit: int = position_limit
         self.score_board: ScoreBoardWriter = score_board
-        self.sell_prices: List[int] = list()
+        self.sell_prices: BestPriceTracker = BestPriceTracker(Side.SELL)
         self.status: str = "OK"
         self.tick_size: int = int(tick_size * 100.0)  # convert tick size to cents
         self.unhedged_etf_lots: UnhedgedLots = unhedged_lots_factory.create(self.on_unhedged_lots_expiry)
@@ -93,9 +99,9 @@ class Competitor(ICompetitor, IOrderListener):
         if order.remaining_volume == 0:
             del self.orders[order.client_order_id]
             if order.side == Side.BUY:
-                self.buy_prices.pop(bisect.bisect(self.buy_prices, order.price) - 1)
+                self.buy_prices.remove(order.price)
             else:
-                self.sell_prices.pop(bisect.bisect(self.sell_prices, -order.price) - 1)
+                self.sell_prices.remove(order.price)
 
     def on_order_cancelled(self, now: float, order: Order, volume_removed: int) -> None:
         """Called when an order is cancelled."""
@@ -108,9 +114,9 @@ class Competitor(ICompetitor, IOrderListener):
 
         del self.orders[order.client_order_id]
         if order.side == Side.BUY:
-            self.buy_prices.pop(bisect.bisect(self.buy_prices, order.price) - 1)
+            self.buy_prices.remove(order.price)
         else:
-            self.sell_prices.pop(bisect.bisect(self.sell_prices, -order.price) - 1)
+            self.sell_prices.remove(order.price)
 
     def on_order_placed(self, now: float, order: Order) -> None:
         """Called when a good-for-day order is placed in the order book."""
@@ -125,9 +131,9 @@ class Competitor(ICompetitor, IOrderListener):
         if order.remaining_volume == 0:
             del self.orders[order.client_order_id]
             if order.side == Side.BUY:
-                self.buy_prices.pop()
+                self.buy_prices.remove(order.price)
             else:
-                self.sell_prices.pop()
+                self.sell_prices.remove(order.price)
 
         self.unhedged_etf_lots.apply_position_delta(volume if order.side == Side.BUY else -volume)
 
@@ -276,17 +282,17 @@ class Competitor(ICompetitor, IOrderListener):
             self.send_error(now, client_order_id, b"order rejected: market not yet open")
             return
 
-        if ((side == Side.BUY and self.sell_prices and price >= -self.sell_prices[-1])
-                or (side == Side.SELL and self.buy_prices and price <= self.buy_prices[-1])):
+        if ((side == Side.BUY and self.sell_prices.crosses(price))
+                or (side == Side.SELL and self.buy_prices.crosses(price))):
             self.send_error(now, client_order_id, b"order rejected: in cross with an existing order")
             return
 
         order = self.orders[client_order_id] = Order(client_order_id, Instrument.ETF, Lifespan(lifespan), Side(side),
                                                      price, volume, self)
         if side == Side.BUY:
-            bisect.insort(self.buy_prices, price)
+            self.buy_prices.add(price)
         else:
-            bisect.insort(self.sell_prices, -price)
+            self.sell_prices.add(price)
         self.match_events.insert(now, self.name, order.client_order_id, order.instrument, order.side, order.volume,
                                  order.price, order.lifespan)
         self.active_volume += volume
@@ -295,11 +301,44 @@ class Competitor(ICompetitor, IOrderListener):
     def on_timer_tick(self, now: float, future_price: int, etf_price: int) -> None:
         """Called on each timer tick to update the auto-trader."""
         self.account.update(future_price or 0, etf_price or 0)
+        self.write_score(now, future_price, etf_price)
+
+    def write_score(self, now: float, future_price: int, etf_price: int) -> None:
+        """Write this competitor's current score to the score board."""
         self.score_board.tick(now, self.name, self.account, etf_price, future_price, self.status)
 
+    def restore(self, state: Dict[str, Any], future_price: int, etf_price: int) -> None:
+        """Restore this competitor's account, status and message times from a checkpoint.
+
+        Orders and positions are not restored because the auto-trader cannot
+        know about orders sent, or lots traded, before the match was resumed.
+        Instead, both positions are closed at the given prices, moving their
+        value into the account balance, so the auto-trader starts flat with
+        the profit or loss it had and no unhedged lots.
+        """
+        for field, value in zip(ACCOUNT_FIELDS, state["Account"]):
+            setattr(self.account, field, value)
+        if self.account.etf_position or self.account.future_position:
+            etf_position, future_position, balance = (self.account.etf_position, self.account.future_position,
+                                                      self.account.account_balance)
+            self.account.flatten(future_price, etf_price)
+            self.logger.info("'%s' closed restored positions: etf=%d future=%d value=%d", self.name, etf_position,
+                             future_position, self.account.account_balance - balance)
+        self.status = state["Status"]
+        if self.exec_connection is not None:
+            self.exec_connection.restore_message_times(state["MessageTimes"])
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return a representation of this competitor's state that can be stored as JSON."""
+        return {"Account": [getattr(self.account, f) for f in ACCOUNT_FIELDS],
+                "MessageTimes": self.exec_connection.message_times() if self.exec_connection is not None else [],
+                "Status": self.status,
+                "UnhedgedLots": [self.unhedged_etf_lots.relative_position, self.unhedged_etf_lots.deadline()]}
+
     def send_error(self, now: float, client_order_id: int, message: bytes) -> None:
         """Send an error message to the auto-trader and shut down the match."""
         self.exec_connection.send_error(client_order_id, message)
+        self.error_count += 1
         self.logger.info("'%s' sent error message: time=%.6f client_order_id=%s message='%s'", self.name, now,
                          client_order_id, message.decode())
 
@@ -317,8 +356,13 @@ class CompetitorManager:
                  etf_book: OrderBook, future_book: OrderBook, match_events: MatchEvents,
                  score_board_writer: ScoreBoardWriter, tick_size: float, timer: Timer,
                  unhedged_lots_factory: UnhedgedLotsFactory):
-        """Initialise a new instance of the CompetitorManager class."""
+        """Initialise a new instance of the CompetitorManager class.
+
+        If the account factory also provides an update method (as an
+        AccountStore does), all accounts are updated together on each tick.
+        """
         self.__account_factory: AccountFactory = account_factory
+        self.__account_updater: Optional[Callable[[int, int], None]] = getattr(account_factory, "update", None)
         self.__active_volume_limit: int = limits_config["ActiveVolumeLimit"]
         self.__competitors: Dict[str, Competitor] = dict()
         self.__etf_book: OrderBook = etf_book
@@ -327,6 +371,8 @@ class CompetitorManager:
         self.__match_events: MatchEvents = match_events
         self.__order_count_limit: int = limits_config["ActiveOrderCountLimit"]
         self.__position_limit: int = limits_config["PositionLimit"]
+        self.__restored_prices: Tuple[int, int] = (0, 0)
+        self.__restored_states: Dict[str, Dict[str, Any]] = dict()
         self.__score_board_writer: ScoreBoardWriter = score_board_writer
         self.__start_time: float = 0.0
         self.__traders: Dict[str, str] = traders_config
@@ -334,6 +380,7 @@ class CompetitorManager:
         self.__tick_size: float = tick_size
 
         self.active_competitor_count: int = 0
+        self.all_competitors_logged_in: List[Callable[[], None]] = list()
         self.controller: Optional[IController] = None
         self.competitor_logged_in: List[Callable[[str], None]] = list()
 
@@ -356,14 +403,30 @@ class CompetitorManager:
                                 self.__tick_size, self.__unhedged_lots_factory, self.controller)
         self.__competitors[name] = competitor
 
+        if name in self.__restored_states:
+            competitor.restore(self.__restored_states.pop(name), *self.__restored_prices)
+
         if self.__start_time != 0.0:
             self.__logger.warning("competitor logged in after market open: name='%s'", name)
 
         for callback in self.competitor_logged_in:
             callback(name)
 
+        if len(self.__competitors) == len(self.__traders):
+            for callback in self.all_competitors_logged_in:
+                callback()
+
         return competitor
 
+    def restore(self, states: Dict[str, Dict[str, Any]], future_price: int, etf_price: int) -> None:
+        """Restore the state of each competitor from a checkpoint once it logs in.
+
+        Restored positions are closed at the given future and ETF prices (see
+        Competitor.restore).
+        """
+        self.__restored_prices = (future_price, etf_price)
+        self.__restored_states.update(states)
+
     def on_competitor_connect(self) -> None:
         """Notify this competitor manager that a competitor has connected."""
         self.active_competitor_count += 1
@@ -385,8 +448,13 @@ class CompetitorManager:
         """Called on each timer tick."""
         etf_price = self.__etf_book.last_traded_price()
         future_price = self.__future_book.last_traded_price()
-        for competitor in self.__competitors.values():
-            competitor.on_timer_tick(now, future_price, etf_price)
+        if self.__account_updater is None:
+            for competitor in self.__competitors.values():
+                competitor.on_timer_tick(now, future_price, etf_price)
+        else:
+            self.__account_updater(future_price or 0, etf_price or 0)
+            for competitor in self.__competitors.values():
+                competitor.write_score(now, future_price, etf_price)
 
         if self.active_competitor_count == 0:
             timer.shutdown(now, "no remaining competitors")
@@ -18,13 +18,14 @@
 import asyncio
 import logging
 
-from typing import Any, Optional
+from typing import Any, Callable, List, Optional
 
 from .execution import ExecutionServer
 from .heads_up import HeadsUpDisplayServer
 from .information import InformationPublisher
 from .market_events import MarketEventsReader
 from .match_events import MatchEventsWriter
+from .metrics import MetricsServer
 from .score_board import ScoreBoardWriter
 from .timer import Timer
 from .types import IController
@@ -38,7 +39,10 @@ class Controller(IController):
                  score_board_writer: ScoreBoardWriter, market_timer: Timer, tick_timer: Timer):
         """Initialise a new instance of the Controller class."""
         self.heads_up_display_server: Optional[HeadsUpDisplayServer] = None
+        self.metrics_server: Optional[MetricsServer] = None
 
+        self.__awaiting_competitors: bool = True
+        self.__awaiting_heads_up_display: bool = False
         self.__done: bool = False
         self.__execution_server: ExecutionServer = exec_server
         self.__information_publisher: InformationPublisher = info_publisher
@@ -47,9 +51,14 @@ class Controller(IController):
         self.__market_open_delay: float = market_open_delay
         self.__market_timer: Timer = market_timer
         self.__match_events_writer = match_events_writer
+        self.__ready: asyncio.Event = asyncio.Event()
         self.__score_board_writer = score_board_writer
+        self.__start_time: float = 0.0
         self.__tick_timer: Timer = tick_timer
 
+        # Signals
+        self.servers_started: List[Callable[[Any], None]] = list()
+
         # Connect signals
         self.__match_events_writer.task_complete.append(self.on_task_complete)
         self.__market_events_reader.task_complete.append(self.on_task_complete)
@@ -72,6 +81,26 @@ class Controller(IController):
         if self.__score_board_writer:
             self.__score_board_writer.finish()
 
+    def expect_heads_up_display(self) -> None:
+        """Keep the market closed until a heads-up display has connected (or the market open delay has passed)."""
+        self.__awaiting_heads_up_display = True
+
+    def resume_from(self, start_time: float) -> None:
+        """Open the market at the given match time, rather than zero, to resume a match from a checkpoint."""
+        self.__start_time = start_time
+
+    def on_all_competitors_logged_in(self) -> None:
+        """Called when every auto-trader listed in the configuration has logged in."""
+        self.__awaiting_competitors = False
+        if not self.__awaiting_heads_up_display:
+            self.__ready.set()
+
+    def on_heads_up_display_connected(self) -> None:
+        """Called when a heads-up display connects."""
+        self.__awaiting_heads_up_display = False
+        if not self.__awaiting_competitors:
+            self.__ready.set()
+
     def on_market_timer_ticked(self, timer: Timer, now: float, _: int):
         """Called when it is time to process market events."""
         self.__market_events_reader.process_market_events(now)
@@ -107,15 +136,26 @@ class Controller(IController):
         await self.__information_publisher.start()
         if self.heads_up_display_server:
             await self.heads_up_display_server.start()
+        if self.metrics_server:
+            await self.metrics_server.start()
 
         self.__market_events_reader.start()
         self.__match_events_writer.start()
         self.__score_board_writer.start()
 
-        # Give the auto-traders time to start up and connect
-        await asyncio.sleep(self.__market_open_delay)
+        for callback in self.servers_started:
+            callback(self)
+
+        # Open the market once every auto-trader has logged in, but wait no longer than the market open delay
+        try:
+            await asyncio.wait_for(self.__ready.wait(), self.__market_open_delay)
+        except asyncio.TimeoutError:
+            self.__logger.info("market open delay passed before the match was ready")
+
+        # Market events are taken on the event loop, so wait until that will not block it
+        await self.__market_events_reader.wait_until_ready()
         # self.__execution_server.close()
 
-        self.__logger.info("market open")
-        self.__market_timer.start()
-        self.__tick_timer.start()
+        self.__logger.info("market open: time=%.6f", self.__start_time)
+        self.__market_timer.start(self.__start_time)
+        self.__tick_timer.start(self.__start_time)
@@ -15,24 +15,33 @@
 #     You should have received a copy of the GNU Affero General Public
 #     License along with Ready Trader Go.  If not, see
 #     <https://www.gnu.org/licenses/>.
+import random
 import socket
 
+from typing import Any, Optional
+
 from .account import AccountFactory
 from .application import Application
+from .checkpoint import MatchCheckpointer, restore_match
 from .competitor import CompetitorManager
 from .controller import Controller
 from .execution import ExecutionServer
+from .feed import FeedRecorder
 from .heads_up import HeadsUpDisplayServer
 from .information import InformationPublisher
+from .journal import InputJournal
 from .limiter import FrequencyLimiterFactory
+from .market_data_cache import ImageMarketEventsReader, SharedMarketEventsReader, is_market_data_image
 from .market_events import MarketEventsReader
 from .match_events import MatchEvents, MatchEventsWriter
+from .metrics import ExchangeMetrics, MetricsServer
 from .order_book import OrderBook
 from .pubsub import PublisherFactory
 from .score_board import ScoreBoardWriter
 from .timer import Timer
+from .timer_wheel import TimerWheel
 from .types import Instrument
-from .unhedged_lots import UnhedgedLotsFactory
+from .unhedged_lots import UNHEDGED_LOTS_CLOCKS, UnhedgedLotsFactory, unhedged_lots_time_limit
 
 
 def __validate_hostname(config, section, key):
@@ -70,10 +79,31 @@ def __exchange_config_validator(config):
                                          "MessageFrequencyLimit", "PositionLimit"), (int, int, float, int, int))
     __validate_hostname(config, "Execution", "Host")
 
+    for key in ("SharedMarketData", "VectorisedAccounts"):
+        if key in config["Engine"] and type(config["Engine"][key]) is not bool:
+            raise Exception("Element of inappropriate type in Engine configuration")
+    if "Seed" in config["Engine"] and type(config["Engine"]["Seed"]) is not int:
+        raise Exception("Element of inappropriate type in Engine configuration")
+    if config["Engine"].get("UnhedgedLotsClock", "wall") not in UNHEDGED_LOTS_CLOCKS:
+        raise Exception("Engine.UnhedgedLotsClock configuration should be one of: %s" % ", ".join(UNHEDGED_LOTS_CLOCKS))
+    for key in ("CheckpointFile", "InformationFeedFile", "InputJournalFile"):
+        if key in config["Engine"] and type(config["Engine"][key]) is not str:
+            raise Exception("Element of inappropriate type in Engine configuration")
+    if "CheckpointTimes" in config["Engine"] and (type(config["Engine"]["CheckpointTimes"]) is not list or any(
+            type(t) not in (int, float) for t in config["Engine"]["CheckpointTimes"])):
+        raise Exception("Engine.CheckpointTimes configuration should be a list of numbers")
+
     if "Hud" in config:
         __validate_object(config, "Hud", ("Host", "Port"), (str, int))
         __validate_hostname(config, "Hud", "Host")
 
+    if "Metrics" in config:
+        if type(config["Metrics"]) is dict and "Path" in config["Metrics"]:
+            __validate_object(config, "Metrics", ("Path",), (str,))
+        else:
+            __validate_object(config, "Metrics", ("Host", "Port"), (str, int))
+            __validate_hostname(config, "Metrics", "Host")
+
     if type(config["Traders"]) is not dict:
         raise Exception("Traders configuration should be a JSON object")
     if any(type(k) is not str for k in config["Traders"]):
@@ -84,7 +114,7 @@ def __exchange_config_validator(config):
     return True
 
 
-def setup(app: Application) -> Controller:
+def setup(app: Application, wait_for_heads_up_display: bool = False, resume_from: Optional[str] = None) -> Controller:
     """Setup the exchange simulator."""
     engine = app.config["Engine"]
     exec_ = app.config["Execution"]
@@ -97,40 +127,109 @@ def setup(app: Application) -> Controller:
 
     match_events = MatchEvents()
     match_events_writer = MatchEventsWriter(match_events, engine["MatchEventsFile"], app.event_loop)
-    market_events_reader = MarketEventsReader(engine["MarketDataFile"], app.event_loop, future_book, etf_book,
-                                              match_events)
+    if engine.get("SharedMarketData", False):
+        reader_class = SharedMarketEventsReader
+    elif is_market_data_image(engine["MarketDataFile"]):
+        reader_class = ImageMarketEventsReader
+    else:
+        reader_class = MarketEventsReader
+    market_events_reader = reader_class(engine["MarketDataFile"], app.event_loop, future_book, etf_book, match_events)
     score_board_writer = ScoreBoardWriter(engine["ScoreBoardFile"], app.event_loop)
 
-    tick_timer = Timer(engine["TickInterval"], engine["Speed"])
-    account_factory = AccountFactory(instrument["EtfClamp"], instrument["TickSize"])
-    unhedged_lots_factory = UnhedgedLotsFactory()
+    # Each timer has its own random number generator so that, given a seed, its jitter is the same in every run
+    seed: Optional[int] = engine.get("Seed")
+    tick_random = random.Random("%d/tick" % seed) if seed is not None else None
+    market_random = random.Random("%d/market" % seed) if seed is not None else None
+
+    tick_timer = Timer(engine["TickInterval"], engine["Speed"], tick_random)
+    journal: Optional[InputJournal] = None
+    if "InputJournalFile" in engine:
+        journal = InputJournal(engine["InputJournalFile"])
+        tick_timer.timer_ticked.append(journal.on_timer_tick)
+        tick_timer.timer_stopped.append(journal.on_timer_stopped)
+    match_timers = TimerWheel(engine["TickInterval"], tick_timer.advance)
+    tick_timer.timer_ticked.append(match_timers.on_timer_tick)
+    if engine.get("VectorisedAccounts", False):
+        # NumPy is only needed for vectorised accounts
+        from .account_store import AccountStore
+        account_factory = AccountStore(instrument["EtfClamp"], instrument["TickSize"])
+    else:
+        account_factory = AccountFactory(instrument["EtfClamp"], instrument["TickSize"])
+    time_limit: float = unhedged_lots_time_limit(engine.get("UnhedgedLotsClock", "wall"), engine["Speed"])
+    unhedged_lots_factory = UnhedgedLotsFactory(match_timers, time_limit)
     competitor_manager = CompetitorManager(app.config["Limits"], app.config["Traders"], account_factory, etf_book,
                                            future_book, match_events, score_board_writer, instrument["TickSize"],
                                            tick_timer, unhedged_lots_factory)
 
     limiter_factory = FrequencyLimiterFactory(limits["MessageFrequencyInterval"] / engine["Speed"],
                                               limits["MessageFrequencyLimit"])
-    exec_server = ExecutionServer(exec_["Host"], exec_["Port"], competitor_manager, limiter_factory)
+    exec_server = ExecutionServer(exec_["Host"], exec_["Port"], competitor_manager, limiter_factory, journal)
+    feed_recorder: Optional[FeedRecorder] = None
+    if "InformationFeedFile" in engine:
+        feed_recorder = FeedRecorder(engine["InformationFeedFile"], tick_timer.advance)
+        tick_timer.timer_stopped.append(feed_recorder.on_timer_stopped)
     info_publisher = InformationPublisher(app.event_loop, PublisherFactory(info["Type"], info["Name"]),
-                                          (future_book, etf_book), tick_timer)
+                                          (future_book, etf_book), tick_timer, feed_recorder)
 
-    market_timer = Timer(engine["MarketEventInterval"], engine["Speed"])
+    market_timer = Timer(engine["MarketEventInterval"], engine["Speed"], market_random)
+    if journal is not None:
+        market_timer.timer_ticked.append(journal.on_market_timer_tick)
     controller = Controller(engine["MarketOpenDelay"], exec_server, info_publisher, market_events_reader,
                             match_events_writer, score_board_writer, market_timer, tick_timer)
     competitor_manager.controller = controller
+    competitor_manager.all_competitors_logged_in.append(controller.on_all_competitors_logged_in)
     exec_server.controller = controller
 
     if "Hud" in app.config:
         hud_server = HeadsUpDisplayServer(app.config["Hud"]["Host"], app.config["Hud"]["Port"], match_events,
-                                          competitor_manager, controller)
+                                          competitor_manager, controller, (future_book, etf_book), tick_timer)
+        hud_server.heads_up_display_connected.append(controller.on_heads_up_display_connected)
         controller.heads_up_display_server = hud_server
+        if wait_for_heads_up_display:
+            controller.expect_heads_up_display()
+
+    if "Metrics" in app.config:
+        metrics = ExchangeMetrics(competitor_manager, (future_book, etf_book), market_events_reader,
+                                  match_events_writer, {"market": market_timer, "tick": tick_timer})
+        if app.loop_monitor is not None:
+            app.loop_monitor.metrics_reported.append(metrics.on_loop_metrics)
+        metrics_config = app.config["Metrics"]
+        controller.metrics_server = MetricsServer(metrics, metrics_config.get("Host"), metrics_config.get("Port"),
+                                                  metrics_config.get("Path"))
+
+    start_time: float = 0.0
+    if resume_from is not None:
+        start_time = restore_match(resume_from, engine["MarketDataFile"], future_book, etf_book, market_events_reader,
+                                   competitor_manager, match_events)
+        controller.resume_from(start_time)
+
+    if engine.get("CheckpointTimes"):
+        checkpointer = MatchCheckpointer(engine.get("CheckpointFile", "checkpoint.json"),
+                                         (t for t in engine["CheckpointTimes"] if t > start_time),
+                                         engine["MarketDataFile"], future_book, etf_book, market_events_reader,
+                                         competitor_manager)
+        tick_timer.timer_ticked.append(checkpointer.on_timer_tick)
+
+    if app.loop_monitor is not None:
+        app.loop_monitor.watch_timer("market", market_timer)
+        app.loop_monitor.watch_timer("tick", tick_timer)
 
     app.event_loop.create_task(controller.start())
     return controller
 
 
-def main():
+def main(ready: Optional[Any] = None, wait_for_heads_up_display: bool = False, resume_from: Optional[str] = None):
+    """Run the exchange simulator.
+
+    If given, the ready object's set method is called once the exchange
+    simulator is accepting connections. If wait_for_heads_up_display is True
+    the market does not open until a heads-up display has connected (or the
+    market open delay has passed). If resume_from is given, the match is
+    resumed from the checkpoint in that file.
+    """
     app = Application("exchange", __exchange_config_validator)
-    controller: Controller = setup(app)
+    controller: Controller = setup(app, wait_for_heads_up_display, resume_from)
+    if ready is not None:
+        controller.servers_started.append(lambda _: ready.set())
     app.run()
     controller.cleanup()
@@ -17,10 +17,12 @@
 #     <https://www.gnu.org/licenses/>.
 import asyncio
 import logging
+import time
 
-from typing import Optional
+from typing import List, Optional
 
 from .competitor import Competitor, CompetitorManager
+from .journal import InputJournal
 from .limiter import FrequencyLimiter, FrequencyLimiterFactory
 from .messages import (AMEND_MESSAGE, AMEND_MESSAGE_SIZE, CANCEL_MESSAGE, CANCEL_MESSAGE_SIZE,
                        ERROR_MESSAGE, ERROR_MESSAGE_SIZE, HEADER, HEADER_SIZE, HEDGE_FILLED_MESSAGE,
@@ -28,22 +30,34 @@ from .messages import (AMEND_MESSAGE, AMEND_MESSAGE_SIZE, CANCEL_MESSAGE, CANCEL
                        INSERT_MESSAGE_SIZE, LOGIN_MESSAGE, LOGIN_MESSAGE_SIZE, ORDER_FILLED_MESSAGE,
                        ORDER_FILLED_MESSAGE_SIZE, ORDER_STATUS_MESSAGE, ORDER_STATUS_MESSAGE_SIZE,
                        Connection, MessageType)
+from .timer_wheel import TimerWheel, WheelTimer
 from .types import IController, IExecutionConnection
 
 
+LOGIN_TIMEOUT: float = 1.0
+LOGIN_TIMER_RESOLUTION: float = 0.1
+
+
 class ExecutionConnection(Connection, IExecutionConnection):
+    """A connection to an auto-trader's execution channel."""
+    __slots__ = ("__error_message", "__hedge_filled_message", "__order_filled_message", "__order_status_message",
+                 "closing", "competitor", "competitor_manager", "connection_id", "controller", "frequency_limiter",
+                 "journal", "logger", "login_timeout")
+
     def __init__(self, competitor_manager: CompetitorManager, frequency_limiter: FrequencyLimiter,
-                 controller: IController):
+                 controller: IController, login_timers: TimerWheel, journal: Optional[InputJournal] = None):
         """Initialise a new instance of the ExecutionChannel class."""
         Connection.__init__(self)
 
         self.competitor: Optional[Competitor] = None
+        self.connection_id: int = 0
         self.competitor_manager: CompetitorManager = competitor_manager
         self.controller: IController = controller
         self.closing: bool = False
         self.frequency_limiter: FrequencyLimiter = frequency_limiter
+        self.journal: Optional[InputJournal] = journal
         self.logger: logging.Logger = logging.getLogger("EXECUTION")
-        self.login_timeout: asyncio.Handle = asyncio.get_running_loop().call_later(1.0, self.close)
+        self.login_timeout: WheelTimer = login_timers.call_later(LOGIN_TIMEOUT, self.close)
 
         self.__error_message = bytearray(ERROR_MESSAGE_SIZE)
         self.__hedge_filled_message = bytearray(HEDGE_FILLED_MESSAGE_SIZE)
@@ -72,8 +86,11 @@ class ExecutionConnection(Connection, IExecutionConnection):
         Connection.connection_lost(self, exc)
 
         self.login_timeout.cancel()
+        now: float = self.controller.advance_time()
+        if self.journal is not None:
+            self.journal.disconnect(now, self.connection_id)
         if self.competitor is not None:
-            self.competitor.on_connection_lost(self.controller.advance_time())
+            self.competitor.on_connection_lost(now)
         self.competitor_manager.on_competitor_disconnect()
         if not self.closing:
             self.logger.warning("fd=%d lost connection to auto-trader:", self._file_number, exc_info=exc)
@@ -81,11 +98,19 @@ class ExecutionConnection(Connection, IExecutionConnection):
     def connection_made(self, transport: asyncio.transports.BaseTransport) -> None:
         """Called when the connection is established."""
         Connection.connection_made(self, transport)
+        if self.journal is not None:
+            self.connection_id = self.journal.connect(self.controller.advance_time())
         self.competitor_manager.on_competitor_connect()
 
+    def message_times(self) -> List[float]:
+        """Return the times of the messages counted towards the message frequency limit."""
+        return list(self.frequency_limiter.events)
+
     def on_message(self, typ: int, data: bytes, start: int, length: int) -> None:
         """Called when a message is received from the auto-trader."""
         now: float = self.controller.advance_time()
+        if self.journal is not None:
+            self.journal.message(now, self.connection_id, typ, data, start, length)
 
         if self.frequency_limiter.check_event(now):
             self.logger.info("fd=%d message frequency limit breached: now=%.6f value=%d limit=%d",
@@ -105,6 +130,8 @@ class ExecutionConnection(Connection, IExecutionConnection):
                 self.close()
             return
 
+        self.competitor.message_count += 1
+
         if typ == MessageType.AMEND_ORDER and length == AMEND_MESSAGE_SIZE:
             self.competitor.on_amend_message(now, *AMEND_MESSAGE.unpack_from(data, start))
         elif typ == MessageType.CANCEL_ORDER and length == CANCEL_MESSAGE_SIZE:
@@ -134,6 +161,10 @@ class ExecutionConnection(Connection, IExecutionConnection):
 
         self.logger.info("fd=%d '%s' is ready!", self._file_number, name)
 
+    def restore_message_times(self, message_times: List[float]) -> None:
+        """Restore the times of the messages counted towards the message frequency limit from a checkpoint."""
+        self.frequency_limiter.restore(message_times)
+
     def send_error(self, client_order_id: int, error_message: bytes) -> None:
         """Send an error message to the auto-trader."""
         ERROR_MESSAGE.pack_into(self.__error_message, HEADER_SIZE, client_order_id, error_message)
@@ -160,24 +191,52 @@ class ExecutionConnection(Connection, IExecutionConnection):
 class ExecutionServer:
     """A server for execution connections."""
     def __init__(self, host: str, port: int, competitor_manager: CompetitorManager,
-                 limiter_factory: FrequencyLimiterFactory):
+                 limiter_factory: FrequencyLimiterFactory, journal: Optional[InputJournal] = None):
         """Initialise a new instance of the ExecutionServer class."""
         self.controller: Optional[IController] = None
         self.host: str = host
         self.port: int = port
 
         self.__competitor_manager: CompetitorManager = competitor_manager
+        self.__journal: Optional[InputJournal] = journal
         self.__limiter_factory: FrequencyLimiterFactory = limiter_factory
         self.__logger = logging.getLogger("EXECUTION")
+        self.__login_timer_handle: Optional[asyncio.TimerHandle] = None
+        self.__login_timers: TimerWheel = TimerWheel(LOGIN_TIMER_RESOLUTION, time.monotonic)
         self.__server: Optional[asyncio.AbstractServer] = None
 
     def close(self):
-        """Close the server without affecting existing connections."""
+        """Close the server without affecting existing connections.
+
+        Connections which have not yet logged in are no longer closed when
+        their login timeout expires.
+        """
         self.__server.close()
+        if self.__login_timer_handle:
+            self.__login_timer_handle.cancel()
+            self.__login_timer_handle = None
 
     def __on_new_connection(self) -> ExecutionConnection:
         """Callback for when a new connection is accepted."""
-        return ExecutionConnection(self.__competitor_manager, self.__limiter_factory.create(), self.controller)
+        connection = ExecutionConnection(self.__competitor_manager, self.__limiter_factory.create(), self.controller,
+                                         self.__login_timers, self.__journal)
+        if self.__login_timer_handle is None:
+            self.__login_timer_handle = asyncio.get_running_loop().call_later(LOGIN_TIMER_RESOLUTION,
+                                                                              self.__on_login_timer_tick)
+        return connection
+
+    def __on_login_timer_tick(self) -> None:
+        """Close any connections which have not logged in in time.
+
+        The tick stops once no logins are pending and is started again when
+        the next connection is accepted.
+        """
+        self.__login_timers.advance(time.monotonic())
+        if self.__login_timers.empty():
+            self.__login_timer_handle = None
+        else:
+            self.__login_timer_handle = asyncio.get_running_loop().call_later(LOGIN_TIMER_RESOLUTION,
+                                                                              self.__on_login_timer_tick)
 
     async def start(self) -> None:
         """Start the server."""
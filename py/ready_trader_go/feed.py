@@ -0,0 +1,168 @@
+# Copyright 2021 Optiver Asia Pacific Pty. Ltd.
+#
+# This file is part of Ready Trader Go.
+#
+#     Ready Trader Go is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU Affero General Public License
+#     as published by the Free Software Foundation, either version 3 of
+#     the License, or (at your option) any later version.
+#
+#     Ready Trader Go is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public
+#     License along with Ready Trader Go.  If not, see
+#     <https://www.gnu.org/licenses/>.
+import asyncio
+import logging
+import struct
+
+from typing import Any, BinaryIO, Callable, Iterator, Optional, Tuple, Union
+
+from .application import Application
+from .pubsub import PublisherFactory
+from .stand_in import StandInExecutionServer
+
+
+FEED_HEADER = struct.Struct("<8sI")  # magic, version
+FEED_MAGIC: bytes = b"RTGIFEED"
+FEED_VERSION: int = 1
+RECORD_HEADER = struct.Struct("<dH")  # Match time and datagram length
+
+
+class FeedRecorder:
+    """A recorder of the datagrams sent by the information publisher."""
+
+    def __init__(self, filename: str, clock: Callable[[], float]):
+        """Initialise a new instance of the FeedRecorder class."""
+        self.filename: str = filename
+
+        self.__clock: Callable[[], float] = clock
+        self.__file: Optional[BinaryIO] = open(filename, "wb")
+        self.__logger: logging.Logger = logging.getLogger("FEED")
+
+        self.__file.write(FEED_HEADER.pack(FEED_MAGIC, FEED_VERSION))
+
+    def close(self) -> None:
+        """Close this recorder."""
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+            self.__logger.info("closed information feed recording: filename='%s'", self.filename)
+
+    def on_timer_stopped(self, timer: Any, now: float) -> None:
+        """Close this recorder when the match ends."""
+        self.close()
+
+    def record(self, datagram: Union[bytearray, bytes]) -> None:
+        """Record a datagram."""
+        if self.__file is not None:
+            self.__file.write(RECORD_HEADER.pack(self.__clock(), len(datagram)))
+            self.__file.write(datagram)
+
+
+def read_feed(filename: str) -> Iterator[Tuple[float, bytes]]:
+    """Yield the match time and datagram of each record in an information feed recording."""
+    with open(filename, "rb") as feed:
+        magic, version = FEED_HEADER.unpack(feed.read(FEED_HEADER.size))
+        if magic != FEED_MAGIC or version != FEED_VERSION:
+            raise Exception("'%s' is not an information feed recording of a supported version" % filename)
+
+        header_size: int = RECORD_HEADER.size
+        while True:
+            header: bytes = feed.read(header_size)
+            if len(header) < header_size:
+                return
+            now, length = RECORD_HEADER.unpack(header)
+            yield now, feed.read(length)
+
+
+class FeedPlayer:
+    """A player which publishes a recorded information feed to a fresh information channel.
+
+    With a speed of zero, the datagrams are published as quickly as
+    possible, but subscribers which cannot keep up will miss some of them.
+    """
+
+    def __init__(self, filename: str, publisher_factory: PublisherFactory, speed: float):
+        """Initialise a new instance of the FeedPlayer class."""
+        self.datagram_count: int = 0
+        self.duration: float = 0.0
+        self.filename: str = filename
+
+        self.__logger: logging.Logger = logging.getLogger("FEED")
+        self.__publisher: Optional[asyncio.WriteTransport] = None
+        self.__publisher_factory: PublisherFactory = publisher_factory
+        self.__speed: float = speed
+
+    async def play(self) -> None:
+        """Publish the recorded datagrams, keeping their timing at the given speed."""
+        loop = asyncio.get_running_loop()
+        publisher = self.__publisher
+        speed: float = self.__speed
+        start: float = loop.time()
+        first: Optional[float] = None
+
+        self.__logger.info("playing information feed: filename='%s' speed=%g", self.filename, speed)
+        for now, datagram in read_feed(self.filename):
+            if first is None:
+                first = now
+            if speed > 0.0:
+                delay: float = start + (now - first) / speed - loop.time()
+                if delay > 0.0:
+                    await asyncio.sleep(delay)
+            else:
+                # Let other tasks run, such as the stand-in execution server
+                await asyncio.sleep(0.0)
+            publisher.write(datagram)
+            self.datagram_count += 1
+
+        self.duration = loop.time() - start
+        self.__logger.info("played information feed: datagrams=%d seconds=%.6f", self.datagram_count, self.duration)
+
+    def start(self) -> None:
+        """Create the information channel."""
+        self.__publisher = self.__publisher_factory.create(asyncio.BaseProtocol())
+
+
+def __feed_player_config_validator(config):
+    """Return True if the specified config is valid, otherwise raise an exception."""
+    if type(config) is not dict or any(type(config.get(k)) is not dict for k in ("Execution", "Information")):
+        raise Exception("Configuration should include Execution and Information objects")
+    return True
+
+
+async def __play(app: Application, filename: str, speed: float, ready: Optional[Any]) -> Tuple[int, float]:
+    """Start the stand-in execution server and play the feed once an auto-trader has logged in."""
+    exec_ = app.config["Execution"]
+    info = app.config["Information"]
+
+    logged_in = asyncio.Event()
+    server = StandInExecutionServer(exec_["Host"], exec_["Port"])
+    server.auto_trader_logged_in.append(lambda _: logged_in.set())
+    player = FeedPlayer(filename, PublisherFactory(info["Type"], info["Name"]), speed)
+
+    player.start()
+    await server.start()
+    if ready is not None:
+        ready.set()
+
+    await logged_in.wait()
+    try:
+        await player.play()
+    finally:
+        server.close()
+    return player.datagram_count, player.duration
+
+
+def main(filename: str, speed: float = 1.0, ready: Optional[Any] = None) -> Tuple[int, float]:
+    """Play an information feed recording to auto-traders and return the datagram count and duration.
+
+    The Execution and Information settings are taken from the exchange
+    simulator's configuration. If given, the ready object's set method is
+    called once auto-traders can connect.
+    """
+    app = Application("exchange", __feed_player_config_validator, "feed_player")
+    return app.event_loop.run_until_complete(__play(app, filename, speed, ready))
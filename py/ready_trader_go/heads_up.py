@@ -17,32 +17,58 @@
 #     <https://www.gnu.org/licenses/>.
 import asyncio
 import logging
+import struct
 
-from typing import Dict, Optional
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
-from .competitor import CompetitorManager
+from .competitor import Competitor, CompetitorManager
 from .match_events import MatchEvent, MatchEventOperation, MatchEvents
 from .messages import (AMEND_MESSAGE, AMEND_MESSAGE_SIZE, CANCEL_MESSAGE, CANCEL_MESSAGE_SIZE,
                        ERROR_MESSAGE, ERROR_MESSAGE_SIZE, HEADER, HEADER_SIZE, INSERT_MESSAGE,
                        INSERT_MESSAGE_SIZE, LOGIN_MESSAGE, LOGIN_MESSAGE_SIZE,
-                       AMEND_EVENT_MESSAGE, AMEND_EVENT_MESSAGE_SIZE, CANCEL_EVENT_MESSAGE, CANCEL_EVENT_MESSAGE_SIZE,
+                       ACCOUNT_SNAPSHOT_EVENT_MESSAGE, ACCOUNT_SNAPSHOT_EVENT_MESSAGE_SIZE,
+                       AMEND_EVENT_MESSAGE, AMEND_EVENT_MESSAGE_SIZE, BOOK_SNAPSHOT_EVENT_HEADER,
+                       BOOK_SNAPSHOT_EVENT_HEADER_SIZE, CANCEL_EVENT_MESSAGE, CANCEL_EVENT_MESSAGE_SIZE,
                        INSERT_EVENT_MESSAGE, INSERT_EVENT_MESSAGE_SIZE, HEDGE_EVENT_MESSAGE, HEDGE_EVENT_MESSAGE_SIZE,
-                       LOGIN_EVENT_MESSAGE, LOGIN_EVENT_MESSAGE_SIZE,
-                       TRADE_EVENT_MESSAGE, TRADE_EVENT_MESSAGE_SIZE, Connection, MessageType)
+                       LOGIN_EVENT_MESSAGE, LOGIN_EVENT_MESSAGE_SIZE, RESYNC_EVENT_MESSAGE, RESYNC_EVENT_MESSAGE_SIZE,
+                       SNAPSHOT_SUBSCRIBE_MESSAGE, SNAPSHOT_SUBSCRIBE_MESSAGE_SIZE, TRADE_EVENT_MESSAGE,
+                       TRADE_EVENT_MESSAGE_SIZE, Connection, MessageType, ResyncPhase)
+from .order_book import TOP_LEVEL_COUNT, OrderBook
+from .timer import Timer
 from .types import ICompetitor, IController, IExecutionConnection
 
+# Flow control for heads-up display connections. When the transport's write
+# buffer goes over the high-water mark the connection switches to conflated
+# mode, in which periodic snapshots are sent instead of every match event.
+WRITE_BUFFER_HIGH_WATER: int = 256 * 1024
+WRITE_BUFFER_LOW_WATER: int = 64 * 1024
+CONFLATED_SNAPSHOT_INTERVAL: float = 0.5  # seconds between snapshots in conflated mode
+CONFLATED_RECOVERY_COUNT: int = 2  # snapshots written without the transport pausing before resync
+
+# A heads-up display may subscribe to order book snapshots of up to this many
+# levels, which are then sent on every tick in place of the market's events.
+MAX_SNAPSHOT_DEPTH: int = 20
+
 
 class HudConnection(Connection, IExecutionConnection):
-    def __init__(self, match_events: MatchEvents, competitor_manager: CompetitorManager, controller: IController):
+    def __init__(self, match_events: MatchEvents, competitor_manager: CompetitorManager, controller: IController,
+                 order_books: Iterable[OrderBook], tick_timer: Timer):
         """Initialise a new instance of the HudConnection class."""
         Connection.__init__(self)
 
         self.__competitor: Optional[ICompetitor] = None
         self.__competitor_ids: Dict[str, int] = {"": 0}
         self.__competitor_manager: CompetitorManager = competitor_manager
+        self.__conflated: bool = False
         self.__controller: IController = controller
         self.__logger = logging.getLogger("HEADS_UP")
         self.__match_events: MatchEvents = match_events
+        self.__next_snapshot_time: float = 0.0
+        self.__order_books: Tuple[OrderBook, ...] = tuple(order_books)
+        self.__snapshot_count: int = 0
+        self.__snapshot_subscribed: bool = False
+        self.__tick_timer: Timer = tick_timer
+        self.__writing_paused: bool = False
 
         # Message buffers
         self.__error_message = bytearray(ERROR_MESSAGE_SIZE)
@@ -52,6 +78,8 @@ class HudConnection(Connection, IExecutionConnection):
         self.__login_event_message = bytearray(LOGIN_EVENT_MESSAGE_SIZE)
         self.__hedge_event_message = bytearray(HEDGE_EVENT_MESSAGE_SIZE)
         self.__trade_event_message = bytearray(TRADE_EVENT_MESSAGE_SIZE)
+        self.__account_snapshot_event_message = bytearray(ACCOUNT_SNAPSHOT_EVENT_MESSAGE_SIZE)
+        self.__resync_event_message = bytearray(RESYNC_EVENT_MESSAGE_SIZE)
 
         HEADER.pack_into(self.__error_message, 0, ERROR_MESSAGE_SIZE, MessageType.ERROR)
         HEADER.pack_into(self.__amend_event_message, 0, AMEND_EVENT_MESSAGE_SIZE, MessageType.AMEND_EVENT)
@@ -60,6 +88,11 @@ class HudConnection(Connection, IExecutionConnection):
         HEADER.pack_into(self.__login_event_message, 0, LOGIN_EVENT_MESSAGE_SIZE, MessageType.LOGIN_EVENT)
         HEADER.pack_into(self.__hedge_event_message, 0, HEDGE_EVENT_MESSAGE_SIZE, MessageType.HEDGE_EVENT)
         HEADER.pack_into(self.__trade_event_message, 0, TRADE_EVENT_MESSAGE_SIZE, MessageType.TRADE_EVENT)
+        HEADER.pack_into(self.__account_snapshot_event_message, 0, ACCOUNT_SNAPSHOT_EVENT_MESSAGE_SIZE,
+                         MessageType.ACCOUNT_SNAPSHOT_EVENT)
+        HEADER.pack_into(self.__resync_event_message, 0, RESYNC_EVENT_MESSAGE_SIZE, MessageType.RESYNC_EVENT)
+
+        self.__set_snapshot_depth(TOP_LEVEL_COUNT)
 
     def connection_lost(self, exc: Optional[Exception]) -> None:
         """Called when the connection to the heads-up display is lost."""
@@ -67,10 +100,13 @@ class HudConnection(Connection, IExecutionConnection):
         self.__match_events.event_occurred.remove(self.on_match_event)
         self.__competitor_manager.competitor_logged_in.remove(self.on_competitor_logged_in)
         self.__competitor_manager.on_competitor_disconnect()
+        self.__tick_timer.timer_ticked.remove(self.on_timer_tick)
 
     def connection_made(self, transport: asyncio.transports.BaseTransport) -> None:
         """Called when a connection from a heads-up display is established."""
         Connection.connection_made(self, transport)
+        transport.set_write_buffer_limits(WRITE_BUFFER_HIGH_WATER, WRITE_BUFFER_LOW_WATER)
+        self.__tick_timer.timer_ticked.append(self.on_timer_tick)
         self.__competitor_manager.on_competitor_connect()
         self.__competitor_manager.competitor_logged_in.append(self.on_competitor_logged_in)
         for competitor in self.__competitor_manager.get_competitors():
@@ -81,6 +117,10 @@ class HudConnection(Connection, IExecutionConnection):
         """Callback when a message is received from the Heads-Up Display."""
         now: float = self.__controller.advance_time()
 
+        if typ == MessageType.SNAPSHOT_SUBSCRIBE and length == SNAPSHOT_SUBSCRIBE_MESSAGE_SIZE:
+            self.on_snapshot_subscribe(*SNAPSHOT_SUBSCRIBE_MESSAGE.unpack_from(data, start))
+            return
+
         if self.__competitor is None:
             if typ == MessageType.LOGIN and length == LOGIN_MESSAGE_SIZE:
                 raw_name, raw_secret = LOGIN_MESSAGE.unpack_from(data, start)
@@ -113,6 +153,9 @@ class HudConnection(Connection, IExecutionConnection):
 
     def on_match_event(self, event: MatchEvent) -> None:
         """Called when a match event occurs."""
+        if self.__conflated or (self.__snapshot_subscribed and not event.competitor):
+            return
+
         if event.operation == MatchEventOperation.AMEND:
             AMEND_EVENT_MESSAGE.pack_into(self.__amend_event_message, HEADER_SIZE, event.time,
                                           self.__competitor_ids[event.competitor], event.order_id, event.volume)
@@ -138,6 +181,107 @@ class HudConnection(Connection, IExecutionConnection):
                                           event.side, event.instrument, event.volume, event.price, event.fee)
             self._connection_transport.write(self.__trade_event_message)
 
+    def on_snapshot_subscribe(self, depth: int) -> None:
+        """Called when the heads-up display subscribes to order book snapshots."""
+        depth = min(max(depth, 1), MAX_SNAPSHOT_DEPTH)
+        self.__logger.info("fd=%d heads-up display subscribed to order book snapshots: depth=%d",
+                           self._file_number, depth)
+        self.__set_snapshot_depth(depth)
+        self.__snapshot_subscribed = True
+
+    def on_timer_tick(self, timer: Timer, now: float, _: int) -> None:
+        """Called on each timer tick to send snapshots to a heads-up display."""
+        if self._connection_transport is None:
+            return
+
+        if not self.__conflated:
+            if self.__snapshot_subscribed:
+                self.__send_snapshots(now)
+            return
+
+        loop_time: float = asyncio.get_running_loop().time()
+        if loop_time < self.__next_snapshot_time:
+            return
+        self.__next_snapshot_time = loop_time + CONFLATED_SNAPSHOT_INTERVAL
+
+        # Don't add to the backlog while the heads-up display is still behind
+        if self.__writing_paused:
+            self.__snapshot_count = 0
+            return
+
+        self.__send_snapshots(now)
+        self.__snapshot_count += 1
+        if self.__snapshot_count >= CONFLATED_RECOVERY_COUNT:
+            self.__send_resync(now)
+            self.__conflated = False
+            self.__logger.info("fd=%d heads-up display has caught up, leaving conflated mode: time=%.6f",
+                               self._file_number, now)
+
+    def pause_writing(self) -> None:
+        """Called when the transport's write buffer goes over the high-water mark."""
+        self.__writing_paused = True
+        if not self.__conflated:
+            self.__conflated = True
+            self.__next_snapshot_time = 0.0
+            self.__snapshot_count = 0
+            self.__logger.warning("fd=%d heads-up display is not keeping up, entering conflated mode",
+                                  self._file_number)
+
+    def resume_writing(self) -> None:
+        """Called when the transport's write buffer drains below the low-water mark."""
+        self.__writing_paused = False
+
+    def __send_resync(self, now: float) -> None:
+        """Send every resting order so that the heads-up display can rebuild its order books."""
+        RESYNC_EVENT_MESSAGE.pack_into(self.__resync_event_message, HEADER_SIZE, now, ResyncPhase.BEGIN)
+        self._connection_transport.write(self.__resync_event_message)
+
+        for book in self.__order_books:
+            for order in book.resting_orders():
+                if self.__snapshot_subscribed and not isinstance(order.listener, Competitor):
+                    continue
+                name: str = order.listener.name if isinstance(order.listener, Competitor) else ""
+                INSERT_EVENT_MESSAGE.pack_into(self.__insert_event_message, HEADER_SIZE, now,
+                                               self.__competitor_ids[name], order.client_order_id,
+                                               order.instrument.value, order.side.value, order.remaining_volume,
+                                               order.price, order.lifespan.value)
+                self._connection_transport.write(self.__insert_event_message)
+
+        RESYNC_EVENT_MESSAGE.pack_into(self.__resync_event_message, HEADER_SIZE, now, ResyncPhase.END)
+        self._connection_transport.write(self.__resync_event_message)
+
+    def __send_snapshots(self, now: float) -> None:
+        """Send the top levels of each order book and the account of each competitor."""
+        depth: int = len(self.__ask_prices)
+        for book in self.__order_books:
+            book.top_levels(self.__ask_prices, self.__ask_volumes, self.__bid_prices, self.__bid_volumes, depth)
+            BOOK_SNAPSHOT_EVENT_HEADER.pack_into(self.__book_snapshot_event_message, HEADER_SIZE, now,
+                                                 book.instrument, depth)
+            self.__book_snapshot_levels.pack_into(self.__book_snapshot_event_message, BOOK_SNAPSHOT_EVENT_HEADER_SIZE,
+                                                  *self.__ask_prices, *self.__ask_volumes, *self.__bid_prices,
+                                                  *self.__bid_volumes)
+            self._connection_transport.write(self.__book_snapshot_event_message)
+
+        for competitor in self.__competitor_manager.get_competitors():
+            account = competitor.account
+            ACCOUNT_SNAPSHOT_EVENT_MESSAGE.pack_into(self.__account_snapshot_event_message, HEADER_SIZE, now,
+                                                     self.__competitor_ids[competitor.name], account.etf_position,
+                                                     account.future_position, account.account_balance,
+                                                     account.total_fees, account.profit_or_loss)
+            self._connection_transport.write(self.__account_snapshot_event_message)
+
+    def __set_snapshot_depth(self, depth: int) -> None:
+        """Size the order book snapshot buffers for the given number of price levels."""
+        self.__ask_prices: List[int] = [0] * depth
+        self.__ask_volumes: List[int] = [0] * depth
+        self.__bid_prices: List[int] = [0] * depth
+        self.__bid_volumes: List[int] = [0] * depth
+
+        self.__book_snapshot_levels: struct.Struct = struct.Struct("!%dI" % (4 * depth))
+        size: int = BOOK_SNAPSHOT_EVENT_HEADER_SIZE + self.__book_snapshot_levels.size
+        self.__book_snapshot_event_message = bytearray(size)
+        HEADER.pack_into(self.__book_snapshot_event_message, 0, size, MessageType.BOOK_SNAPSHOT_EVENT)
+
     # IExecutionConnection overrides
 
     def close(self):
@@ -160,7 +304,7 @@ class HudConnection(Connection, IExecutionConnection):
 
 class HeadsUpDisplayServer:
     def __init__(self, host: str, port: int, match_events: MatchEvents, competitor_manager: CompetitorManager,
-                 controller: IController):
+                 controller: IController, order_books: Iterable[OrderBook], tick_timer: Timer):
         """Initialise a new instance of the HeadsUpDisplayServer class."""
         self.host: str = host
         self.port: int = port
@@ -169,11 +313,19 @@ class HeadsUpDisplayServer:
         self.__controller: IController = controller
         self.__logger: logging.Logger = logging.getLogger("HEADS_UP")
         self.__match_events: MatchEvents = match_events
+        self.__order_books: Tuple[OrderBook, ...] = tuple(order_books)
         self.__server: Optional[asyncio.AbstractServer] = None
+        self.__tick_timer: Timer = tick_timer
+
+        # Signals
+        self.heads_up_display_connected: List[Callable[[], None]] = list()
 
     def __on_new_connection(self):
         """Called when a new connection is established."""
-        return HudConnection(self.__match_events, self.__competitor_manager, self.__controller)
+        for callback in self.heads_up_display_connected:
+            callback()
+        return HudConnection(self.__match_events, self.__competitor_manager, self.__controller, self.__order_books,
+                             self.__tick_timer)
 
     async def start(self):
         """Start this Heads Up Display server."""
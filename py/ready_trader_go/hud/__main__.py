@@ -98,22 +98,23 @@ def __validate_configuration(filename: pathlib.Path, config: Mapping[str, Any])
     return True
 
 
-def replay(path: pathlib.Path):
+def replay(path: pathlib.Path, speed: int = 1, start_time: float = 0.0):
     app = __create_application()
     splash = __show_splash()
     splash.showMessage("Processing %s..." % str(path), Qt.AlignBottom, QtGui.QColor("#F0F0F0"))
     etf_clamp, tick_size = __read_exchange_config()
-    with path.open("r", newline="") as csv_file:
-        event_source = RecordedEventSource.from_csv(csv_file, etf_clamp, tick_size)
+    event_source = RecordedEventSource.from_path(path, etf_clamp, tick_size)
+    event_source.set_speed(speed)
+    event_source.start_time = start_time
     window = __show_main_window(splash, event_source)
     return app.exec_()
 
 
-def main(host: str, port: int):
+def main(host: str, port: int, snapshot_depth: int = 0):
     app = __create_application()
     splash = __show_splash()
     etf_clamp, tick_size = __read_exchange_config()
     time.sleep(1)
-    event_source = LiveEventSource(host, port, etf_clamp, tick_size)
+    event_source = LiveEventSource(host, port, etf_clamp, tick_size, snapshot_depth=snapshot_depth)
     window = __show_main_window(splash, event_source)
     return app.exec_()
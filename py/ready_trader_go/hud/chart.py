@@ -15,10 +15,13 @@
 #     You should have received a copy of the GNU Affero General Public
 #     License along with Ready Trader Go.  If not, see
 #     <https://www.gnu.org/licenses/>.
+import array
+import bisect
 import collections
+import math
 import sys
 
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from PySide6 import QtCore, QtGui, QtWidgets
 from PySide6 import QtCharts
@@ -27,6 +30,62 @@ from PySide6.QtCore import Qt
 from ready_trader_go.types import Instrument
 
 CHART_DURATION: float = 60.0
+MINIMUM_CHART_DURATION: float = 10.0
+MAXIMUM_CHART_DURATION: float = 7200.0
+POINTS_PER_BUCKET: int = 2  # The lowest and highest value in each pixel-wide bucket
+ZOOM_FACTOR: float = 1.25  # Change in the chart duration for each step of the mouse wheel
+
+
+class SeriesHistory:
+    """Every point of a chart series, stored compactly."""
+    __slots__ = ("xs", "ys")
+
+    def __init__(self):
+        """Initialise a new instance of the SeriesHistory class."""
+        self.xs: array.array = array.array("d")
+        self.ys: array.array = array.array("d")
+
+    def append(self, x: float, y: float) -> None:
+        """Add a point to the end of the history."""
+        self.xs.append(x)
+        self.ys.append(y)
+
+    def decimate(self, x_min: float, x_max: float, bucket_count: int) -> List[QtCore.QPointF]:
+        """Return the points between x_min and x_max reduced to the lowest and highest of each bucket."""
+        xs: array.array = self.xs
+        ys: array.array = self.ys
+        # Include one point either side of the range so that lines reach the edges of the chart
+        start: int = max(bisect.bisect_left(xs, x_min) - 1, 0)
+        end: int = min(bisect.bisect_right(xs, x_max) + 1, len(xs))
+        if end - start <= POINTS_PER_BUCKET * bucket_count:
+            return [QtCore.QPointF(xs[i], ys[i]) for i in range(start, end)]
+
+        width: float = (x_max - x_min) / bucket_count
+        result: List[QtCore.QPointF] = list()
+        i: int = start
+        while i < end:
+            bucket_end: float = x_min + (math.floor((xs[i] - x_min) / width) + 1) * width
+            j: int = max(bisect.bisect_left(xs, bucket_end, i, end), i + 1)
+            bucket: array.array = ys[i:j]
+            low: int = i + bucket.index(min(bucket))
+            high: int = i + bucket.index(max(bucket))
+            for k in sorted({low, high}):
+                result.append(QtCore.QPointF(xs[k], ys[k]))
+            i = j
+        return result
+
+
+class ChartView(QtCharts.QChartView):
+    """A chart view that zooms the time axis in and out with the mouse wheel."""
+
+    zoom_requested = QtCore.Signal(float)
+
+    def wheelEvent(self, event: QtGui.QWheelEvent) -> None:
+        """Callback when the mouse wheel is turned over the chart."""
+        steps: float = event.angleDelta().y() / 120.0
+        if steps:
+            self.zoom_requested.emit(ZOOM_FACTOR ** -steps)
+        event.accept()
 
 
 class BaseChartGadget(QtWidgets.QWidget):
@@ -36,8 +95,9 @@ class BaseChartGadget(QtWidgets.QWidget):
         """Initialise a new instance of the class."""
         super().__init__(parent, flags)
 
-        self.chart_view = QtCharts.QChartView()
+        self.chart_view = ChartView()
         self.chart_view.setRenderHint(QtGui.QPainter.Antialiasing)
+        self.chart_view.zoom_requested.connect(self.__on_zoom_requested)
 
         chart: QtCharts.QChart = self.chart_view.chart()
         chart.legend().setLabelColor(parent.palette().color(parent.foregroundRole()))
@@ -64,8 +124,64 @@ class BaseChartGadget(QtWidgets.QWidget):
 
         self._largest_y_value: float = 0.0
         self._smallest_y_value: float = sys.float_info.max
+        self.__duration: float = CHART_DURATION
+        self.__histories: Dict[QtCharts.QXYSeries, SeriesHistory] = dict()
+        self.__trimmed_time: float = 0.0
         self.__x_axis_maximum: float = 0.0
 
+        chart.plotAreaChanged.connect(self._decimate_all)
+
+    def __bucket_count(self) -> int:
+        """Return the number of pixel-wide buckets across the plot area."""
+        return max(int(self.chart.plotArea().width()), 1)
+
+    def __on_zoom_requested(self, factor: float) -> None:
+        """Callback when the view asks for the chart duration to be scaled by the given factor."""
+        duration: float = min(max(self.__duration * factor, MINIMUM_CHART_DURATION), MAXIMUM_CHART_DURATION)
+        if duration != self.__duration:
+            self.__duration = duration
+            self.chart.axisX().setRange(self.__x_axis_maximum - duration, self.__x_axis_maximum)
+            self._decimate_all()
+
+    def _append_point(self, series: QtCharts.QXYSeries, x: float, y: float) -> None:
+        """Add a point to a series and its history, decimating the series if it has grown too large."""
+        history: Optional[SeriesHistory] = self.__histories.get(series)
+        if history is None:
+            history = self.__histories[series] = SeriesHistory()
+        history.append(x, y)
+        series.append(x, y)
+        if series.count() > 2 * POINTS_PER_BUCKET * self.__bucket_count():
+            self._decimate(series)
+
+    def _decimate(self, series: QtCharts.QXYSeries) -> None:
+        """Replace the points of a series with a decimated copy of its history for the visible period."""
+        history: Optional[SeriesHistory] = self.__histories.get(series)
+        if history is not None:
+            x_axis: QtCharts.QValueAxis = self.chart.axisX()
+            series.replace(history.decimate(x_axis.min(), x_axis.max(), self.__bucket_count()))
+
+    def _decimate_all(self) -> None:
+        """Decimate every series for the visible period."""
+        for series in self.__histories:
+            self._decimate(series)
+
+    def _reset_series(self, series: QtCharts.QXYSeries, points: Iterable[Tuple[float, float]]) -> None:
+        """Replace the history of a series with the given (x, y) points."""
+        history = self.__histories[series] = SeriesHistory()
+        for x, y in points:
+            history.append(x, y)
+
+    def _trim_series(self) -> None:
+        """Remove points that have scrolled out of view from every series, keeping them in its history."""
+        x_min: float = self.chart.axisX().min()
+        self.__trimmed_time = x_min
+        for series in self.__histories:
+            count: int = 0
+            while count + 1 < series.count() and series.at(count + 1).x() < x_min:
+                count += 1
+            if count:
+                series.removePoints(0, count)
+
     def _style_axes(self):
         """Apply the common style elements to the chart axes."""
         chart: QtCharts.QChart = self.chart
@@ -74,12 +190,25 @@ class BaseChartGadget(QtWidgets.QWidget):
         chart.axisY().setLabelFormat("%.2f")
         chart.axisY().setLabelsColor(chart.legend().labelColor())
 
+    def _reset_axes(self, time: float, values: Iterable[float]) -> None:
+        """Show the period up to the given time and fit the y-axis to the given values."""
+        self.__x_axis_maximum = time
+        self.chart.axisX().setRange(time - self.__duration, time)
+        self._largest_y_value = 0.0
+        self._smallest_y_value = sys.float_info.max
+        for value in values:
+            self._update_y_axis(value)
+        self._decimate_all()
+
     def _scroll_x_axis(self, time: float) -> None:
         """Scroll the the x-axis to the given time."""
         if time > self.__x_axis_maximum:
             scroll_distance: float = time - self.__x_axis_maximum
             self.__x_axis_maximum += scroll_distance
-            self.chart.scroll(scroll_distance * self.chart.plotArea().width() / CHART_DURATION, 0)
+            self.chart.scroll(scroll_distance * self.chart.plotArea().width() / self.__duration, 0)
+            # Trimming a series costs as much as adding a point to it, so remove old points in batches
+            if self.__x_axis_maximum - self.__trimmed_time > 1.25 * self.__duration:
+                self._trim_series()
 
     def _update_y_axis(self, new_value: float) -> None:
         """Ensure the y-axis range is large enough for the given value."""
@@ -125,12 +254,23 @@ class MidpointChartGadget(BaseChartGadget):
                 self._smallest_y_value += delta
             self.chart.axisY().setRange(self._smallest_y_value, self._largest_y_value)
 
+    def reset(self, time: float, points: List[Tuple[Instrument, float, float]]) -> None:
+        """Replace the chart's content with the given (instrument, time, price in cents) points."""
+        series_points: List[List[Tuple[float, float]]] = [list() for _ in Instrument]
+        for instrument, when, mid_price in points:
+            series_points[instrument].append((when, mid_price / 100.0))
+        for line_series, instrument_points in zip(self.instrument_series, series_points):
+            self._reset_series(line_series, instrument_points)
+        self._reset_axes(time, (y for instrument_points in series_points for _, y in instrument_points))
+        if points:
+            self.__last_price = points[-1][2] / 100.0
+
     def on_midpoint_price_changed(self, instrument: Instrument, time: float, mid_price: float) -> None:
         """Callback when the midpoint price of an instrument changes."""
         self._scroll_x_axis(time)
         price = mid_price / 100.0
         self._update_y_axis(price)
-        self.instrument_series[instrument].append(time, price)
+        self._append_point(self.instrument_series[instrument], time, price)
         self.__last_price = price
         if not self.__timer.isActive():
             self.__timer.start(6000)
@@ -157,9 +297,19 @@ class ProfitLossChartGadget(BaseChartGadget):
         line_series.setName(team)
         line_series.setColor(self._COLOURS[(len(self.team_series) - 1) % len(self._COLOURS)])
 
+    def reset(self, time: float, points: List[Tuple[str, float, float]]) -> None:
+        """Replace the chart's content with the given (team, time, profit) points."""
+        team_points: Dict[str, List[Tuple[float, float]]] = {team: list() for team in self.team_series}
+        for team, when, profit in points:
+            if team in team_points:
+                team_points[team].append((when, profit))
+        for team, line_series in self.team_series.items():
+            self._reset_series(line_series, team_points[team])
+        self._reset_axes(time, (profit for _, _, profit in points))
+
     def on_profit_loss_changed(self, team: str, time: float, profit: float, etf_position: int,
                                account_balance: float, total_fees: float) -> None:
         """Callback when the profit of a team changes."""
-        self._update_y_axis(profit)
-        self.team_series[team].append(time, profit)
         self._scroll_x_axis(time)
+        self._update_y_axis(profit)
+        self._append_point(self.team_series[team], time, profit)
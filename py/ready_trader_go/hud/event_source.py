@@ -15,30 +15,42 @@
 #     You should have received a copy of the GNU Affero General Public
 #     License along with Ready Trader Go.  If not, see
 #     <https://www.gnu.org/licenses/>.
-import collections
-import csv
-import itertools
+import bisect
+import math
+import pathlib
+import struct
 
-from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Set, TextIO, Tuple
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
 
 from PySide6 import QtCore,  QtNetwork
 
 from ready_trader_go.account import AccountFactory, CompetitorAccount
-from ready_trader_go.messages import (AMEND_EVENT_MESSAGE, AMEND_EVENT_MESSAGE_SIZE, CANCEL_EVENT_MESSAGE,
+from ready_trader_go.messages import (ACCOUNT_SNAPSHOT_EVENT_MESSAGE, ACCOUNT_SNAPSHOT_EVENT_MESSAGE_SIZE,
+                                      AMEND_EVENT_MESSAGE, AMEND_EVENT_MESSAGE_SIZE, BOOK_SNAPSHOT_EVENT_HEADER,
+                                      BOOK_SNAPSHOT_EVENT_HEADER_SIZE, CANCEL_EVENT_MESSAGE,
                                       CANCEL_EVENT_MESSAGE_SIZE, ERROR_MESSAGE, ERROR_MESSAGE_SIZE, HEADER_SIZE,
                                       HEDGE_EVENT_MESSAGE, HEDGE_EVENT_MESSAGE_SIZE, INSERT_EVENT_MESSAGE,
                                       INSERT_EVENT_MESSAGE_SIZE, LOGIN_EVENT_MESSAGE, LOGIN_EVENT_MESSAGE_SIZE,
-                                      TRADE_EVENT_MESSAGE, TRADE_EVENT_MESSAGE_SIZE, MessageType)
+                                      RESYNC_EVENT_MESSAGE, RESYNC_EVENT_MESSAGE_SIZE, SNAPSHOT_SUBSCRIBE_MESSAGE,
+                                      SNAPSHOT_SUBSCRIBE_MESSAGE_SIZE, TRADE_EVENT_MESSAGE, TRADE_EVENT_MESSAGE_SIZE,
+                                      HEADER, MessageType, ResyncPhase)
+from ready_trader_go.match_events import MatchEventOperation
 from ready_trader_go.order_book import TOP_LEVEL_COUNT, Order, OrderBook
+from ready_trader_go.replay import Checkpoint, MatchEventsIndex, MatchState, iter_rows, open_index
 from ready_trader_go.types import Instrument, Lifespan, Side
 
 
-__all__ = ("EventSource", "LiveEventSource", "RecordedEventSource")
+__all__ = ("EventSource", "FrameDelta", "LiveEventSource", "RecordedEventSource", "TeamChanges")
 
 
 TICK_INTERVAL_MILLISECONDS = 500
 TICK_INTERVAL_SECONDS = TICK_INTERVAL_MILLISECONDS / 1000.0
 
+FRAME_INTERVAL_MILLISECONDS = 16  # changes from the exchange are passed to the GUI thread once per frame
+
+MAXIMUM_REPLAY_SPEED = 100
+SEEK_HISTORY_SECONDS = 60.0  # seconds of chart history rebuilt after a seek
+
 
 class EventSource(QtCore.QObject):
     """A source of events for the Ready Trader Go HUD to display."""
@@ -66,6 +78,13 @@ class EventSource(QtCore.QObject):
     # team, time, profit, etf position, account balance, total fees
     profit_loss_changed = QtCore.Signal(str, float, float, int, int, float, float)
 
+    # time, active orders by team, trades by team, midpoint price points, profit or loss points (see
+    # RecordedEventSource.seek)
+    state_reset = QtCore.Signal(float, dict, dict, list, list)
+
+    # team, net changes to the team's orders and the team's trades during one frame (see TeamChanges)
+    team_orders_changed = QtCore.Signal(str, object)
+
     # team, time, order_id, side, volume, price, fee
     trade_occurred = QtCore.Signal(str, float, int, Side, int, int, int)
 
@@ -86,21 +105,75 @@ class EventSource(QtCore.QObject):
         raise NotImplementedError()
 
 
-class LiveEventSource(EventSource):
-    """An event source that receives events from an exchange simulator."""
+class TeamChanges:
+    """The net changes to a team's orders, and the team's trades, during one frame.
 
-    def __init__(self, host: str, port: int, etf_clamp: float, tick_size: float,
+    Orders inserted and then cancelled or filled within the frame do not
+    appear at all. Fills are included in the volume changes as well as in
+    the list of trades.
+    """
+    __slots__ = ("amended", "cancelled", "inserted", "trades")
+
+    def __init__(self):
+        """Initialise a new instance of the TeamChanges class."""
+        self.amended: Dict[int, int] = dict()  # order_id -> volume delta, for orders inserted in earlier frames
+        self.cancelled: Set[int] = set()  # order_ids of orders inserted in earlier frames
+        self.inserted: Dict[int, Tuple[float, Order]] = dict()  # order_id -> (time, order) in order of insertion
+        self.trades: List[Tuple[float, int, Side, int, int, int]] = list()  # time, order_id, side, volume, price, fee
+
+
+class FrameDelta:
+    """The changes received from an exchange simulator during one frame."""
+    __slots__ = ("errors", "logins", "match_over", "midpoints", "order_books", "profits", "teams")
+
+    def __init__(self):
+        """Initialise a new instance of the FrameDelta class."""
+        self.errors: List[str] = list()
+        self.logins: List[str] = list()
+        self.match_over: bool = False
+        self.midpoints: Dict[Instrument, Tuple[float, float]] = dict()  # instrument -> (time, price in cents)
+        # instrument -> (time, ask prices, ask volumes, bid prices, bid volumes)
+        self.order_books: Dict[Instrument, Tuple[float, List[int], List[int], List[int], List[int]]] = dict()
+        # team -> (time, profit, etf position, future position, account balance, total fees)
+        self.profits: Dict[str, Tuple[float, float, int, int, float, float]] = dict()
+        self.teams: Dict[str, TeamChanges] = dict()
+
+
+class LiveEventReceiver(QtCore.QObject):
+    """Receives and decodes events from an exchange simulator.
+
+    A live event receiver is meant to live in a worker thread, where it owns
+    the connection to the exchange and the order books and accounts built
+    from its events. Rather than signalling each event as it happens, it
+    coalesces them into one FrameDelta holding the latest order book,
+    midpoint price and profit or loss, and the net changes to each team's
+    orders, which it publishes once per frame via the frame_ready signal.
+    """
+
+    # Signals
+
+    frame_ready = QtCore.Signal(object)  # FrameDelta
+
+    def __init__(self, host: str, port: int, etf_clamp: float, tick_size: float, snapshot_depth: int = 0,
                  parent: Optional[QtCore.QObject] = None):
         """Initialise a new instance of the class."""
-        super().__init__(etf_clamp, tick_size, parent)
+        super().__init__(parent)
 
         self.host: str = host
         self.port: int = port
+        self.snapshot_depth: int = snapshot_depth
 
+        self.__account_factory: AccountFactory = AccountFactory(etf_clamp, tick_size)
         self.__accounts: Dict[int, CompetitorAccount] = dict()
+        self.__conflated: bool = False
+        self.__delta: FrameDelta = FrameDelta()
         self.__now: float = 0.0
-        self.__order_books: List[OrderBook] = list(OrderBook(i, 0.0, 0.0) for i in Instrument)
+        self.__order_books: Optional[List[OrderBook]] = None
+        if not snapshot_depth:
+            self.__order_books = list(OrderBook(i, 0.0, 0.0) for i in Instrument)
         self.__orders: Dict[int, Dict[int, Order]] = {0: dict()}
+        self.__snapshots: Dict[Instrument, Tuple[List[int], ...]] = dict()
+        self.__stale_orders: Optional[Dict[int, Dict[int, Order]]] = None
         self.__stop_later: bool = False
         self.__teams: Dict[int, str] = {0: ""}
 
@@ -109,6 +182,13 @@ class LiveEventSource(EventSource):
         self.__bid_prices: List[int] = [0] * TOP_LEVEL_COUNT
         self.__bid_volumes: List[int] = [0] * TOP_LEVEL_COUNT
 
+        self.__frame_timer = QtCore.QTimer(self)
+        self.__frame_timer.setInterval(FRAME_INTERVAL_MILLISECONDS)
+        self.__frame_timer.setSingleShot(True)
+        self.__frame_timer.timeout.connect(self.__on_frame_timer_tick)
+        self.__tick_timer = QtCore.QTimer(self)
+        self.__tick_timer.timeout.connect(self.__on_tick_timer_tick)
+
         self.__socket = QtNetwork.QTcpSocket(self)
         self.__socket.connected.connect(self.on_connected)
         self.__socket.disconnected.connect(self.on_disconnected)
@@ -116,13 +196,54 @@ class LiveEventSource(EventSource):
         self.__socket.readyRead.connect(self.on_data_received)
         self.__stream = QtCore.QDataStream(self.__socket)
 
-    def __del__(self) -> None:
-        """Destructor."""
-        self.__socket.close()
+    def __on_frame_timer_tick(self) -> None:
+        """Publish the changes collected since the last frame."""
+        delta, self.__delta = self.__delta, FrameDelta()
+        self.frame_ready.emit(delta)
+
+    def __start_frame(self) -> None:
+        """Ensure the changes made since the last frame will be published in the next frame."""
+        if not self.__frame_timer.isActive():
+            self.__frame_timer.start()
+
+    def __add_error(self, error_message: str) -> None:
+        """Add an error to the next frame."""
+        self.__delta.errors.append(error_message)
+        self.__start_frame()
+
+    def __team_changes(self, competitor_id: int) -> TeamChanges:
+        """Return the changes to a team's orders in the next frame."""
+        team: str = self.__teams[competitor_id]
+        changes: Optional[TeamChanges] = self.__delta.teams.get(team)
+        if changes is None:
+            changes = self.__delta.teams[team] = TeamChanges()
+            self.__start_frame()
+        return changes
+
+    def __amend_order(self, competitor_id: int, order_id: int, volume_delta: int) -> None:
+        """Add a change to the volume of a team's order to the next frame."""
+        changes: TeamChanges = self.__team_changes(competitor_id)
+        inserted: Optional[Tuple[float, Order]] = changes.inserted.get(order_id)
+        if inserted is not None:
+            inserted[1].remaining_volume += volume_delta
+            if inserted[1].remaining_volume <= 0:
+                del changes.inserted[order_id]
+        elif order_id not in changes.cancelled:
+            changes.amended[order_id] = changes.amended.get(order_id, 0) + volume_delta
+
+    def __cancel_order(self, competitor_id: int, order_id: int) -> None:
+        """Add the cancellation of a team's order to the next frame."""
+        changes: TeamChanges = self.__team_changes(competitor_id)
+        if changes.inserted.pop(order_id, None) is None:
+            changes.amended.pop(order_id, None)
+            changes.cancelled.add(order_id)
 
     def on_connected(self) -> None:
         """Callback when a connection to the exchange is established."""
-        self._timer.start(TICK_INTERVAL_MILLISECONDS)
+        if self.snapshot_depth:
+            self.__socket.write(HEADER.pack(SNAPSHOT_SUBSCRIBE_MESSAGE_SIZE, MessageType.SNAPSHOT_SUBSCRIBE)
+                                + SNAPSHOT_SUBSCRIBE_MESSAGE.pack(self.snapshot_depth))
+        self.__tick_timer.start(TICK_INTERVAL_MILLISECONDS)
 
     def on_disconnected(self) -> None:
         """Callback when the connection to the exchange is lost."""
@@ -131,7 +252,7 @@ class LiveEventSource(EventSource):
     def on_error_occurred(self, error: QtNetwork.QAbstractSocket.SocketError) -> None:
         """Callback when there is a problem with the exchange connection."""
         if error != QtNetwork.QAbstractSocket.SocketError.RemoteHostClosedError:
-            self.event_source_error_occurred.emit(self.__socket.errorString())
+            self.__add_error(self.__socket.errorString())
 
     def on_data_received(self) -> None:
         """Callback when data is received from the exchange simulator."""
@@ -159,34 +280,90 @@ class LiveEventSource(EventSource):
             self.on_hedge_event_message(*HEDGE_EVENT_MESSAGE.unpack_from(data))
         elif typ == MessageType.TRADE_EVENT and length == TRADE_EVENT_MESSAGE_SIZE:
             self.on_trade_event_message(*TRADE_EVENT_MESSAGE.unpack_from(data))
+        elif (typ == MessageType.BOOK_SNAPSHOT_EVENT and length >= BOOK_SNAPSHOT_EVENT_HEADER_SIZE
+              and length == BOOK_SNAPSHOT_EVENT_HEADER_SIZE + 16 * data[BOOK_SNAPSHOT_EVENT_HEADER.size - 1]):
+            now, instrument, depth = BOOK_SNAPSHOT_EVENT_HEADER.unpack_from(data)
+            self.on_book_snapshot_event_message(now, instrument, depth,
+                                                struct.unpack_from("!%dI" % (4 * depth), data,
+                                                                   BOOK_SNAPSHOT_EVENT_HEADER.size))
+        elif typ == MessageType.ACCOUNT_SNAPSHOT_EVENT and length == ACCOUNT_SNAPSHOT_EVENT_MESSAGE_SIZE:
+            self.on_account_snapshot_event_message(*ACCOUNT_SNAPSHOT_EVENT_MESSAGE.unpack_from(data))
+        elif typ == MessageType.RESYNC_EVENT and length == RESYNC_EVENT_MESSAGE_SIZE:
+            self.on_resync_event_message(*RESYNC_EVENT_MESSAGE.unpack_from(data))
         elif typ == MessageType.ERROR and length == ERROR_MESSAGE_SIZE:
             client_order_id, error_message = ERROR_MESSAGE.unpack_from(data)
             self.on_error_message(client_order_id, error_message.rstrip(b"\x00"))
         else:
-            self.event_source_error_occurred.emit("received invalid message: length=%d type=%d" % (length, typ))
+            self.__add_error("received invalid message: length=%d type=%d" % (length, typ))
 
     def on_error_message(self, client_order_id: int, error_message: bytes):
         """Callback when an error message is received."""
 
+    def on_account_snapshot_event_message(self, now: float, competitor_id: int, etf_position: int,
+                                          future_position: int, account_balance: int, total_fees: int,
+                                          profit_or_loss: float) -> None:
+        """Callback when an account snapshot event message is received."""
+        self.__now = now
+        self.__conflated = True
+        account = self.__accounts[competitor_id]
+        account.etf_position = etf_position
+        account.future_position = future_position
+        account.account_balance = account_balance
+        account.total_fees = total_fees
+        account.profit_or_loss = profit_or_loss
+
+    def on_book_snapshot_event_message(self, now: float, instrument: int, depth: int, levels: Tuple[int, ...]) -> None:
+        """Callback when an order book snapshot event message is received."""
+        self.__now = now
+        self.__conflated = True
+        self.__snapshots[Instrument(instrument)] = tuple(list(levels[i * depth:(i + 1) * depth]) for i in range(4))
+
+    def on_resync_event_message(self, now: float, phase: int) -> None:
+        """Callback when a resync event message is received.
+
+        Between the beginning and end of a resync, the exchange sends an insert
+        event for every resting order. Orders known before the resync that are
+        not resent are cancelled at the end.
+        """
+        self.__now = now
+        if phase == ResyncPhase.BEGIN:
+            self.__stale_orders = self.__orders
+            if self.__order_books is not None:
+                self.__order_books = list(OrderBook(i, 0.0, 0.0) for i in Instrument)
+            self.__orders = {competitor_id: dict() for competitor_id in self.__teams}
+        elif self.__stale_orders is not None:
+            for competitor_id, orders in self.__stale_orders.items():
+                if competitor_id != 0:
+                    for order_id in orders:
+                        self.__cancel_order(competitor_id, order_id)
+            self.__stale_orders = None
+            if self.__order_books is not None:
+                self.__snapshots.clear()
+                self.__conflated = False
+
     def on_amend_event_message(self, now: float, competitor_id: int, order_id: int, volume_delta: int) -> None:
         """Callback when an amend event message is received."""
         self.__now = now
         order = self.__orders[competitor_id].get(order_id)
         if order is not None:
-            self.__order_books[order.instrument].amend(now, order, order.volume + volume_delta)
+            if self.__order_books is not None:
+                self.__order_books[order.instrument].amend(now, order, order.volume + volume_delta)
+            else:
+                order.volume += volume_delta
+                order.remaining_volume += volume_delta
             if order.remaining_volume == 0:
                 del self.__orders[competitor_id][order_id]
         if competitor_id != 0:
-            self.order_amended.emit(self.__teams[competitor_id], now, order_id, volume_delta)
+            self.__amend_order(competitor_id, order_id, volume_delta)
 
     def on_cancel_event_message(self, now: float, competitor_id: int, order_id: int) -> None:
         """Callback when an cancel event message is received."""
         self.__now = now
         order = self.__orders[competitor_id].pop(order_id, None)
-        if order is not None:
+        if order is not None and self.__order_books is not None:
             self.__order_books[order.instrument].cancel(now, order)
         if competitor_id != 0:
-            self.order_cancelled.emit(self.__teams[competitor_id], now, order_id)
+            self.__cancel_order(competitor_id, order_id)
 
     def on_insert_event_message(self, now: float, competitor_id: int, order_id: int, instrument: int, side: int,
                                 volume: int, price: int, lifespan: int) -> None:
@@ -194,10 +371,21 @@ class LiveEventSource(EventSource):
         self.__now = now
         order = Order(order_id, Instrument(instrument), Lifespan(lifespan), Side(side), price, volume)
         self.__orders[competitor_id][order_id] = order
-        self.__order_books[instrument].insert(now, order)
+        if self.__order_books is not None:
+            self.__order_books[instrument].insert(now, order)
+
+        if self.__stale_orders is not None:
+            stale = self.__stale_orders[competitor_id].pop(order_id, None)
+            if stale is not None:
+                if competitor_id != 0 and volume != stale.remaining_volume:
+                    self.__amend_order(competitor_id, order_id, volume - stale.remaining_volume)
+                return
+
         if competitor_id != 0:
-            self.order_inserted.emit(self.__teams[competitor_id], now, order_id, Instrument(instrument),
-                                     Side(side), volume, price, Lifespan(lifespan))
+            # The order itself belongs to this thread, so the frame gets its own copy
+            self.__team_changes(competitor_id).inserted[order_id] = (now, Order(order_id, order.instrument,
+                                                                                order.lifespan, order.side, price,
+                                                                                volume))
 
     def on_hedge_event_message(self, now: float, competitor_id: int, side: int, instrument: int, volume: int,
                                price: float) -> None:
@@ -207,24 +395,30 @@ class LiveEventSource(EventSource):
 
     def on_login_event_message(self, name: str, competitor_id: int) -> None:
         """Callback when an login event message is received."""
-        self.__accounts[competitor_id] = self._account_factory.create()
+        self.__accounts[competitor_id] = self.__account_factory.create()
         self.__teams[competitor_id] = name
         self.__orders[competitor_id] = dict()
-        self.login_occurred.emit(name)
+        self.__delta.logins.append(name)
+        self.__start_frame()
 
-    def _on_timer_tick(self):
+    def __on_tick_timer_tick(self) -> None:
         """Callback when the timer ticks."""
         if self.__now <= 0.0:
             return
 
+        if self.__conflated or self.__order_books is None:
+            self.__on_snapshot_timer_tick()
+            return
+
         for i in Instrument:
             midpoint_price: float = self.__order_books[i].midpoint_price()
             if midpoint_price is not None:
-                self.midpoint_price_changed.emit(i, self.__now, midpoint_price)
+                self.__delta.midpoints[i] = (self.__now, midpoint_price)
                 self.__order_books[i].top_levels(self.__ask_prices, self.__ask_volumes, self.__bid_prices,
                                                  self.__bid_volumes)
-                self.order_book_changed.emit(i, self.__now, self.__ask_prices, self.__ask_volumes,
-                                             self.__bid_prices, self.__bid_volumes)
+                # The lists are reused on every tick, so take copies for the frame
+                self.__delta.order_books[i] = (self.__now, list(self.__ask_prices), list(self.__ask_volumes),
+                                               list(self.__bid_prices), list(self.__bid_volumes))
 
         future_price: int = self.__order_books[Instrument.FUTURE].last_traded_price()
         etf_price: int = self.__order_books[Instrument.ETF].last_traded_price()
@@ -233,170 +427,311 @@ class LiveEventSource(EventSource):
         if future_price is not None and etf_price is not None:
             for competitor_id, account in self.__accounts.items():
                 account.update(future_price, etf_price)
-                self.profit_loss_changed.emit(self.__teams[competitor_id], self.__now,
-                                              account.profit_or_loss / 100.0, account.etf_position,
-                                              account.future_position, account.account_balance / 100.0,
-                                              account.total_fees / 100.0)
+                self.__delta.profits[self.__teams[competitor_id]] = (
+                    self.__now, account.profit_or_loss / 100.0, account.etf_position, account.future_position,
+                    account.account_balance / 100.0, account.total_fees / 100.0)
 
         if self.__stop_later:
-            self._timer.stop()
-            self.match_over.emit()
+            self.__tick_timer.stop()
+            self.__delta.match_over = True
+        self.__start_frame()
+
+    def __on_snapshot_timer_tick(self) -> None:
+        """Publish the latest order book and account snapshots received from the exchange."""
+        for i, (ask_prices, ask_volumes, bid_prices, bid_volumes) in self.__snapshots.items():
+            if ask_prices[0] and bid_prices[0]:
+                self.__delta.midpoints[i] = (self.__now, (ask_prices[0] + bid_prices[0]) / 2.0)
+                self.__delta.order_books[i] = (self.__now, ask_prices, ask_volumes, bid_prices, bid_volumes)
+
+        for competitor_id, account in self.__accounts.items():
+            self.__delta.profits[self.__teams[competitor_id]] = (
+                self.__now, account.profit_or_loss / 100.0, account.etf_position, account.future_position,
+                account.account_balance / 100.0, account.total_fees / 100.0)
+
+        if self.__stop_later:
+            self.__tick_timer.stop()
+            self.__delta.match_over = True
+        self.__start_frame()
 
     def on_trade_event_message(self, now: float, competitor_id: int, order_id: int, side: int, instrument: int,
                                volume: int, price: int, fee: int) -> None:
         """Callback when an trade event message is received."""
         self.__now = now
         self.__accounts[competitor_id].transact(Instrument(instrument), Side(side), price, volume, fee)
-        self.trade_occurred.emit(self.__teams[competitor_id], now, order_id, Side(side), volume, price, fee)
+        if competitor_id != 0:
+            self.__team_changes(competitor_id).trades.append((now, order_id, Side(side), volume, price, fee))
+            self.__amend_order(competitor_id, order_id, -volume)
 
         order = self.__orders[competitor_id].get(order_id)
+        if order is not None and self.__order_books is None:
+            order.remaining_volume -= volume
         if order and order.remaining_volume == 0:
             del self.__orders[competitor_id][order_id]
 
     def start(self) -> None:
-        """Start this live event source."""
+        """Connect to the exchange simulator."""
         self.__socket.connectToHost(self.host, self.port)
 
 
-class Event(NamedTuple):
-    """A recorded event."""
-    when: float
-    emitter: Callable
-    args: Tuple
+class LiveEventSource(EventSource):
+    """An event source that receives events from an exchange simulator.
+
+    The connection to the exchange and the decoding of its events are handled
+    by a LiveEventReceiver in a worker thread, so that they do not compete
+    with painting for the GUI thread. Each frame's changes reach the GUI
+    thread as one FrameDelta, which is applied by a single slot: at most one
+    order book, midpoint price and profit or loss signal per instrument or
+    team, and one team_orders_changed signal per team whose orders changed.
+
+    If snapshot_depth is non-zero, the event source subscribes to order book
+    snapshots of that many levels and takes profit or loss from the exchange
+    rather than building its own order books.
+    """
+
+    def __init__(self, host: str, port: int, etf_clamp: float, tick_size: float,
+                 parent: Optional[QtCore.QObject] = None, snapshot_depth: int = 0):
+        """Initialise a new instance of the class."""
+        super().__init__(etf_clamp, tick_size, parent)
+
+        self.host: str = host
+        self.port: int = port
+        self.snapshot_depth: int = snapshot_depth
+
+        self.__receiver = LiveEventReceiver(host, port, etf_clamp, tick_size, snapshot_depth)
+        self.__thread = QtCore.QThread(self)
+        self.__receiver.moveToThread(self.__thread)
+        self.__receiver.frame_ready.connect(self.__on_frame_ready, QtCore.Qt.QueuedConnection)
+        self.__thread.started.connect(self.__receiver.start)
+        self.__thread.finished.connect(self.__receiver.deleteLater)
+        QtCore.QCoreApplication.instance().aboutToQuit.connect(self.stop)
+
+    def __on_frame_ready(self, delta: FrameDelta) -> None:
+        """Callback when the receiver has published the changes for a frame."""
+        for error_message in delta.errors:
+            self.event_source_error_occurred.emit(error_message)
+        for team in delta.logins:
+            self.login_occurred.emit(team)
+        for team, changes in delta.teams.items():
+            self.team_orders_changed.emit(team, changes)
+        for instrument, order_book in delta.order_books.items():
+            self.order_book_changed.emit(instrument, *order_book)
+        for instrument, midpoint in delta.midpoints.items():
+            self.midpoint_price_changed.emit(instrument, *midpoint)
+        for team, profit_loss in delta.profits.items():
+            self.profit_loss_changed.emit(team, *profit_loss)
+        if delta.match_over:
+            self.match_over.emit()
+
+    def _on_timer_tick(self) -> None:
+        """Callback on timer ticks (the receiver keeps its own timer)."""
+
+    def start(self) -> None:
+        """Start this live event source."""
+        self.__thread.start()
+
+    def stop(self) -> None:
+        """Stop this live event source and wait for its worker thread to finish."""
+        if self.__thread.isRunning():
+            self.__thread.quit()
+            self.__thread.wait()
 
 
 class RecordedEventSource(EventSource):
-    """A source of events taken from a recording of a match."""
+    """A source of events taken from a recording of a match.
 
-    def __init__(self, etf_clamp: float, tick_size: float, parent: Optional[QtCore.QObject] = None):
+    Events are read from the match events file as playback reaches them,
+    starting from the checkpoints held in the file's index. Playback can be
+    moved to any time using seek and sped up using set_speed.
+    """
+
+    # Signals
+    playback_time_changed = QtCore.Signal(float)  # time
+
+    def __init__(self, path: pathlib.Path, etf_clamp: float, tick_size: float,
+                 parent: Optional[QtCore.QObject] = None):
         """Initialise a new instance of the class."""
         super().__init__(etf_clamp, tick_size, parent)
 
-        self.__teams: Set[str] = set()
-        self.__end_time: float = 0.0
-        self.__events: List[Event] = list()
-        self.__event_iter: Optional[Iterator] = None
-        self.__next_event: Optional[Event] = None
+        self.path: pathlib.Path = path
+        self.speed: int = 1
+        self.start_time: float = 0.0
+
+        self.__index: Optional[MatchEventsIndex] = None
         self.__now: float = 0.0
-        self.__order_books: Tuple[List[int], ...] = tuple(list() for _ in Instrument)
+        self.__pending: Optional[List[str]] = None
+        self.__pending_offset: int = 0
+        self.__rows: Optional[Iterator[Tuple[int, List[str]]]] = None
+        self.__state: Optional[MatchState] = None
+
+        # Trades from the start of the match up to the scan offset
+        self.__scan_offset: int = 0
+        self.__scan_time: float = 0.0
+        self.__trade_times: List[float] = list()
+        self.__trades: List[Tuple] = list()
+
+        self.__ask_prices: List[int] = [0] * TOP_LEVEL_COUNT
+        self.__ask_volumes: List[int] = [0] * TOP_LEVEL_COUNT
+        self.__bid_prices: List[int] = [0] * TOP_LEVEL_COUNT
+        self.__bid_volumes: List[int] = [0] * TOP_LEVEL_COUNT
+
+        self.__emitters: Dict[MatchEventOperation, Callable] = {
+            MatchEventOperation.AMEND: self.order_amended.emit,
+            MatchEventOperation.CANCEL: self.order_cancelled.emit,
+            MatchEventOperation.INSERT: self.order_inserted.emit,
+            MatchEventOperation.TRADE: self.trade_occurred.emit,
+        }
+
+    @property
+    def end_time(self) -> float:
+        """The time of the last event in the match."""
+        return self.__index.end_time
 
     def _on_timer_tick(self):
         """Callback when the timer ticks."""
-        now = self.__now = self.__now + TICK_INTERVAL_SECONDS
-
-        if self.__next_event.when <= now:
-            self.__next_event.emitter(*self.__next_event.args)
-            event: Optional[Event] = None
-            for event in self.__event_iter:
-                if event.when > now:
-                    break
-                event.emitter(*event.args)
-            self.__next_event = event
-
-        tick = int(now // TICK_INTERVAL_SECONDS)
-        for i in Instrument:
-            if len(self.__order_books[i]) >= (tick + 1) * 4 * TOP_LEVEL_COUNT:
-                data = (self.__order_books[i][j * TOP_LEVEL_COUNT:(j + 1) * TOP_LEVEL_COUNT]
-                        for j in range(tick * 4, (tick + 1) * 4))
-                self.order_book_changed.emit(i, now, *data)
-
-        if self.__now >= self.__end_time:
+        now = self.__now = min(self.__now + TICK_INTERVAL_SECONDS * self.speed, self.__index.end_time)
+
+        state: MatchState = self.__state
+        offset: int = self.__pending_offset
+        row: Optional[List[str]] = self.__pending
+        while row is not None and float(row[0]) <= now:
+            event = state.apply(row)
+            if event is not None:
+                self.__emitters[event[0]](*event[1])
+            next_offset, next_row = next(self.__rows, (-1, None))
+            if offset == self.__scan_offset:
+                self.__on_row_scanned(row, event, next_offset)
+            offset, row = next_offset, next_row
+        self.__pending_offset, self.__pending = offset, row
+
+        self.__publish(now)
+        self.playback_time_changed.emit(now)
+
+        if now >= self.__index.end_time:
             self._timer.stop()
             self.match_over.emit()
 
-    @staticmethod
-    def from_csv(file_object: TextIO, etf_clamp: float, tick_size: float,
-                 parent: Optional[QtCore.QObject] = None):
-        """Create a new RecordedEventSource instance from a CSV file."""
-        source = RecordedEventSource(etf_clamp, tick_size, parent)
-        events = source.__events
-
-        reader = csv.reader(file_object)
-        next(reader)  # Skip header
-
-        accounts: Dict[str, CompetitorAccount] = collections.defaultdict(source._account_factory.create)
-        books: Tuple[OrderBook, ...] = tuple(OrderBook(i, 0.0, 0.0) for i in Instrument)
-        orders: Dict[str, Dict[int, Order]] = collections.defaultdict(dict)
-
-        ask_prices = [0] * TOP_LEVEL_COUNT
-        ask_volumes = [0] * TOP_LEVEL_COUNT
-        bid_prices = [0] * TOP_LEVEL_COUNT
-        bid_volumes = [0] * TOP_LEVEL_COUNT
-
-        def take_snapshot(when: float):
-            for i in Instrument:
-                events.append(Event(when, source.midpoint_price_changed.emit, (i, when, books[i].midpoint_price())))
-                books[i].top_levels(ask_prices, ask_volumes, bid_prices, bid_volumes)
-                source.__order_books[i].extend(itertools.chain(ask_prices, ask_volumes, bid_prices, bid_volumes))
-
-            future_price: int = books[Instrument.FUTURE].last_traded_price()
-            etf_price: int = books[Instrument.ETF].last_traded_price()
-            if future_price is not None and etf_price is not None:
-                for team, account in accounts.items():
-                    account.update(future_price, etf_price)
-                    events.append(Event(when, source.profit_loss_changed.emit,
-                                        (team, when, account.profit_or_loss / 100.0, account.etf_position,
-                                         account.future_position, account.account_balance / 100.0,
-                                         account.total_fees / 100.0)))
-
-        now: float = TICK_INTERVAL_SECONDS
-        for row in reader:
-            tm = float(row[0])
-
-            if tm > now:
-                take_snapshot(now)
-                now += TICK_INTERVAL_SECONDS
-
-            team: str = row[1]
-            order_id: int = int(row[3])
-            operation: str = row[2]
-
-            if team and team not in source.__teams:
-                source.__teams.add(team)
-
-            if operation == "Insert":
-                order = Order(order_id, Instrument(int(row[4])), Lifespan[row[8]], Side[row[5]],
-                              int(row[7]), int(row[6]))
-                books[order.instrument].insert(tm, order)
-                orders[team][order_id] = order
-                events.append(Event(tm, source.order_inserted.emit, (team, tm, order_id, order.instrument,
-                                                                     order.side, order.volume, order.price,
-                                                                     order.lifespan)))
-            elif operation == "Amend":
-                order = orders[team][order_id]
-                volume_delta = int(row[6])
-                books[order.instrument].amend(tm, order, order.volume + volume_delta)
-                if order.remaining_volume == 0:
-                    del orders[team][order_id]
-                events.append(Event(tm, source.order_amended.emit, (team, tm, order_id, volume_delta)))
-            elif operation == "Cancel":
-                order = orders[team].pop(order_id, None)
-                if order:
-                    books[order.instrument].cancel(tm, order)
-                events.append(Event(tm, source.order_cancelled.emit, (team, tm, order_id)))
-            else:  # operation is "Hedge" or "Trade"
-                instrument = Instrument(int(row[4]))
-                side = Side[row[5]]
-                volume = int(row[6])
-                price = float(row[7]) if operation == "Hedge" else int(row[7])
-                fee = int(row[9]) if row[9] else 0
-                accounts[team].transact(instrument, side, price, volume, fee)
-                if operation == "Trade":
-                    if order_id in orders[team] and orders[team][order_id].remaining_volume == 0:
-                        del orders[team][order_id]
-                    events.append(Event(tm, source.trade_occurred.emit, (team, tm, order_id, side, volume, price,
-                                                                         fee)))
-
-        take_snapshot(now)
-        source.__end_time = now
+    def __on_row_scanned(self, row: List[str], event: Optional[Tuple[MatchEventOperation, Tuple]],
+                         next_offset: int) -> None:
+        """Record a trade that extends the contiguous trade history."""
+        if event is not None and event[0] == MatchEventOperation.TRADE:
+            self.__trade_times.append(event[1][1])
+            self.__trades.append(event[1])
+        self.__scan_offset = next_offset
+        self.__scan_time = float(row[0])
+
+    def __publish(self, now: float) -> None:
+        """Emit the midpoint prices, order books and profit or loss at the given time."""
+        state: MatchState = self.__state
+        for i in Instrument:
+            midpoint_price: Optional[float] = state.books[i].midpoint_price()
+            if midpoint_price is not None:
+                self.midpoint_price_changed.emit(i, now, midpoint_price)
+            state.books[i].top_levels(self.__ask_prices, self.__ask_volumes, self.__bid_prices, self.__bid_volumes)
+            self.order_book_changed.emit(i, now, self.__ask_prices, self.__ask_volumes, self.__bid_prices,
+                                         self.__bid_volumes)
+
+        if state.update_accounts():
+            for team, account in state.accounts.items():
+                self.profit_loss_changed.emit(team, now, account.profit_or_loss / 100.0, account.etf_position,
+                                              account.future_position, account.account_balance / 100.0,
+                                              account.total_fees / 100.0)
+
+    def __scan_trades(self, when: float) -> None:
+        """Extend the trade history up to the given time."""
+        if self.__scan_offset < 0 or self.__scan_time >= when:
+            return
+        for offset, row in iter_rows(self.path, self.__scan_offset):
+            tm: float = float(row[0])
+            if tm > when:
+                self.__scan_offset = offset
+                self.__scan_time = when
+                return
+            if row[2] == "Trade":
+                self.__trade_times.append(tm)
+                self.__trades.append((row[1], tm, int(row[3]), Side[row[5]], int(row[6]), int(row[7]),
+                                      int(row[9]) if row[9] else 0))
+        self.__scan_offset = -1
+        self.__scan_time = self.__index.end_time
+
+    def seek(self, when: float) -> None:
+        """Move playback to the given time.
+
+        The order books and accounts are restored from the nearest earlier
+        checkpoint and then fast-forwarded. The state_reset signal is then
+        emitted with the active orders and trades of each team along with the
+        midpoint prices and profit or loss over the preceding
+        SEEK_HISTORY_SECONDS, after which the current state is published as
+        usual.
+        """
+        when = min(max(when, 0.0), self.__index.end_time)
+        self.__scan_trades(when)
+
+        checkpoint: Checkpoint = self.__index.checkpoint_before(max(when - SEEK_HISTORY_SECONDS, 0.0))
+        state = self.__state = MatchState.from_dict(checkpoint.state, self._account_factory)
+        self.__rows = iter_rows(self.path, checkpoint.offset)
+        offset, row = next(self.__rows, (-1, None))
+
+        midpoints: List[Tuple[Instrument, float, float]] = list()
+        profits: List[Tuple[str, float, float]] = list()
+        history_start: float = when - SEEK_HISTORY_SECONDS
+        tick: float = (math.floor(checkpoint.time / TICK_INTERVAL_SECONDS) + 1) * TICK_INTERVAL_SECONDS
+        while True:
+            until: float = tick if tick < when else when
+            while row is not None and float(row[0]) <= until:
+                state.apply(row)
+                offset, row = next(self.__rows, (-1, None))
+            if until == when:
+                break
+            if tick >= history_start:
+                for i in Instrument:
+                    midpoint_price: Optional[float] = state.books[i].midpoint_price()
+                    if midpoint_price is not None:
+                        midpoints.append((i, tick, midpoint_price))
+                if state.update_accounts():
+                    profits.extend((team, tick, account.profit_or_loss / 100.0)
+                                   for team, account in state.accounts.items())
+            tick += TICK_INTERVAL_SECONDS
+        self.__pending_offset, self.__pending = offset, row
+        self.__now = when
+
+        orders = {team: [(tm, o.client_order_id, o.instrument, o.side, o.remaining_volume, o.price)
+                         for tm, o in state.active_orders(team)] for team in self.__index.teams}
+        trades = {team: list() for team in self.__index.teams}
+        for trade in self.__trades[:bisect.bisect_right(self.__trade_times, when)]:
+            trades[trade[0]].append(trade)
+        self.state_reset.emit(when, orders, trades, midpoints, profits)
+
+        self.__publish(when)
+        self.playback_time_changed.emit(when)
+        if not self._timer.isActive() and when < self.__index.end_time:
+            self._timer.start(TICK_INTERVAL_MILLISECONDS)
+
+    def set_speed(self, speed: int) -> None:
+        """Set the playback speed as a multiple of real time."""
+        self.speed = min(max(speed, 1), MAXIMUM_REPLAY_SPEED)
 
+    @staticmethod
+    def from_path(path: pathlib.Path, etf_clamp: float, tick_size: float,
+                  parent: Optional[QtCore.QObject] = None):
+        """Create a new RecordedEventSource instance from a match events file.
+
+        The first time a file is opened, it is read in full to build its index.
+        """
+        source = RecordedEventSource(path, etf_clamp, tick_size, parent)
+        source.__index = open_index(path, source._account_factory)
         return source
 
     def start(self) -> None:
         """Start this recorded event source."""
-        self.__now = 0.0
-        self._timer.start(TICK_INTERVAL_MILLISECONDS)
-        self.__event_iter = iter(self.__events)
-        self.__next_event = next(self.__event_iter, None)
-        for competitor in sorted(self.__teams):
+        checkpoint: Checkpoint = self.__index.checkpoints[0]
+        self.__now = checkpoint.time
+        self.__state = MatchState.from_dict(checkpoint.state, self._account_factory)
+        self.__rows = iter_rows(self.path, checkpoint.offset)
+        self.__pending_offset, self.__pending = next(self.__rows, (-1, None))
+        self.__scan_offset = self.__pending_offset
+        for competitor in self.__index.teams:
             self.login_occurred.emit(competitor)
+        if self.start_time > 0.0:
+            self.seek(self.start_time)
+        else:
+            self._timer.start(TICK_INTERVAL_MILLISECONDS)
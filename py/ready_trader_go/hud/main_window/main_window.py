@@ -15,7 +15,7 @@
 #     You should have received a copy of the GNU Affero General Public
 #     License along with Ready Trader Go.  If not, see
 #     <https://www.gnu.org/licenses/>.
-from typing import Callable, Dict, Optional
+from typing import Callable, Dict, List, Optional
 
 from PySide6 import QtCore, QtGui, QtWidgets
 
@@ -25,13 +25,14 @@ from ready_trader_go.hud.table_gadget import BasicPriceLadderGadget, PerTeamTabl
 from ready_trader_go.hud.table_model import (ActiveOrderTableModel, BasicPriceLadderModel,
                                              ProfitLossTableModel, TradeHistoryTableModel, PriceLadderModel,
                                              TeamLadderVolumes)
-from ready_trader_go.hud.event_source import EventSource
+from ready_trader_go.hud.event_source import MAXIMUM_REPLAY_SPEED, EventSource, RecordedEventSource, TeamChanges
 from ready_trader_go.hud.chart import MidpointChartGadget, ProfitLossChartGadget
 
 from .ui_main_window import Ui_main_window
 
 
 TICK_SIZE: int = 100
+REPLAY_SPEEDS = (1, 2, 5, 10, 20, 50, MAXIMUM_REPLAY_SPEED)
 
 
 class SubWindowEventFilter(QtCore.QObject):
@@ -69,6 +70,8 @@ class MainWindow(Ui_main_window, QtWidgets.QMainWindow):
         event_source.event_source_error_occurred.connect(self.__on_event_source_error_occurred)
         event_source.login_occurred.connect(self.__on_login_occurred)
         event_source.match_over.connect(self.__on_match_over)
+        event_source.state_reset.connect(self.__on_state_reset)
+        event_source.team_orders_changed.connect(self.__on_team_orders_changed)
 
         self.__icon: QtGui.QIcon = icon
         self.__team_active_orders: Dict[str, ActiveOrderTableModel] = dict()
@@ -77,6 +80,8 @@ class MainWindow(Ui_main_window, QtWidgets.QMainWindow):
         self.__selected_team: str = ""
 
         self.__setup_models()
+        if isinstance(event_source, RecordedEventSource):
+            self.__setup_replay_toolbar(event_source)
 
     def __on_event_source_error_occurred(self, error_message: str) -> None:
         """Callback when an error occurs with the event source."""
@@ -116,6 +121,37 @@ class MainWindow(Ui_main_window, QtWidgets.QMainWindow):
         message_dialog.setText("Simulation Complete")
         message_dialog.show()
 
+    def __on_playback_time_changed(self, now: float) -> None:
+        """Callback when the replay playback time changes."""
+        if not self.__replay_slider.isSliderDown():
+            self.__replay_slider.setValue(int(now))
+        self.__replay_time_label.setText("%d:%02d" % divmod(int(now), 60))
+
+    def __on_replay_slider_released(self) -> None:
+        """Callback when the replay time slider is released."""
+        self.event_source.seek(float(self.__replay_slider.value()))
+
+    def __on_state_reset(self, now: float, orders: Dict[str, List], trades: Dict[str, List], midpoints: List,
+                         profits: List) -> None:
+        """Callback when the event source replaces its state (for example, after a seek)."""
+        for team, model in self.__team_active_orders.items():
+            model.reset_orders(orders.get(team, ()))
+        for team, volumes in self.__team_volumes.items():
+            volumes.reset_orders(orders.get(team, ()))
+        for team, model in self.__team_trades.items():
+            model.reset_trades(trades.get(team, ()))
+        if self.__mcg:
+            self.__mcg.reset(now, midpoints)
+        if self.__pnl_chart:
+            self.__pnl_chart.reset(now, profits)
+
+    def __on_team_orders_changed(self, team: str, changes: TeamChanges) -> None:
+        """Callback when a team's orders and trades change during a frame."""
+        if team in self.__team_active_orders:
+            self.__team_active_orders[team].apply_changes(changes)
+            self.__team_volumes[team].apply_changes(changes)
+            self.__team_trades[team].apply_changes(changes)
+
     def __on_selected_competitor_changed(self, team: str) -> None:
         """Callback when the selected competitor changes."""
         if team and team != self.__selected_team:
@@ -260,6 +296,33 @@ class MainWindow(Ui_main_window, QtWidgets.QMainWindow):
         self.profit_loss_chart_action.setStatusTip("Reopen the profit or loss chart")
         self.profit_loss_chart_action.triggered.connect(self.__show_profit_loss_chart)
 
+    def __setup_replay_toolbar(self, event_source: RecordedEventSource) -> None:
+        """Setup the toolbar used to control the playback of a recorded match."""
+        toolbar: QtWidgets.QToolBar = self.addToolBar("Replay")
+        toolbar.setMovable(False)
+
+        self.__replay_slider = QtWidgets.QSlider(QtCore.Qt.Horizontal, toolbar)
+        self.__replay_slider.setRange(0, int(event_source.end_time))
+        self.__replay_slider.setStatusTip("Move the replay to a different time")
+        self.__replay_slider.sliderReleased.connect(self.__on_replay_slider_released)
+        toolbar.addWidget(self.__replay_slider)
+
+        self.__replay_time_label = QtWidgets.QLabel("0:00", toolbar)
+        self.__replay_time_label.setMinimumWidth(50)
+        self.__replay_time_label.setAlignment(QtCore.Qt.AlignCenter)
+        toolbar.addWidget(self.__replay_time_label)
+
+        speed_combo_box = QtWidgets.QComboBox(toolbar)
+        speed_combo_box.setStatusTip("Change the replay speed")
+        speeds = sorted(set(REPLAY_SPEEDS + (event_source.speed,)))
+        for speed in speeds:
+            speed_combo_box.addItem("%dx" % speed, speed)
+        speed_combo_box.setCurrentIndex(speeds.index(event_source.speed))
+        speed_combo_box.currentIndexChanged.connect(lambda i: event_source.set_speed(speed_combo_box.itemData(i)))
+        toolbar.addWidget(speed_combo_box)
+
+        event_source.playback_time_changed.connect(self.__on_playback_time_changed)
+
     def __setup_models(self) -> None:
         """Setup the data models."""
         self.__etf_model = PriceLadderModel(Instrument.ETF, TICK_SIZE)
@@ -17,16 +17,19 @@
 #     <https://www.gnu.org/licenses/>.
 import collections
 
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
 from PySide6 import QtCore, QtGui
 from PySide6.QtCore import Qt
 
+from ready_trader_go.hud.event_source import TeamChanges
 from ready_trader_go.types import Instrument, Lifespan, Side
 
 _ALIGN_CENTER_LEFT = int(Qt.AlignLeft) | int(Qt.AlignVCenter)
 _ALIGN_CENTER_RIGHT = int(Qt.AlignRight) | int(Qt.AlignVCenter)
 
+FRAME_INTERVAL: int = 16  # milliseconds between batches of changes to the active orders table
+
 
 class BaseTableModel(QtCore.QAbstractTableModel):
     """Base data model for table."""
@@ -85,7 +88,17 @@ class ActiveOrderTableModel(BaseTableModel):
         """Initialise a new instance of the class."""
         super().__init__(parent)
         self.team: str = team
+        self.__changed: Set[int] = set()
+        self.__inserted: Dict[int, List[str, int, str, str, int, str]] = dict()
         self.__orders: List[List[str, int, str, str, int, str]] = list()
+        self.__positions: Dict[int, int] = dict()
+        self.__records: Dict[int, List[str, int, str, str, int, str]] = dict()
+        self.__removed: Set[int] = set()
+
+        self.__frame_timer = QtCore.QTimer(self)
+        self.__frame_timer.setInterval(FRAME_INTERVAL)
+        self.__frame_timer.setSingleShot(True)
+        self.__frame_timer.timeout.connect(self.__on_frame_timer_tick)
 
     def data(self, index: QtCore.QModelIndex, role: int = Qt.DisplayRole) -> Any:
         """Return information about a specified table cell."""
@@ -93,21 +106,94 @@ class ActiveOrderTableModel(BaseTableModel):
             return self.__orders[self._row_count - index.row() - 1][index.column()]
         return super().data(index, role)
 
-    def __remove_row(self, row: int) -> None:
-        self.beginRemoveRows(QtCore.QModelIndex(), row, row)
-        self._row_count -= 1
-        self.__orders.pop(row)
-        self.endRemoveRows()
+    def __on_frame_timer_tick(self) -> None:
+        """Apply the changes made since the last frame as one batch of removed, changed and inserted rows."""
+        if self.__removed:
+            self.__remove_rows()
+
+        if self.__changed:
+            positions: List[int] = [self.__positions[order_id] for order_id in self.__changed
+                                    if order_id in self.__positions]
+            if positions:
+                self.dataChanged.emit(self.createIndex(self._row_count - max(positions) - 1, self._VOLUME_COLUMN),
+                                      self.createIndex(self._row_count - min(positions) - 1, self._VOLUME_COLUMN))
+            self.__changed.clear()
+
+        if self.__inserted:
+            self.beginInsertRows(QtCore.QModelIndex(), 0, len(self.__inserted) - 1)
+            for order_id, record in self.__inserted.items():
+                self.__positions[order_id] = len(self.__orders)
+                self.__orders.append(record)
+            self._row_count = len(self.__orders)
+            self.__inserted.clear()
+            self.endInsertRows()
+
+    def __remove_rows(self) -> None:
+        """Remove the rows of orders that are no longer active, one run of adjacent rows at a time."""
+        orders: List[List[str, int, str, str, int, str]] = self.__orders
+        positions: List[int] = sorted(self.__positions.pop(order_id) for order_id in self.__removed)
+        self.__removed.clear()
+
+        # Removing a run of orders leaves the rows of later (i.e. newer, higher up) orders unchanged, so work
+        # from the oldest order to the newest.
+        removed_count: int = 0
+        i: int = 0
+        while i < len(positions):
+            j: int = i + 1
+            while j < len(positions) and positions[j] == positions[j - 1] + 1:
+                j += 1
+            first: int = positions[i] - removed_count
+            last: int = positions[j - 1] - removed_count
+            self.beginRemoveRows(QtCore.QModelIndex(), self._row_count - last - 1, self._row_count - first - 1)
+            del orders[first:last + 1]
+            self._row_count = len(orders)
+            self.endRemoveRows()
+            removed_count += j - i
+            i = j
+
+        self.__positions = {record[self._ORDER_ID_COLUMN]: i for i, record in enumerate(orders)}
+
+    def __start_frame(self) -> None:
+        """Ensure the changes made to this model will be applied in the next frame."""
+        if not self.__frame_timer.isActive():
+            self.__frame_timer.start()
 
     def __update_order_volume(self, order_id: int, volume_delta: int) -> None:
-        row = next((i for i in range(self._row_count) if self.__orders[i][self._ORDER_ID_COLUMN] == order_id), None)
-        if row is not None:
-            self.__orders[row][self._VOLUME_COLUMN] += volume_delta
-            if self.__orders[row][self._VOLUME_COLUMN] <= 0:
-                self.__remove_row(row)
+        record = self.__records.get(order_id)
+        if record is not None:
+            record[self._VOLUME_COLUMN] += volume_delta
+            if record[self._VOLUME_COLUMN] <= 0:
+                self.__remove_order(order_id)
             else:
-                self.dataChanged.emit(self.createIndex(row, self._VOLUME_COLUMN),
-                                      self.createIndex(row, self._VOLUME_COLUMN))
+                self.__changed.add(order_id)
+                self.__start_frame()
+
+    def __insert_order(self, now: float, order_id: int, instrument: Instrument, side: Side, volume: int,
+                       price: int) -> None:
+        record = ["%.3f" % now, order_id, instrument.name, side.name.capitalize(), volume, "%.2f" % (price / 100.0)]
+        self.__records[order_id] = record
+        self.__inserted[order_id] = record
+        self.__start_frame()
+
+    def __remove_order(self, order_id: int) -> None:
+        del self.__records[order_id]
+        if order_id in self.__positions:
+            self.__removed.add(order_id)
+            self.__changed.discard(order_id)
+            self.__start_frame()
+        else:
+            del self.__inserted[order_id]
+
+    def apply_changes(self, changes: TeamChanges) -> None:
+        """Apply the net changes to the team's orders during one frame."""
+        for order_id in changes.cancelled:
+            if order_id in self.__records:
+                self.__remove_order(order_id)
+        for order_id, volume_delta in changes.amended.items():
+            self.__update_order_volume(order_id, volume_delta)
+        for now, order in changes.inserted.values():
+            self.__insert_order(now, order.client_order_id, order.instrument, order.side, order.remaining_volume,
+                                order.price)
 
     def on_order_amended(self, team: str, _: float, order_id: int, volume_delta: int) -> None:
         """Callback when an order is amended."""
@@ -116,20 +202,14 @@ class ActiveOrderTableModel(BaseTableModel):
 
     def on_order_cancelled(self, team: str, now: float, order_id: int) -> None:
         """Callback when an order is cancelled."""
-        if team == self.team:
-            row = next((i for i in range(self._row_count) if self.__orders[i][self._ORDER_ID_COLUMN] == order_id), None)
-            if row is not None:
-                self.__remove_row(row)
+        if team == self.team and order_id in self.__records:
+            self.__remove_order(order_id)
 
     def on_order_inserted(self, team: str, now: float, order_id: int, instrument: Instrument, side: Side,
                           volume: int, price: int, _: Lifespan) -> None:
         """Callback when an order is inserted."""
         if team == self.team:
-            self.beginInsertRows(QtCore.QModelIndex(), 0, 0)
-            self._row_count += 1
-            self.__orders.append(["%.3f" % now, order_id, instrument.name, side.name.capitalize(), volume,
-                                  "%.2f" % (price / 100.0)])
-            self.endInsertRows()
+            self.__insert_order(now, order_id, instrument, side, volume, price)
 
     def on_trade_occurred(self, team: str, now: float, order_id: int, side: Side, volume: int, price: int,
                           fee: int) -> None:
@@ -137,6 +217,20 @@ class ActiveOrderTableModel(BaseTableModel):
         if team == self.team:
             self.__update_order_volume(order_id, -volume)
 
+    def reset_orders(self, orders: Iterable[Tuple[float, int, Instrument, Side, int, int]]) -> None:
+        """Replace the content of this model with the given (time, order_id, instrument, side, volume, price)."""
+        self.beginResetModel()
+        self.__frame_timer.stop()
+        self.__changed.clear()
+        self.__inserted.clear()
+        self.__removed.clear()
+        self.__orders = [["%.3f" % now, order_id, instrument.name, side.name.capitalize(), volume,
+                          "%.2f" % (price / 100.0)] for now, order_id, instrument, side, volume, price in sorted(orders)]
+        self.__positions = {record[self._ORDER_ID_COLUMN]: i for i, record in enumerate(self.__orders)}
+        self.__records = {record[self._ORDER_ID_COLUMN]: record for record in self.__orders}
+        self._row_count = len(self.__orders)
+        self.endResetModel()
+
 
 class BasicPriceLadderModel(BaseTableModel):
     """Table model for a basic price ladder."""
@@ -320,14 +414,59 @@ class TeamLadderVolumes:
         self.__bid_orders: Dict[int, _Order] = dict()
         self.__model: Optional[PriceLadderModel] = None
 
+    def apply_changes(self, changes: TeamChanges) -> None:
+        """Apply the net changes to the team's orders during one frame."""
+        for order_id in changes.cancelled:
+            self.__cancel_order(order_id)
+        for order_id, volume_delta in changes.amended.items():
+            self.__subtract_volume(order_id, -volume_delta)
+        for _, order in changes.inserted.values():
+            self.__insert_order(order.client_order_id, order.side, order.remaining_volume, order.price)
+
     def clear_model(self) -> None:
         """Clear the price ladder model."""
         self.__model = None
 
+    def reset_orders(self, orders: Iterable[Tuple[float, int, Instrument, Side, int, int]]) -> None:
+        """Replace the team's orders with the given (time, order_id, instrument, side, volume, price)."""
+        self.team_ask_volumes.clear()
+        self.team_bid_volumes.clear()
+        self.__ask_orders.clear()
+        self.__bid_orders.clear()
+        for _, order_id, _, side, volume, price in orders:
+            if side == Side.SELL:
+                self.__ask_orders[order_id] = _Order(price, volume)
+                self.team_ask_volumes[price] += volume
+            else:
+                self.__bid_orders[order_id] = _Order(price, volume)
+                self.team_bid_volumes[price] += volume
+
+        if self.__model:
+            self.__model.set_competitor_model(self)
+
     def set_model(self, model: PriceLadderModel) -> None:
         """Set the price ladder model."""
         self.__model = model
 
+    def __cancel_order(self, order_id: int) -> None:
+        if order_id in self.__ask_orders:
+            self.__subtract_volume(order_id, self.__ask_orders[order_id].remaining_volume)
+        elif order_id in self.__bid_orders:
+            self.__subtract_volume(order_id, self.__bid_orders[order_id].remaining_volume)
+
+    def __insert_order(self, order_id: int, side: Side, volume: int, price: int) -> None:
+        if side == Side.SELL:
+            self.__ask_orders[order_id] = _Order(price, volume)
+            self.team_ask_volumes[price] += volume
+        else:
+            self.__bid_orders[order_id] = _Order(price, volume)
+            self.team_bid_volumes[price] += volume
+
+        if self.__model:
+            column: int = self.__model.TEAM_ASK_COLUMN if side == Side.SELL else self.__model.TEAM_BID_COLUMN
+            index = self.__model.createIndex(self.__model.get_row(price), column)
+            self.__model.dataChanged.emit(index, index)
+
     def __subtract_volume(self, order_id: int, volume: int) -> None:
         if order_id in self.__ask_orders:
             order = self.__ask_orders[order_id]
@@ -362,26 +501,13 @@ class TeamLadderVolumes:
     def on_order_cancelled(self, team: str, now: float, order_id: int) -> None:
         """Callback when an order is cancelled."""
         if team == self.team:
-            if order_id in self.__ask_orders:
-                self.__subtract_volume(order_id, self.__ask_orders[order_id].remaining_volume)
-            elif order_id in self.__bid_orders:
-                self.__subtract_volume(order_id, self.__bid_orders[order_id].remaining_volume)
+            self.__cancel_order(order_id)
 
     def on_order_inserted(self, team: str, now: float, order_id: int, instrument: Instrument, side: Side,
                           volume: int, price: int, lifespan: Lifespan) -> None:
         """Callback when an order is inserted."""
         if team == self.team:
-            if side == Side.SELL:
-                self.__ask_orders[order_id] = _Order(price, volume)
-                self.team_ask_volumes[price] += volume
-            else:
-                self.__bid_orders[order_id] = _Order(price, volume)
-                self.team_bid_volumes[price] += volume
-
-            if self.__model:
-                column: int = self.__model.TEAM_ASK_COLUMN if side == Side.SELL else self.__model.TEAM_BID_COLUMN
-                index = self.__model.createIndex(self.__model.get_row(price), column)
-                self.__model.dataChanged.emit(index, index)
+            self.__insert_order(order_id, side, volume, price)
 
     def on_trade_occurred(self, team: str, now: float, order_id: int, side: Side, volume: int, price: int,
                           fee: int) -> None:
@@ -490,6 +616,16 @@ class TradeHistoryTableModel(BaseTableModel):
             return self.__trades[self._row_count - index.row() - 1][index.column()]
         return super().data(index, role)
 
+    def apply_changes(self, changes: TeamChanges) -> None:
+        """Add the team's trades during one frame."""
+        if changes.trades:
+            self.beginInsertRows(QtCore.QModelIndex(), 0, len(changes.trades) - 1)
+            self.__trades.extend(("%.3f" % now, order_id, ("Sell", "Buy")[side], volume, "%.2f" % (price / 100.0),
+                                  "%.2f" % (-fee / 100.0))
+                                 for now, order_id, side, volume, price, fee in changes.trades)
+            self._row_count = len(self.__trades)
+            self.endInsertRows()
+
     def on_trade_occurred(self, team: str, now: float, order_id: int, side: Side, volume: int, price: int,
                           fee: int) -> None:
         """Callback when a trade occurs."""
@@ -499,3 +635,11 @@ class TradeHistoryTableModel(BaseTableModel):
             self.__trades.append(("%.3f" % now, order_id, ("Sell", "Buy")[side], volume, "%.2f" % (price / 100.0),
                                   "%.2f" % (-fee / 100.0)))
             self.endInsertRows()
+
+    def reset_trades(self, trades: Iterable[Tuple[str, float, int, Side, int, int, int]]) -> None:
+        """Replace the content of this model with the given (team, time, order_id, side, volume, price, fee)."""
+        self.beginResetModel()
+        self.__trades = [("%.3f" % now, order_id, ("Sell", "Buy")[side], volume, "%.2f" % (price / 100.0),
+                          "%.2f" % (-fee / 100.0)) for _, now, order_id, side, volume, price, fee in trades]
+        self._row_count = len(self.__trades)
+        self.endResetModel()
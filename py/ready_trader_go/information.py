@@ -20,6 +20,7 @@ import logging
 
 from typing import Iterable, List, Optional, Tuple
 
+from .feed import FeedRecorder
 from .messages import (HEADER, HEADER_SIZE, ORDER_BOOK_HEADER, ORDER_BOOK_HEADER_SIZE,
                        ORDER_BOOK_MESSAGE, ORDER_BOOK_MESSAGE_SIZE, TRADE_TICKS_HEADER, TRADE_TICKS_HEADER_SIZE,
                        TRADE_TICKS_MESSAGE, TRADE_TICKS_MESSAGE_SIZE, MessageType)
@@ -33,13 +34,14 @@ class InformationPublisher(asyncio.DatagramProtocol):
     """A publisher of exchange information."""
 
     def __init__(self, loop: asyncio.AbstractEventLoop, publisher_factory: PublisherFactory,
-                 order_books: Iterable[OrderBook], timer: Timer):
+                 order_books: Iterable[OrderBook], timer: Timer, recorder: Optional[FeedRecorder] = None):
         """Initialize a new instance of the InformationChannel class."""
         self.__event_loop: asyncio.AbstractEventLoop = loop
         self.__file_number: int = 0
         self.__logger: logging.Logger = logging.getLogger("INFORMATION")
         self.__order_books: Tuple[OrderBook] = tuple(order_books)
         self.__publisher_factory: PublisherFactory = publisher_factory
+        self.__recorder: Optional[FeedRecorder] = recorder
         self.__send_ticks_handles: List[Optional[asyncio.Handle]] = [None for _ in Instrument]
         self.__trade_ticks_sequences: List[int] = [1 for _ in Instrument]
         self.__transport: Optional[asyncio.WriteTransport] = None
@@ -74,6 +76,8 @@ class InformationPublisher(asyncio.DatagramProtocol):
             ORDER_BOOK_MESSAGE.pack_into(self.__book_message, ORDER_BOOK_HEADER_SIZE, *self.__ask_prices,
                                          *self.__ask_volumes, *self.__bid_prices, *self.__bid_volumes)
             self.__transport.write(self.__book_message)
+            if self.__recorder is not None:
+                self.__recorder.record(self.__book_message)
 
     def on_trade(self, book: OrderBook) -> None:
         """Called when a trade occurs in one of the order books."""
@@ -91,6 +95,8 @@ class InformationPublisher(asyncio.DatagramProtocol):
             TRADE_TICKS_MESSAGE.pack_into(self.__ticks_message, TRADE_TICKS_HEADER_SIZE, *self.__ask_prices,
                                           *self.__ask_volumes, *self.__bid_prices, *self.__bid_volumes)
             self.__transport.write(self.__ticks_message)
+            if self.__recorder is not None:
+                self.__recorder.record(self.__ticks_message)
 
     async def start(self) -> None:
         """Start this publisher."""
@@ -0,0 +1,119 @@
+# Copyright 2021 Optiver Asia Pacific Pty. Ltd.
+#
+# This file is part of Ready Trader Go.
+#
+#     Ready Trader Go is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU Affero General Public License
+#     as published by the Free Software Foundation, either version 3 of
+#     the License, or (at your option) any later version.
+#
+#     Ready Trader Go is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public
+#     License along with Ready Trader Go.  If not, see
+#     <https://www.gnu.org/licenses/>.
+import enum
+import logging
+import struct
+
+from typing import Any, BinaryIO, Iterator, Optional, Tuple
+
+from .messages import HEADER_SIZE
+
+
+JOURNAL_HEADER = struct.Struct("<8sI")  # magic, version
+JOURNAL_MAGIC: bytes = b"RTGINPUT"
+JOURNAL_VERSION: int = 1
+
+# Time, record type, message type, connection id (or tick number) and message length (including its header)
+RECORD_HEADER = struct.Struct("<dBBIH")
+
+
+class JournalRecordType(enum.IntEnum):
+    CONNECT = 0
+    DISCONNECT = 1
+    MESSAGE = 2
+    TICK = 3
+    MARKET_TICK = 4
+
+
+class InputJournal:
+    """A binary record of every input to a match.
+
+    The journal holds each message received from an auto-trader, each
+    auto-trader connection and disconnection, and each tick of the tick and
+    market events timers, together with its match time, so that the match
+    can be rebuilt from the journal and the market data alone.
+    """
+
+    def __init__(self, filename: str):
+        """Initialise a new instance of the InputJournal class."""
+        self.filename: str = filename
+
+        self.__file: Optional[BinaryIO] = open(filename, "wb")
+        self.__logger: logging.Logger = logging.getLogger("JOURNAL")
+        self.__next_connection_id: int = 1
+
+        self.__file.write(JOURNAL_HEADER.pack(JOURNAL_MAGIC, JOURNAL_VERSION))
+
+    def close(self) -> None:
+        """Close this journal."""
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+            self.__logger.info("closed input journal: filename='%s'", self.filename)
+
+    def connect(self, now: float) -> int:
+        """Record a new connection from an auto-trader and return its connection id."""
+        connection_id = self.__next_connection_id
+        self.__next_connection_id += 1
+        if self.__file is not None:
+            self.__file.write(RECORD_HEADER.pack(now, JournalRecordType.CONNECT, 0, connection_id, 0))
+        return connection_id
+
+    def disconnect(self, now: float, connection_id: int) -> None:
+        """Record the loss of a connection."""
+        if self.__file is not None:
+            self.__file.write(RECORD_HEADER.pack(now, JournalRecordType.DISCONNECT, 0, connection_id, 0))
+
+    def message(self, now: float, connection_id: int, typ: int, data: bytes, start: int, length: int) -> None:
+        """Record a message received from an auto-trader, given as it is to Connection.on_message."""
+        if self.__file is not None:
+            self.__file.write(RECORD_HEADER.pack(now, JournalRecordType.MESSAGE, typ, connection_id, length))
+            self.__file.write(memoryview(data)[start - HEADER_SIZE:start - HEADER_SIZE + length])
+
+    def on_market_timer_tick(self, timer: Any, now: float, tick_number: int) -> None:
+        """Record a tick of the market events timer."""
+        if self.__file is not None:
+            self.__file.write(RECORD_HEADER.pack(now, JournalRecordType.MARKET_TICK, 0, tick_number, 0))
+
+    def on_timer_stopped(self, timer: Any, now: float) -> None:
+        """Close this journal when the match ends."""
+        self.close()
+
+    def on_timer_tick(self, timer: Any, now: float, tick_number: int) -> None:
+        """Record a tick of the tick timer."""
+        if self.__file is not None:
+            self.__file.write(RECORD_HEADER.pack(now, JournalRecordType.TICK, 0, tick_number, 0))
+
+
+def read_journal(filename: str) -> Iterator[Tuple[JournalRecordType, float, int, int, bytes]]:
+    """Yield the record type, time, connection id (or tick number), message type and message of each record.
+
+    Each message includes its header.
+    """
+    with open(filename, "rb") as journal:
+        magic, version = JOURNAL_HEADER.unpack(journal.read(JOURNAL_HEADER.size))
+        if magic != JOURNAL_MAGIC or version != JOURNAL_VERSION:
+            raise Exception("'%s' is not an input journal of a supported version" % filename)
+
+        header_size: int = RECORD_HEADER.size
+        while True:
+            header: bytes = journal.read(header_size)
+            if len(header) < header_size:
+                return
+            now, record_type, typ, connection_id, length = RECORD_HEADER.unpack(header)
+            yield JournalRecordType(record_type), now, connection_id, typ, journal.read(length) if length else b""
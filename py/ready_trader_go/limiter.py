@@ -18,11 +18,12 @@
 import collections
 import sys
 
-from typing import Deque
+from typing import Deque, Iterable
 
 
 class FrequencyLimiter(object):
     """Limit the frequency of events in a specified time interval."""
+    __slots__ = ("events", "interval", "limit", "value")
 
     def __init__(self, interval: float, limit: int):
         """Initialise a new instance of the FrequencyLimiter class."""
@@ -51,6 +52,22 @@ class FrequencyLimiter(object):
 
         return self.value > self.limit
 
+    def current_value(self, now: float) -> int:
+        """Return the number of events in the interval ending at the given time, without recording an event."""
+        epsilon: float = sys.float_info.epsilon
+        window_start: float = now - self.interval
+        expired: int = 0
+        for first in self.events:
+            if (first - window_start) > ((first if first > window_start else window_start) * epsilon):
+                break
+            expired += 1
+        return self.value - expired
+
+    def restore(self, event_times: Iterable[float]) -> None:
+        """Restore the times of the events in the current interval, as recorded in a checkpoint."""
+        self.events.extend(event_times)
+        self.value = len(self.events)
+
 
 class FrequencyLimiterFactory:
     """A factory class for FrequencyLimiters."""
@@ -0,0 +1,283 @@
+# Copyright 2021 Optiver Asia Pacific Pty. Ltd.
+#
+# This file is part of Ready Trader Go.
+#
+#     Ready Trader Go is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU Affero General Public License
+#     as published by the Free Software Foundation, either version 3 of
+#     the License, or (at your option) any later version.
+#
+#     Ready Trader Go is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public
+#     License along with Ready Trader Go.  If not, see
+#     <https://www.gnu.org/licenses/>.
+import array
+import asyncio
+import collections
+import hashlib
+import logging
+import multiprocessing
+import struct
+import time
+import zlib
+
+from typing import Any, Deque, Dict, List, Optional, Sequence
+
+from .messages import (AMEND_MESSAGE, AMEND_MESSAGE_SIZE, CANCEL_MESSAGE, CANCEL_MESSAGE_SIZE, HEADER, HEADER_SIZE,
+                       HEDGE_MESSAGE, HEDGE_MESSAGE_SIZE, INSERT_MESSAGE, INSERT_MESSAGE_SIZE, LOGIN_MESSAGE,
+                       LOGIN_MESSAGE_SIZE, Connection, MessageType, Subscription)
+from .order_book import MAXIMUM_ASK
+from .pubsub import SubscriberFactory
+from .types import Lifespan, Side
+
+
+# Order status, hedge filled and error messages all start with the client order id
+CLIENT_ORDER_ID = struct.Struct("!I")
+
+# The kinds of message sent by a pseudo-trader, in the order used in the results
+MESSAGE_KINDS = ("Insert", "Amend", "Cancel", "Hedge")
+
+DEFAULT_DURATION: float = 30.0
+DEFAULT_HEDGE_FRACTION: float = 0.1
+DEFAULT_RATE_FRACTION: float = 0.8
+DRAIN_TIME: float = 0.5
+PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+TRADER_NAME: str = "Load%04d"
+
+
+def trader_secret(name: str) -> str:
+    """Return the secret of the named pseudo-trader."""
+    return hashlib.sha256(b"ready-trader-go/loadgen/" + name.encode()).hexdigest()[:16]
+
+
+def traders_config(count: int) -> Dict[str, str]:
+    """Return the names and secrets of the given number of pseudo-traders, for the Traders configuration."""
+    return {name: trader_secret(name) for name in (TRADER_NAME % i for i in range(1, count + 1))}
+
+
+def maximum_rate(config: Dict[str, Any]) -> float:
+    """Return the number of messages per second each auto-trader may send without breaching the limit."""
+    limits = config["Limits"]
+    return limits["MessageFrequencyLimit"] * config["Engine"]["Speed"] / limits["MessageFrequencyInterval"]
+
+
+class MarketOpenWatcher(Subscription):
+    """Wait for the first order book update, which is sent once the market opens."""
+
+    def __init__(self):
+        """Initialise a new instance of the MarketOpenWatcher class."""
+        Subscription.__init__(self)
+        self.market_open: asyncio.Event = asyncio.Event()
+
+    def on_datagram(self, typ: int, data: bytes, start: int, length: int) -> None:
+        """Called when an information message is received from the exchange simulator."""
+        if typ == MessageType.ORDER_BOOK_UPDATE:
+            self.market_open.set()
+
+
+class PseudoTrader(Connection):
+    """A pseudo-trader which sends a steady stream of messages and times the replies.
+
+    Orders are placed at prices far from the market so that they never
+    trade. Each order is inserted, amended and then cancelled, and hedge
+    orders of one lot are sent in alternate directions, so every message has
+    exactly one reply (an order status, hedge filled or error message).
+    """
+
+    def __init__(self, name: str, secret: str, tick_size: int):
+        """Initialise a new instance of the PseudoTrader class."""
+        Connection.__init__(self)
+
+        self.disconnected: bool = False
+        self.error_count: int = 0
+        self.latencies: Dict[str, array.array] = {kind: array.array("d") for kind in MESSAGE_KINDS}
+        self.name: str = name
+        self.secret: str = secret
+        self.sent: Dict[str, int] = dict.fromkeys(MESSAGE_KINDS, 0)
+
+        self.__amend_message = bytearray(AMEND_MESSAGE_SIZE)
+        self.__cancel_message = bytearray(CANCEL_MESSAGE_SIZE)
+        self.__hedge_message = bytearray(HEDGE_MESSAGE_SIZE)
+        self.__insert_message = bytearray(INSERT_MESSAGE_SIZE)
+        self.__logger: logging.Logger = logging.getLogger("LOADGEN")
+        self.__maximum_price: int = MAXIMUM_ASK - MAXIMUM_ASK % tick_size
+        self.__minimum_price: int = tick_size
+        self.__pending: Dict[int, Deque] = collections.defaultdict(collections.deque)
+
+        HEADER.pack_into(self.__amend_message, 0, AMEND_MESSAGE_SIZE, MessageType.AMEND_ORDER)
+        HEADER.pack_into(self.__cancel_message, 0, CANCEL_MESSAGE_SIZE, MessageType.CANCEL_ORDER)
+        HEADER.pack_into(self.__hedge_message, 0, HEDGE_MESSAGE_SIZE, MessageType.HEDGE_ORDER)
+        HEADER.pack_into(self.__insert_message, 0, INSERT_MESSAGE_SIZE, MessageType.INSERT_ORDER)
+
+    @property
+    def unanswered_count(self) -> int:
+        """Return the number of messages which have not had a reply."""
+        return sum(len(p) for p in self.__pending.values())
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        """Called when the connection to the exchange simulator is lost."""
+        Connection.connection_lost(self, exc)
+        if not self._closing:
+            self.disconnected = True
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        """Called when the connection to the exchange simulator is established."""
+        Connection.connection_made(self, transport)
+        self.send_message(MessageType.LOGIN, LOGIN_MESSAGE.pack(self.name.encode(), self.secret.encode()),
+                          LOGIN_MESSAGE_SIZE)
+
+    def on_message(self, typ: int, data: bytes, start: int, length: int) -> None:
+        """Called when a message is received from the exchange simulator."""
+        if typ == MessageType.ORDER_STATUS or typ == MessageType.HEDGE_FILLED or typ == MessageType.ERROR:
+            now: float = time.perf_counter()
+            client_order_id, = CLIENT_ORDER_ID.unpack_from(data, start)
+            if typ == MessageType.ERROR:
+                self.error_count += 1
+                if client_order_id == 0:
+                    return
+            pending = self.__pending.get(client_order_id)
+            if pending:
+                kind, sent = pending.popleft()
+                self.latencies[kind].append(now - sent)
+                if not pending:
+                    del self.__pending[client_order_id]
+
+    async def run(self, rate: float, hedge_fraction: float, end_time: float) -> None:
+        """Send messages at the given rate until the end time."""
+        loop = asyncio.get_running_loop()
+        interval: float = 1.0 / rate
+        # Spread the pseudo-traders' first messages over one interval, the same way in every run
+        next_time: float = loop.time() + interval * (zlib.crc32(self.name.encode()) % 1000) / 1000.0
+        client_order_id: int = 0
+        hedge_credit: float = 0.0
+        hedge_side: Side = Side.BUY
+        step: int = 0
+
+        while next_time < end_time:
+            delay: float = next_time - loop.time()
+            if delay > 0.0:
+                await asyncio.sleep(delay)
+            if self.disconnected:
+                return
+            next_time += interval
+
+            hedge_credit += hedge_fraction
+            if hedge_credit >= 1.0:
+                hedge_credit -= 1.0
+                client_order_id += 1
+                price = self.__maximum_price if hedge_side == Side.BUY else self.__minimum_price
+                HEDGE_MESSAGE.pack_into(self.__hedge_message, HEADER_SIZE, client_order_id, hedge_side, price, 1)
+                self.__send("Hedge", client_order_id, self.__hedge_message)
+                hedge_side = Side.SELL if hedge_side == Side.BUY else Side.BUY
+            elif step == 0:
+                client_order_id += 1
+                order_id = client_order_id
+                INSERT_MESSAGE.pack_into(self.__insert_message, HEADER_SIZE, order_id, Side.BUY, self.__minimum_price,
+                                         2, Lifespan.GOOD_FOR_DAY)
+                self.__send("Insert", order_id, self.__insert_message)
+                step = 1
+            elif step == 1:
+                AMEND_MESSAGE.pack_into(self.__amend_message, HEADER_SIZE, order_id, 1)
+                self.__send("Amend", order_id, self.__amend_message)
+                step = 2
+            else:
+                CANCEL_MESSAGE.pack_into(self.__cancel_message, HEADER_SIZE, order_id)
+                self.__send("Cancel", order_id, self.__cancel_message)
+                step = 0
+
+    def __send(self, kind: str, client_order_id: int, message: bytearray) -> None:
+        """Send a message and remember when it was sent."""
+        self.__pending[client_order_id].append((kind, time.perf_counter()))
+        self.sent[kind] += 1
+        self._connection_transport.write(message)
+
+
+async def __run_pseudo_traders(config: Dict[str, Any], names: Sequence[str], rate: float, hedge_fraction: float,
+                               duration: float) -> Dict[str, Any]:
+    """Connect the pseudo-traders, wait for the market to open and then run them for the given duration."""
+    loop = asyncio.get_running_loop()
+    exec_ = config["Execution"]
+    info = config["Information"]
+    tick_size: int = int(round(config["Instrument"]["TickSize"] * 100.0))
+
+    traders: List[PseudoTrader] = [PseudoTrader(name, trader_secret(name), tick_size) for name in names]
+    await asyncio.gather(*(loop.create_connection(lambda t=t: t, exec_["Host"], exec_["Port"]) for t in traders))
+
+    watcher = MarketOpenWatcher()
+    SubscriberFactory(info["Type"], info["Name"]).create(watcher)
+    await watcher.market_open.wait()
+    # Stop polling the information channel so that it does not slow the pseudo-traders down
+    watcher.close()
+
+    start: float = loop.time()
+    await asyncio.gather(*(t.run(rate, hedge_fraction, start + duration) for t in traders))
+    await asyncio.sleep(DRAIN_TIME)
+    for trader in traders:
+        trader.close()
+
+    return {"Disconnected": sum(t.disconnected for t in traders),
+            "Errors": sum(t.error_count for t in traders),
+            "Latencies": {k: b"".join(t.latencies[k].tobytes() for t in traders) for k in MESSAGE_KINDS},
+            "Sent": {k: sum(t.sent[k] for t in traders) for k in MESSAGE_KINDS},
+            "Unanswered": sum(t.unanswered_count for t in traders)}
+
+
+def run_pseudo_traders(config: Dict[str, Any], names: Sequence[str], rate: float, hedge_fraction: float,
+                       duration: float) -> Dict[str, Any]:
+    """Run the named pseudo-traders in this process and return their results."""
+    return asyncio.run(__run_pseudo_traders(config, names, rate, hedge_fraction, duration))
+
+
+def latency_summary(latencies: Sequence[float]) -> Dict[str, float]:
+    """Return the percentiles and maximum of the given round-trip times, in microseconds."""
+    if not latencies:
+        return dict()
+    ordered = sorted(latencies)
+    summary = {"P%g" % p: round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100.0))] * 1e6, 1)
+               for p in PERCENTILES}
+    summary["Max"] = round(ordered[-1] * 1e6, 1)
+    return summary
+
+
+def main(config: Dict[str, Any], count: int, processes: int, rate: Optional[float] = None,
+         hedge_fraction: float = DEFAULT_HEDGE_FRACTION, duration: float = DEFAULT_DURATION) -> Dict[str, Any]:
+    """Run the given number of pseudo-traders against a running exchange simulator and return a summary.
+
+    The exchange simulator's Traders configuration must include the
+    pseudo-traders (see traders_config). If no rate is given, each
+    pseudo-trader sends messages at a little under the message frequency
+    limit.
+    """
+    if rate is None:
+        rate = maximum_rate(config) * DEFAULT_RATE_FRACTION
+    names: List[str] = list(traders_config(count))
+    processes = max(1, min(processes, count))
+
+    with multiprocessing.Pool(processes) as pool:
+        results = pool.starmap(run_pseudo_traders, ((config, names[i::processes], rate, hedge_fraction, duration)
+                                                    for i in range(processes)))
+
+    latencies: Dict[str, array.array] = {kind: array.array("d") for kind in MESSAGE_KINDS}
+    for result in results:
+        for kind in MESSAGE_KINDS:
+            latencies[kind].frombytes(result["Latencies"][kind])
+    sent: int = sum(sum(r["Sent"].values()) for r in results)
+    replies: int = sum(len(a) for a in latencies.values())
+
+    return {"Traders": count,
+            "Processes": processes,
+            "Seconds": duration,
+            "RatePerTrader": rate,
+            "MaximumRatePerTrader": maximum_rate(config),
+            "MessagesSent": {k: sum(r["Sent"][k] for r in results) for k in MESSAGE_KINDS},
+            "MessagesPerSecond": round(sent / duration, 1),
+            "RepliesPerSecond": round(replies / duration, 1),
+            "Errors": sum(r["Errors"] for r in results),
+            "Unanswered": sum(r["Unanswered"] for r in results),
+            "Disconnected": sum(r["Disconnected"] for r in results),
+            "LatencyMicroseconds": dict(All=latency_summary([x for a in latencies.values() for x in a]),
+                                        **{k: latency_summary(latencies[k]) for k in MESSAGE_KINDS})}
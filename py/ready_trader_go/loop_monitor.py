@@ -0,0 +1,146 @@
+# Copyright 2021 Optiver Asia Pacific Pty. Ltd.
+#
+# This file is part of Ready Trader Go.
+#
+#     Ready Trader Go is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU Affero General Public License
+#     as published by the Free Software Foundation, either version 3 of
+#     the License, or (at your option) any later version.
+#
+#     Ready Trader Go is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public
+#     License along with Ready Trader Go.  If not, see
+#     <https://www.gnu.org/licenses/>.
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from typing import Any, Callable, Dict, List, Optional
+
+from .timer import Timer
+
+
+# Seconds between the heartbeats used to measure how late the event loop runs callbacks
+HEARTBEAT_INTERVAL: float = 0.05
+
+# Number of innermost stack frames logged when the event loop stalls
+STALL_STACK_DEPTH: int = 8
+
+
+class LoopMonitor:
+    """A monitor of event loop lag, stalls and skipped timer ticks.
+
+    A heartbeat callback is scheduled on the event loop and the lateness of
+    each heartbeat is measured. A watchdog thread logs the stack of the
+    event loop's thread whenever a heartbeat is more than the stall
+    threshold late, which shows the callback that is holding up the loop.
+    Every report interval, the lag, stalls and skipped timer ticks are
+    logged and passed to the metrics_reported callbacks.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, report_interval: float, stall_threshold: float):
+        """Initialise a new instance of the LoopMonitor class."""
+        self.event_loop: asyncio.AbstractEventLoop = loop
+        self.report_interval: float = report_interval
+        self.stall_threshold: float = stall_threshold
+        self.stall_count: int = 0
+        self.timers: Dict[str, Timer] = dict()
+
+        self.__beat_due: float = 0.0
+        self.__heartbeat_handle: Optional[asyncio.TimerHandle] = None
+        self.__lag_count: int = 0
+        self.__lag_maximum: float = 0.0
+        self.__lag_total: float = 0.0
+        self.__logger: logging.Logger = logging.getLogger("LOOP_MONITOR")
+        self.__next_report: float = 0.0
+        self.__stopped: threading.Event = threading.Event()
+        self.__thread_id: int = 0
+        self.__watchdog: Optional[threading.Thread] = None
+
+        # Signals
+        self.metrics_reported: List[Callable[[Dict[str, Any]], None]] = list()
+
+    @staticmethod
+    def from_config(loop: asyncio.AbstractEventLoop, config: Any) -> "LoopMonitor":
+        """Return a new loop monitor with the settings in the given LoopMonitor configuration section."""
+        if type(config) is not dict:
+            raise Exception("LoopMonitor configuration should be a JSON object")
+        if any(k not in config for k in ("ReportInterval", "StallThreshold")):
+            raise Exception("A required key is missing from the LoopMonitor configuration")
+        if any(type(config[k]) is not float for k in ("ReportInterval", "StallThreshold")):
+            raise Exception("Element of inappropriate type in LoopMonitor configuration")
+        return LoopMonitor(loop, config["ReportInterval"], config["StallThreshold"])
+
+    def __on_heartbeat(self) -> None:
+        """Measure how late this heartbeat is and schedule the next one."""
+        now: float = time.monotonic()
+        lag: float = max(0.0, now - self.__beat_due)
+        self.__lag_count += 1
+        self.__lag_total += lag
+        if lag > self.__lag_maximum:
+            self.__lag_maximum = lag
+
+        if now >= self.__next_report:
+            self.__report()
+            self.__next_report = now + self.report_interval
+
+        self.__beat_due = now + HEARTBEAT_INTERVAL
+        self.__heartbeat_handle = self.event_loop.call_later(HEARTBEAT_INTERVAL, self.__on_heartbeat)
+
+    def __report(self) -> None:
+        """Log the metrics for the last report interval and pass them to the metrics_reported callbacks."""
+        metrics: Dict[str, Any] = {
+            "LagMean": self.__lag_total / self.__lag_count if self.__lag_count else 0.0,
+            "LagMax": self.__lag_maximum,
+            "Stalls": self.stall_count,
+            "SkippedTicks": {name: timer.skipped_tick_count for name, timer in self.timers.items()}}
+        self.__lag_count = 0
+        self.__lag_total = self.__lag_maximum = 0.0
+
+        self.__logger.info("event loop lag_mean=%.6f lag_max=%.6f stalls=%d skipped_ticks={%s}", metrics["LagMean"],
+                           metrics["LagMax"], metrics["Stalls"],
+                           ", ".join("%s: %d" % i for i in metrics["SkippedTicks"].items()))
+        for callback in self.metrics_reported:
+            callback(metrics)
+
+    def __watch(self) -> None:
+        """Log the event loop thread's stack whenever a heartbeat is more than the stall threshold late."""
+        reported_beat: float = 0.0
+        while not self.__stopped.wait(self.stall_threshold / 2.0):
+            beat_due: float = self.__beat_due
+            stalled_for: float = time.monotonic() - beat_due
+            if stalled_for > self.stall_threshold and beat_due != reported_beat:
+                reported_beat = beat_due
+                self.stall_count += 1
+                frame = sys._current_frames().get(self.__thread_id)
+                stack = "".join(traceback.format_stack(frame, STALL_STACK_DEPTH)) if frame is not None else ""
+                self.__logger.warning("event loop stalled for at least %.3f seconds in:\n%s", stalled_for, stack)
+
+    def start(self) -> None:
+        """Start monitoring the event loop, which must be run by the calling thread."""
+        self.__thread_id = threading.get_ident()
+        now: float = time.monotonic()
+        self.__beat_due = now + HEARTBEAT_INTERVAL
+        self.__next_report = now + self.report_interval
+        self.__heartbeat_handle = self.event_loop.call_later(HEARTBEAT_INTERVAL, self.__on_heartbeat)
+        self.__watchdog = threading.Thread(target=self.__watch, name="loop_monitor", daemon=True)
+        self.__watchdog.start()
+
+    def stop(self) -> None:
+        """Stop monitoring the event loop."""
+        if self.__heartbeat_handle is not None:
+            self.__heartbeat_handle.cancel()
+        self.__stopped.set()
+        if self.__watchdog is not None:
+            self.__watchdog.join()
+
+    def watch_timer(self, name: str, timer: Timer) -> None:
+        """Include the given timer's skipped ticks in the reported metrics."""
+        self.timers[name] = timer
@@ -0,0 +1,421 @@
+# Copyright 2021 Optiver Asia Pacific Pty. Ltd.
+#
+# This file is part of Ready Trader Go.
+#
+#     Ready Trader Go is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU Affero General Public License
+#     as published by the Free Software Foundation, either version 3 of
+#     the License, or (at your option) any later version.
+#
+#     Ready Trader Go is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public
+#     License along with Ready Trader Go.  If not, see
+#     <https://www.gnu.org/licenses/>.
+import array
+import asyncio
+import functools
+import hashlib
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import time
+
+from multiprocessing import resource_tracker, shared_memory
+from typing import BinaryIO, Iterator, List, Optional, Sequence, Tuple
+
+from .match_events import MatchEvents
+from .market_events import MarketEvent, MarketEventOperation, MarketEventsReader, iter_market_events
+from .order_book import OrderBook
+from .types import Instrument, Lifespan, Side
+
+# Magic, version, complete flag and row count. While a shared memory block is being built, the row count field
+# holds the process id of the builder instead.
+BLOCK_HEADER = struct.Struct("<8sIIQ")
+BLOCK_MAGIC: bytes = b"RTGMKTDT"
+BLOCK_NAME_PREFIX: str = "rtg_md_"
+BLOCK_VERSION: int = 1
+BLOCK_WAIT_TIMEOUT: float = 600.0  # seconds to wait for another process to finish building a block
+
+# Array type codes of the time, instrument, operation, order id, side, volume, price and lifespan columns. A
+# missing side or lifespan is stored as -1.
+COLUMN_TYPECODES: Tuple[str, ...] = ("d", "b", "b", "q", "b", "q", "q", "b")
+
+# Rows held in memory by a MarketDataImageWriter before they are moved to temporary files
+IMAGE_WRITER_CHUNK_ROWS: int = 65536
+
+
+def builder_is_alive(pid: int) -> bool:
+    """Return False if the given process, which was building a shared memory block, has certainly stopped.
+
+    Shared memory blocks are only left behind by a stopped process on POSIX
+    systems, so the check is skipped elsewhere.
+    """
+    if os.name != "posix" or pid == 0:
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def block_name(filename: str) -> str:
+    """Return the name of the shared memory block for a market data file.
+
+    The name depends on the file's path, size and modification time, so a
+    changed file gets a new block.
+    """
+    path: str = os.path.realpath(filename)
+    stat = os.stat(path)
+    key: str = "%s:%d:%d" % (path, stat.st_size, stat.st_mtime_ns)
+    return BLOCK_NAME_PREFIX + hashlib.sha1(key.encode()).hexdigest()[:20]
+
+
+def block_layout(row_count: int) -> Tuple[List[int], int]:
+    """Return the offset of each column and the total size of a block with the given number of rows."""
+    offsets: List[int] = list()
+    offset: int = BLOCK_HEADER.size
+    for typecode in COLUMN_TYPECODES:
+        offsets.append(offset)
+        offset += (row_count * array.array(typecode).itemsize + 7) // 8 * 8
+    return offsets, offset
+
+
+def column_events(columns: Sequence[Sequence], start: int = 0) -> Iterator[MarketEvent]:
+    """Return an iterator over the market events in the given columns, starting from the given row."""
+    instruments = {i.value: i for i in Instrument}
+    operations = {o.value: o for o in MarketEventOperation}
+    sides = {-1: None, **{s.value: s for s in Side}}
+    lifespans = {-1: None, **{l.value: l for l in Lifespan}}
+    for tm, instrument, operation, order_id, side, volume, price, lifespan in zip(*(c[start:] for c in columns)):
+        yield MarketEvent(tm, instruments[instrument], operations[operation], order_id, sides[side], volume,
+                          price, lifespans[lifespan])
+
+
+def is_market_data_image(filename: str) -> bool:
+    """Return True if the named file is a market data image rather than a CSV file."""
+    try:
+        with open(filename, "rb") as image:
+            return image.read(len(BLOCK_MAGIC)) == BLOCK_MAGIC
+    except OSError:
+        return False
+
+
+def read_market_data_image(filename: str) -> Tuple[array.array, ...]:
+    """Read a market data image file and return its columns.
+
+    A market data image holds the same header and columns as a shared
+    memory block, so it can be loaded without any parsing.
+    """
+    with open(filename, "rb") as image:
+        magic, version, complete, row_count = BLOCK_HEADER.unpack(image.read(BLOCK_HEADER.size))
+        if magic != BLOCK_MAGIC or version != BLOCK_VERSION or not complete:
+            raise ValueError("'%s' is not a complete market data image of a supported version" % filename)
+
+        offsets, _ = block_layout(row_count)
+        columns = tuple(array.array(typecode) for typecode in COLUMN_TYPECODES)
+        for column, offset in zip(columns, offsets):
+            image.seek(offset)
+            column.fromfile(image, row_count)
+    return columns
+
+
+def market_data_events(filename: str, start: int = 0) -> Iterator[MarketEvent]:
+    """Return an iterator over the market events in a market data CSV or image file, starting from the given event."""
+    if is_market_data_image(filename):
+        yield from column_events(read_market_data_image(filename), start)
+    else:
+        with open(filename) as market_data:
+            yield from iter_market_events(market_data, start)
+
+
+class MarketDataImageWriter(object):
+    """Write market data rows to a market data image file.
+
+    The columns of an image follow one another, so rows are gathered in
+    a temporary file for each column and copied into the image when the
+    writer is closed.
+    """
+
+    def __init__(self, filename: str):
+        """Initialise a new instance of the MarketDataImageWriter class."""
+        self.filename: str = filename
+        self.row_count: int = 0
+
+        self.__columns: Tuple[array.array, ...] = tuple(array.array(typecode) for typecode in COLUMN_TYPECODES)
+        self.__files: Tuple[BinaryIO, ...] = tuple(tempfile.TemporaryFile() for _ in COLUMN_TYPECODES)
+
+    def close(self) -> None:
+        """Write the image file and remove the temporary files."""
+        self.__flush()
+        offsets, size = block_layout(self.row_count)
+        with open(self.filename, "wb") as image:
+            image.write(BLOCK_HEADER.pack(BLOCK_MAGIC, BLOCK_VERSION, 1, self.row_count))
+            for column_file, offset in zip(self.__files, offsets):
+                image.seek(offset)
+                column_file.seek(0)
+                shutil.copyfileobj(column_file, image)
+                column_file.close()
+            image.truncate(size)
+
+    def write(self, row: Sequence) -> None:
+        """Write a row of time, instrument, operation, order id, side, volume, price and lifespan.
+
+        A missing side or lifespan is given as -1.
+        """
+        for column, value in zip(self.__columns, row):
+            column.append(value)
+        self.row_count += 1
+        if len(self.__columns[0]) == IMAGE_WRITER_CHUNK_ROWS:
+            self.__flush()
+
+    def __flush(self) -> None:
+        """Move the rows held in memory to the temporary files."""
+        for column, column_file in zip(self.__columns, self.__files):
+            column.tofile(column_file)
+            del column[:]
+
+
+def parse_market_data(filename: str) -> Tuple[array.array, ...]:
+    """Read a market data file and return its columns."""
+    if is_market_data_image(filename):
+        return read_market_data_image(filename)
+
+    columns = tuple(array.array(typecode) for typecode in COLUMN_TYPECODES)
+    times, instruments, operations, order_ids, sides, volumes, prices, lifespans = columns
+
+    with open(filename) as market_data:
+        for evt in iter_market_events(market_data):
+            times.append(evt.time)
+            instruments.append(evt.instrument)
+            operations.append(evt.operation)
+            order_ids.append(evt.order_id)
+            sides.append(-1 if evt.side is None else evt.side)
+            volumes.append(evt.volume)
+            prices.append(evt.price)
+            lifespans.append(-1 if evt.lifespan is None else evt.lifespan)
+
+    return columns
+
+
+def open_shared_memory(name: str, create: bool = False, size: int = 0) -> shared_memory.SharedMemory:
+    """Open a shared memory block which is not removed when this process exits."""
+    block = shared_memory.SharedMemory(name, create, size)
+    if os.name == "posix":
+        resource_tracker.unregister(block._name, "shared_memory")
+    return block
+
+
+def unlink_shared_memory(block: shared_memory.SharedMemory) -> None:
+    """Close and remove a shared memory block opened with open_shared_memory."""
+    block.close()
+    if os.name == "posix":
+        resource_tracker.register(block._name, "shared_memory")  # unlink expects the block to be registered
+    block.unlink()
+
+
+class MarketDataBlock(object):
+    """Read-only columns of market data held in a shared memory block."""
+
+    def __init__(self, block: shared_memory.SharedMemory):
+        """Initialise a new instance of the MarketDataBlock class."""
+        magic, version, complete, row_count = BLOCK_HEADER.unpack_from(block.buf, 0)
+        if magic != BLOCK_MAGIC or version != BLOCK_VERSION or not complete:
+            raise ValueError("shared memory block '%s' does not hold complete market data" % block.name)
+
+        offsets, _ = block_layout(row_count)
+        self.name: str = block.name
+        self.row_count: int = row_count
+
+        self.__block: Optional[shared_memory.SharedMemory] = block
+        self.__columns: Tuple[memoryview, ...] = tuple(
+            block.buf[offset:offset + row_count * array.array(typecode).itemsize].cast(typecode)
+            for offset, typecode in zip(offsets, COLUMN_TYPECODES))
+
+    def close(self) -> None:
+        """Detach from the shared memory block."""
+        if self.__block is not None:
+            for column in self.__columns:
+                column.release()
+            self.__block.close()
+            self.__block = None
+
+    def events(self, start: int = 0) -> Iterator[MarketEvent]:
+        """Return an iterator over the market events in this block, starting from the given row."""
+        return column_events(self.__columns, start)
+
+
+def open_market_data(filename: str, name: Optional[str] = None) -> MarketDataBlock:
+    """Return the shared memory block for a market data file, parsing the file into a new block if necessary.
+
+    If another process is already building the block, wait for it to finish.
+    A block left incomplete by a builder that has stopped is removed and
+    built again.
+    """
+    if name is None:
+        name = block_name(filename)
+    columns: Optional[Tuple[array.array, ...]] = None
+    deadline: float = time.monotonic() + BLOCK_WAIT_TIMEOUT
+
+    while True:
+        try:
+            block = open_shared_memory(name)
+        except FileNotFoundError:
+            if columns is None:
+                columns = parse_market_data(filename)
+            offsets, size = block_layout(len(columns[0]))
+            try:
+                block = open_shared_memory(name, True, size)
+            except FileExistsError:
+                continue  # Another process created the block first
+            try:
+                BLOCK_HEADER.pack_into(block.buf, 0, BLOCK_MAGIC, BLOCK_VERSION, 0, os.getpid())
+                for column, offset in zip(columns, offsets):
+                    data = memoryview(column).cast("B")
+                    block.buf[offset:offset + len(data)] = data
+                BLOCK_HEADER.pack_into(block.buf, 0, BLOCK_MAGIC, BLOCK_VERSION, 1, len(columns[0]))
+                return MarketDataBlock(block)
+            except BaseException:
+                unlink_shared_memory(block)
+                raise
+
+        _, _, complete, builder = BLOCK_HEADER.unpack_from(block.buf, 0)
+        while not complete and builder_is_alive(builder):
+            if time.monotonic() > deadline:
+                block.close()
+                raise TimeoutError("timed out waiting for shared memory block '%s' to be built" % name)
+            time.sleep(0.01)
+            _, _, complete, builder = BLOCK_HEADER.unpack_from(block.buf, 0)
+
+        if complete:
+            return MarketDataBlock(block)
+
+        # The builder stopped before finishing the block, so remove it and try again
+        try:
+            unlink_shared_memory(block)
+        except FileNotFoundError:
+            pass  # Another process removed the abandoned block first
+
+
+def remove_market_data(filename: str) -> bool:
+    """Remove the shared memory block for a market data file and return True if there was one."""
+    try:
+        block = shared_memory.SharedMemory(block_name(filename))
+    except FileNotFoundError:
+        return False
+    block.close()
+    block.unlink()
+    return True
+
+
+class SharedMarketEventsReader(MarketEventsReader):
+    """A processor of market events taken from a shared memory block instead of being parsed from a file.
+
+    The first exchange simulator to need a market data file parses it into
+    a block that later ones attach to. If the block cannot be opened, the
+    file is read in the usual way. The market is not opened until the block
+    is ready, so market events are never waited for on the event loop.
+    """
+
+    def __init__(self, filename: str, loop: asyncio.AbstractEventLoop, future_book: OrderBook, etf_book: OrderBook,
+                 match_events: MatchEvents):
+        """Initialise a new instance of the SharedMarketEventsReader class."""
+        super().__init__(filename, loop, future_book, etf_book, match_events)
+
+        self.block: Optional[MarketDataBlock] = None
+        self.block_ready: threading.Event = threading.Event()
+        self.next_market_event = self.__wait_for_block
+
+        self.__ready: asyncio.Event = asyncio.Event()
+
+    def opener(self, name: str) -> None:
+        """Open the shared memory block for the market data file, falling back to reading the file."""
+        try:
+            self.block = open_market_data(self.filename, name)
+        except (OSError, ValueError) as e:
+            self.event_loop.call_soon_threadsafe(self.logger.warning, "failed to open shared market data: name=%s",
+                                                 name, exc_info=e)
+            super().start()
+        else:
+            self.event_loop.call_soon_threadsafe(self.logger.info, "opened shared market data: name=%s events=%d",
+                                                 name, self.block.row_count)
+        finally:
+            self.block_ready.set()
+            self.event_loop.call_soon_threadsafe(self.__ready.set)
+
+    def start(self):
+        """Start the thread which opens the shared market data."""
+        try:
+            name = block_name(self.filename)
+        except OSError as e:
+            self.logger.error("failed to open market data file: filename='%s'" % self.filename, exc_info=e)
+            raise
+        self.reader_task = threading.Thread(target=self.opener, args=(name,), daemon=True, name="opener")
+        self.reader_task.start()
+
+    async def wait_until_ready(self) -> None:
+        """Wait until the shared memory block has been opened (or the file is being read instead)."""
+        await self.__ready.wait()
+
+    def __wait_for_block(self) -> Optional[MarketEvent]:
+        """Wait for the shared memory block to be opened and return the first market event."""
+        self.block_ready.wait()
+        if self.block is None:
+            self.next_market_event = self.queue.get
+        else:
+            self.next_market_event = functools.partial(next, self.block.events(self.start_offset), None)
+        return self.next_market_event()
+
+
+class ImageMarketEventsReader(MarketEventsReader):
+    """A processor of market events loaded from a market data image file instead of being parsed from CSV."""
+
+    def __init__(self, filename: str, loop: asyncio.AbstractEventLoop, future_book: OrderBook, etf_book: OrderBook,
+                 match_events: MatchEvents):
+        """Initialise a new instance of the ImageMarketEventsReader class."""
+        super().__init__(filename, loop, future_book, etf_book, match_events)
+
+        self.columns: Optional[Tuple[array.array, ...]] = None
+        self.columns_ready: threading.Event = threading.Event()
+        self.next_market_event = self.__wait_for_columns
+
+        self.__ready: asyncio.Event = asyncio.Event()
+
+    def loader(self) -> None:
+        """Load the columns of the market data image."""
+        try:
+            self.columns = read_market_data_image(self.filename)
+        except (OSError, ValueError) as e:
+            self.event_loop.call_soon_threadsafe(self.logger.error, "failed to load market data image: filename='%s'",
+                                                 self.filename, exc_info=e)
+        else:
+            self.event_loop.call_soon_threadsafe(self.on_reader_done, len(self.columns[0]) - self.start_offset)
+        finally:
+            self.columns_ready.set()
+            self.event_loop.call_soon_threadsafe(self.__ready.set)
+
+    def start(self):
+        """Start the thread which loads the market data image."""
+        self.reader_task = threading.Thread(target=self.loader, daemon=True, name="loader")
+        self.reader_task.start()
+
+    async def wait_until_ready(self) -> None:
+        """Wait until the market data image has been loaded."""
+        await self.__ready.wait()
+
+    def __wait_for_columns(self) -> Optional[MarketEvent]:
+        """Wait for the market data image to be loaded and return the first market event."""
+        self.columns_ready.wait()
+        if self.columns is None:
+            self.next_market_event = lambda: None
+        else:
+            self.next_market_event = functools.partial(next, column_events(self.columns, self.start_offset), None)
+        return self.next_market_event()
@@ -0,0 +1,198 @@
+# Copyright 2021 Optiver Asia Pacific Pty. Ltd.
+#
+# This file is part of Ready Trader Go.
+#
+#     Ready Trader Go is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU Affero General Public License
+#     as published by the Free Software Foundation, either version 3 of
+#     the License, or (at your option) any later version.
+#
+#     Ready Trader Go is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public
+#     License along with Ready Trader Go.  If not, see
+#     <https://www.gnu.org/licenses/>.
+import math
+import random
+
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .market_data_cache import MarketDataImageWriter
+from .market_events import INPUT_SCALING, MarketEventOperation
+from .types import Instrument, Lifespan, Side
+
+MARKET_DATA_HEADER: str = "Time,Instrument,Operation,OrderId,Side,Volume,Price,Lifespan\n"
+
+# A market data row: time, instrument, operation, order id, side, volume, price (in cents) and lifespan, where a
+# missing side or lifespan is -1
+MarketDataRow = Tuple[float, int, int, int, int, int, int, int]
+
+# How quickly, per second, the ETF's fair value is drawn back towards the future's
+ETF_REVERSION_RATE: float = 0.1
+
+
+class MarketDataGenerator(object):
+    """Generate market data from a simple stochastic model of order flow.
+
+    The fair value of the future follows a geometric random walk and the
+    ETF's fair value follows a correlated walk which is drawn back towards
+    the future's. Events arrive at random (as a Poisson process) and are
+    shared equally between the instruments. Each event cancels or amends a
+    resting order, or inserts a new one: good-for-day orders rest up to
+    'depth' ticks from the fair value, and fill-and-kill orders cross it so
+    that they trade. Inserted orders take volume from the resting orders
+    they cross, in price-time priority as in the exchange simulator, so only
+    orders which are still resting are amended or cancelled.
+
+    The defaults give roughly the same event rate and mix as the sample
+    market data. The same seed always gives the same market data.
+    """
+
+    def __init__(self, duration: float = 3600.0, event_rate: float = 50.0, cancel_ratio: float = 0.3,
+                 amend_ratio: float = 0.1, fak_ratio: float = 0.25, volatility: float = 0.005,
+                 correlation: float = 0.9, depth: int = 5, resting_orders: int = 50, maximum_volume: int = 50,
+                 start_price: float = 100.0, tick_size: float = 1.0, seed: Optional[int] = None):
+        """Initialise a new instance of the MarketDataGenerator class."""
+        if not 0.0 <= cancel_ratio + amend_ratio <= 1.0:
+            raise ValueError("the cancel and amend ratios should add up to no more than one")
+        if not -1.0 <= correlation <= 1.0:
+            raise ValueError("the correlation should be between -1 and 1")
+
+        self.amend_ratio: float = amend_ratio
+        self.cancel_ratio: float = cancel_ratio
+        self.correlation: float = correlation
+        self.depth: int = depth
+        self.duration: float = duration
+        self.event_rate: float = event_rate
+        self.fak_ratio: float = fak_ratio
+        self.maximum_volume: int = maximum_volume
+        self.resting_orders: int = resting_orders
+        self.seed: Optional[int] = seed
+        self.start_price: int = int(round(start_price * INPUT_SCALING))
+        self.tick_size: int = int(round(tick_size * INPUT_SCALING))
+        self.volatility: float = volatility
+
+    def rows(self) -> Iterator[MarketDataRow]:
+        """Return an iterator over the generated market data rows, in time order."""
+        rng = random.Random(self.seed)
+        tick_size: int = self.tick_size
+        log_values: List[float] = [math.log(self.start_price)] * 2
+        resting: Tuple[List[List[int]], ...] = ([], [])  # Order id, volume, side and price of each resting order
+        positions: Tuple[Dict[int, int], ...] = ({}, {})  # Index of each resting order in the list
+        independent: float = math.sqrt(1.0 - self.correlation * self.correlation)
+        cancel_threshold: float = self.cancel_ratio
+        amend_threshold: float = self.cancel_ratio + self.amend_ratio
+        order_id: int = 0
+        now: float = 0.0
+
+        while True:
+            elapsed: float = rng.expovariate(self.event_rate)
+            now += elapsed
+            if now >= self.duration:
+                return
+
+            # Move the fair values on by the time since the last event
+            scale: float = self.volatility * math.sqrt(elapsed)
+            shock: float = rng.gauss(0.0, 1.0)
+            log_values[Instrument.FUTURE] += scale * shock
+            log_values[Instrument.ETF] += (scale * (self.correlation * shock + independent * rng.gauss(0.0, 1.0))
+                                           - ETF_REVERSION_RATE * elapsed
+                                           * (log_values[Instrument.ETF] - log_values[Instrument.FUTURE]))
+
+            instrument: int = rng.getrandbits(1)
+            orders = resting[instrument]
+            order_positions = positions[instrument]
+            choice: float = rng.random()
+            if len(orders) > self.resting_orders or (orders and choice < cancel_threshold):
+                order = self.__remove(orders, order_positions, rng.randrange(len(orders)))
+                yield now, instrument, MarketEventOperation.CANCEL, order[0], -1, 0, 0, -1
+                continue
+
+            if orders and choice < amend_threshold:
+                order = orders[rng.randrange(len(orders))]
+                if order[1] > 1:
+                    delta: int = rng.randint(1, order[1] - 1)
+                    order[1] -= delta
+                    yield now, instrument, MarketEventOperation.AMEND, order[0], -1, -delta, 0, -1
+                    continue
+
+            order_id += 1
+            side: int = rng.getrandbits(1)
+            volume: int = rng.randint(1, self.maximum_volume)
+            fair_value: int = int(round(math.exp(log_values[instrument]) / tick_size)) * tick_size
+            if rng.random() < self.fak_ratio:
+                lifespan: int = Lifespan.FILL_AND_KILL
+                ticks: int = -rng.randint(1, 2)
+            else:
+                lifespan = Lifespan.GOOD_FOR_DAY
+                ticks = min(self.depth, int(rng.expovariate(0.5)) + 1)
+            price: int = fair_value - ticks * tick_size if side == Side.BUY else fair_value + ticks * tick_size
+            price = max(price, tick_size)
+            yield now, instrument, MarketEventOperation.INSERT, order_id, side, volume, price, lifespan
+
+            volume = self.__trade(orders, order_positions, side, price, volume)
+            if volume > 0 and lifespan == Lifespan.GOOD_FOR_DAY:
+                order_positions[order_id] = len(orders)
+                orders.append([order_id, volume, side, price])
+
+    @staticmethod
+    def __trade(orders: List[List[int]], order_positions: Dict[int, int], side: int, price: int, volume: int) -> int:
+        """Take volume from the resting orders crossed by a new order and return the volume left to the new order.
+
+        Resting orders on the other side at or through the new order's price
+        are traded in price-time priority, as the exchange simulator would.
+        """
+        if side == Side.BUY:
+            crossed = sorted((o for o in orders if o[2] == Side.SELL and o[3] <= price), key=lambda o: (o[3], o[0]))
+        else:
+            crossed = sorted((o for o in orders if o[2] == Side.BUY and o[3] >= price), key=lambda o: (-o[3], o[0]))
+        for order in crossed:
+            if volume == 0:
+                break
+            traded: int = volume if volume < order[1] else order[1]
+            order[1] -= traded
+            volume -= traded
+            if order[1] == 0:
+                MarketDataGenerator.__remove(orders, order_positions, order_positions[order[0]])
+        return volume
+
+    @staticmethod
+    def __remove(orders: List[List[int]], order_positions: Dict[int, int], index: int) -> List[int]:
+        """Remove and return the resting order at the given index by swapping the last order into its place."""
+        order = orders[index]
+        last = orders.pop()
+        del order_positions[order[0]]
+        if last is not order:
+            orders[index] = last
+            order_positions[last[0]] = index
+        return order
+
+
+def write_csv(filename: str, rows: Iterator[MarketDataRow]) -> int:
+    """Write market data rows to a CSV file and return the number of rows written."""
+    sides = {Side.BUY: "B", Side.SELL: "A"}
+    lifespans = {Lifespan.FILL_AND_KILL: "F", Lifespan.GOOD_FOR_DAY: "G"}
+    count: int = 0
+    with open(filename, "w") as market_data:
+        market_data.write(MARKET_DATA_HEADER)
+        for count, (tm, instrument, operation, order_id, side, volume, price, lifespan) in enumerate(rows, 1):
+            if operation == MarketEventOperation.INSERT:
+                market_data.write("%.6f,%d,Insert,%d,%s,%d,%.2f,%s\n" % (tm, instrument, order_id, sides[side], volume,
+                                                                         price / INPUT_SCALING, lifespans[lifespan]))
+            elif operation == MarketEventOperation.AMEND:
+                market_data.write("%.6f,%d,Amend,%d,,%d,,\n" % (tm, instrument, order_id, volume))
+            else:
+                market_data.write("%.6f,%d,Cancel,%d,,,,\n" % (tm, instrument, order_id))
+    return count
+
+
+def write_image(filename: str, rows: Iterator[MarketDataRow]) -> int:
+    """Write market data rows to a market data image file and return the number of rows written."""
+    writer = MarketDataImageWriter(filename)
+    for row in rows:
+        writer.write(row)
+    writer.close()
+    return writer.row_count
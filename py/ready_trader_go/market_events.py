@@ -18,11 +18,12 @@
 import asyncio
 import csv
 import enum
+import itertools
 import logging
 import queue
 import threading
 
-from typing import Callable, Dict, List, Optional, TextIO
+from typing import Callable, Dict, Iterator, List, Optional, TextIO
 
 from .match_events import MatchEvents
 from .order_book import IOrderListener, Order, OrderBook
@@ -58,6 +59,17 @@ class MarketEvent(object):
         self.lifespan: Optional[Lifespan] = lifespan
 
 
+def iter_market_events(market_data: TextIO, start: int = 0) -> Iterator[MarketEvent]:
+    """Return an iterator over the market events in a market data file, starting from the given event."""
+    csv_reader = csv.reader(market_data)
+    next(csv_reader)  # Skip header row
+    for row in itertools.islice(csv_reader, start, None):
+        # time, instrument, operation, order_id, side, volume, price, lifespan
+        yield MarketEvent(float(row[0]), Instrument(int(row[1])), MarketEventOperation[row[2]], int(row[3]),
+                          Side[row[4]] if row[4] else None, int(float(row[5])) if row[5] else 0,
+                          int(float(row[6]) * INPUT_SCALING) if row[6] else 0, Lifespan[row[7]] if row[7] else None)
+
+
 class MarketEventsReader(IOrderListener):
     """A processor of market events read from a file."""
 
@@ -72,9 +84,14 @@ class MarketEventsReader(IOrderListener):
         self.future_book: OrderBook = future_book
         self.future_orders: Dict[int, Order] = dict()
         self.logger: logging.Logger = logging.getLogger("MARKET_EVENTS")
+        self.market_event_count: int = 0
         self.match_events: MatchEvents = match_events
         self.queue: queue.Queue = queue.Queue(MARKET_EVENT_QUEUE_SIZE)
         self.reader_task: Optional[threading.Thread] = None
+        self.start_offset: int = 0
+
+        # Return the next market event, or None if there are no more, blocking if necessary
+        self.next_market_event: Callable[[], Optional[MarketEvent]] = self.queue.get
 
         # Prime the event pump with a no-op event
         self.next_event: Optional[MarketEvent] = MarketEvent(0.0, Instrument.FUTURE, MarketEventOperation.CANCEL, 0,
@@ -121,6 +138,11 @@ class MarketEventsReader(IOrderListener):
         """Called when the market data reader thread is done."""
         self.logger.info("reader thread complete after processing %d market events", num_events)
 
+    def processed_event_count(self) -> int:
+        """Return the number of market events from the file which have been processed."""
+        # The last market event taken from the queue is held until its time comes
+        return self.start_offset + self.market_event_count - 1
+
     def process_market_events(self, elapsed_time: float) -> None:
         """Process market events from the queue."""
         evt: MarketEvent = self.next_event
@@ -146,7 +168,8 @@ class MarketEventsReader(IOrderListener):
                     # evt.operation must be MarketEventOperation.AMEND
                     book.amend(evt.time, order, order.volume + evt.volume)
 
-            evt = self.queue.get()
+            evt = self.next_market_event()
+            self.market_event_count += 1
 
         self.next_event = evt
         if evt is None:
@@ -155,20 +178,18 @@ class MarketEventsReader(IOrderListener):
 
     def reader(self, market_data: TextIO) -> None:
         """Read the market data file and place order events in the queue."""
+        count: int = 0
         fifo = self.queue
 
         with market_data:
-            csv_reader = csv.reader(market_data)
-            next(csv_reader)  # Skip header row
-            for row in csv_reader:
-                # time, instrument, operation, order_id, side, volume, price, lifespan
-                fifo.put(MarketEvent(float(row[0]), Instrument(int(row[1])), MarketEventOperation[row[2]],
-                                     int(row[3]), Side[row[4]] if row[4] else None,
-                                     int(float(row[5])) if row[5] else 0, int(float(row[6]) * INPUT_SCALING) if row[6] else 0,
-                                     Lifespan[row[7]] if row[7] else None))
+            for count, evt in enumerate(iter_market_events(market_data, self.start_offset), 1):
+                fifo.put(evt)
             fifo.put(None)
 
-        self.event_loop.call_soon_threadsafe(self.on_reader_done, csv_reader.line_num - 1)
+        self.event_loop.call_soon_threadsafe(self.on_reader_done, count)
+
+    async def wait_until_ready(self) -> None:
+        """Wait until market events can be taken without blocking the event loop for long."""
 
     def start(self):
         """Start the market events reader thread"""
@@ -124,6 +124,7 @@ class MatchEventsWriter:
         self.logger = logging.getLogger("MATCH_EVENTS")
         self.match_events: MatchEvents = match_events
         self.queue: queue.Queue = queue.Queue()
+        self.written_count: int = 0
         self.writer_task: Optional[threading.Thread] = None
 
         match_events.event_occurred.append(self.queue.put)
@@ -176,6 +177,7 @@ class MatchEventsWriter:
                 while evt is not None:
                     count += 1
                     csv_writer.writerow(evt)
+                    self.written_count = count
                     evt = fifo.get()
         finally:
             if not self.event_loop.is_closed():
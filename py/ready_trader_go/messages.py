@@ -49,6 +49,16 @@ class MessageType(enum.IntEnum):
     HEDGE_EVENT = 103
     LOGIN_EVENT = 104
     TRADE_EVENT = 105
+    BOOK_SNAPSHOT_EVENT = 106
+    ACCOUNT_SNAPSHOT_EVENT = 107
+    RESYNC_EVENT = 108
+    SNAPSHOT_SUBSCRIBE = 109
+
+
+@enum.unique
+class ResyncPhase(enum.IntEnum):
+    BEGIN = 0
+    END = 1
 
 
 # Standard message header: message length (2 bytes) and type (1 byte)
@@ -82,6 +92,12 @@ INSERT_EVENT_MESSAGE = struct.Struct("!dIIBBIIB")  # Time, team id, order id, in
 LOGIN_EVENT_MESSAGE = struct.Struct("!50sI")  # Team name, team id
 HEDGE_EVENT_MESSAGE = struct.Struct("!dIBBId")  # Time, team id, side, instrument, volume, price
 TRADE_EVENT_MESSAGE = struct.Struct("!dIIBBIIi")  # Time, team id, order id, side, instrument, volume, price, fee
+BOOK_SNAPSHOT_EVENT_HEADER = struct.Struct("!dBB")  # Time, inst, depth (followed by depth prices & volumes)
+ACCOUNT_SNAPSHOT_EVENT_MESSAGE = struct.Struct("!dIiiqqd")  # Time, team id, etf pos, fut pos, balance, fees, profit
+RESYNC_EVENT_MESSAGE = struct.Struct("!dB")  # Time, resync phase
+
+# HUD to matching engine messages
+SNAPSHOT_SUBSCRIBE_MESSAGE = struct.Struct("!B")  # Order book snapshot depth
 
 # Cumulative message sizes
 HEADER_SIZE: int = HEADER.size
@@ -107,10 +123,16 @@ INSERT_EVENT_MESSAGE_SIZE: int = HEADER.size + INSERT_EVENT_MESSAGE.size
 HEDGE_EVENT_MESSAGE_SIZE: int = HEADER.size + HEDGE_EVENT_MESSAGE.size
 TRADE_EVENT_MESSAGE_SIZE: int = HEADER.size + TRADE_EVENT_MESSAGE.size
 LOGIN_EVENT_MESSAGE_SIZE: int = HEADER.size + LOGIN_EVENT_MESSAGE.size
+BOOK_SNAPSHOT_EVENT_HEADER_SIZE: int = HEADER.size + BOOK_SNAPSHOT_EVENT_HEADER.size
+ACCOUNT_SNAPSHOT_EVENT_MESSAGE_SIZE: int = HEADER.size + ACCOUNT_SNAPSHOT_EVENT_MESSAGE.size
+RESYNC_EVENT_MESSAGE_SIZE: int = HEADER.size + RESYNC_EVENT_MESSAGE.size
+
+SNAPSHOT_SUBSCRIBE_MESSAGE_SIZE: int = HEADER.size + SNAPSHOT_SUBSCRIBE_MESSAGE.size
 
 
 class Connection(asyncio.Protocol):
     """A stream-based network connection."""
+    __slots__ = ("__logger", "_closing", "_connection_transport", "_data", "_file_number")
 
     def __init__(self):
         """Initialize a new instance of the Connection class."""
@@ -0,0 +1,162 @@
+# Copyright 2021 Optiver Asia Pacific Pty. Ltd.
+#
+# This file is part of Ready Trader Go.
+#
+#     Ready Trader Go is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU Affero General Public License
+#     as published by the Free Software Foundation, either version 3 of
+#     the License, or (at your option) any later version.
+#
+#     Ready Trader Go is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public
+#     License along with Ready Trader Go.  If not, see
+#     <https://www.gnu.org/licenses/>.
+import asyncio
+import logging
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .competitor import CompetitorManager
+from .market_events import MarketEventsReader
+from .match_events import MatchEventsWriter
+from .order_book import OrderBook
+from .timer import Timer
+
+
+CONTENT_TYPE: str = "text/plain; version=0.0.4; charset=utf-8"
+METRIC_PREFIX: str = "rtg_"
+REQUEST_TIMEOUT: float = 5.0
+
+
+class ExchangeMetrics:
+    """The counters and gauges of the exchange simulator, in Prometheus text format.
+
+    The counters are kept by the objects they describe; gauges such as queue
+    depths and order book depth are read only when the metrics are scraped.
+    """
+
+    def __init__(self, competitor_manager: CompetitorManager, books: Iterable[OrderBook],
+                 market_events_reader: MarketEventsReader, match_events_writer: MatchEventsWriter,
+                 timers: Dict[str, Timer]):
+        """Initialise a new instance of the ExchangeMetrics class."""
+        self.books: Tuple[OrderBook, ...] = tuple(books)
+        self.competitor_manager: CompetitorManager = competitor_manager
+        self.loop_metrics: Optional[Dict[str, Any]] = None
+        self.market_events_reader: MarketEventsReader = market_events_reader
+        self.match_events_writer: MatchEventsWriter = match_events_writer
+        self.timers: Dict[str, Timer] = timers
+
+    def on_loop_metrics(self, metrics: Dict[str, Any]) -> None:
+        """Called when the loop monitor reports its metrics."""
+        self.loop_metrics = metrics
+
+    def render(self) -> str:
+        """Return the current value of every metric in Prometheus text format."""
+        lines: List[str] = list()
+
+        def metric(name: str, typ: str, help_text: str, samples: Iterable[Tuple[str, Any]]) -> None:
+            lines.append("# HELP %s%s %s" % (METRIC_PREFIX, name, help_text))
+            lines.append("# TYPE %s%s %s" % (METRIC_PREFIX, name, typ))
+            lines.extend("%s%s%s %s" % (METRIC_PREFIX, name, labels, value) for labels, value in samples)
+
+        metric("market_events_queue_depth", "gauge", "Market events read but not yet processed.",
+               (("", self.market_events_reader.queue.qsize()),))
+        metric("market_events_processed_total", "counter", "Market events processed.",
+               (("", self.market_events_reader.processed_event_count()),))
+        metric("match_events_queue_depth", "gauge", "Match events waiting to be written.",
+               (("", self.match_events_writer.queue.qsize()),))
+        metric("match_events_written_total", "counter", "Match events written to the match events file.",
+               (("", self.match_events_writer.written_count),))
+
+        competitors = [('{competitor="%s"}' % c.name.replace("\\", "\\\\").replace('"', '\\"'), c)
+                       for c in self.competitor_manager.get_competitors()]
+        metric("competitor_messages_total", "counter", "Messages received from each competitor after logging in.",
+               ((n, c.message_count) for n, c in competitors))
+        metric("competitor_errors_total", "counter", "Error messages sent to each competitor.",
+               ((n, c.error_count) for n, c in competitors))
+        metric("competitor_active_orders", "gauge", "Orders each competitor has in the order book.",
+               ((n, len(c.orders)) for n, c in competitors))
+        metric("competitor_active_volume", "gauge", "Volume of the orders each competitor has in the order book.",
+               ((n, c.active_volume) for n, c in competitors))
+        metric("competitor_connected", "gauge", "Whether each competitor is connected.",
+               ((n, int(c.exec_connection is not None)) for n, c in competitors))
+        now: float = self.timers["market"].advance()
+        metric("competitor_message_headroom", "gauge",
+               "Messages each connected competitor can send now before breaching the message frequency limit.",
+               ((n, c.exec_connection.frequency_limiter.limit - c.exec_connection.frequency_limiter.current_value(now))
+                for n, c in competitors if c.exec_connection is not None))
+
+        depths: List[Tuple[str, int, int]] = list()
+        for book in self.books:
+            bid_levels, bid_volume, ask_levels, ask_volume = book.depth()
+            depths.append(('{instrument="%s",side="BUY"}' % book.instrument.name, bid_levels, bid_volume))
+            depths.append(('{instrument="%s",side="SELL"}' % book.instrument.name, ask_levels, ask_volume))
+        metric("order_book_levels", "gauge", "Price levels in each side of each order book.",
+               ((labels, levels) for labels, levels, _ in depths))
+        metric("order_book_volume", "gauge", "Volume resting in each side of each order book.",
+               ((labels, volume) for labels, _, volume in depths))
+        metric("order_book_inserts_total", "counter", "Orders inserted into each order book.",
+               (('{instrument="%s"}' % b.instrument.name, b.insert_count) for b in self.books))
+        metric("order_book_trades_total", "counter", "Trades, one per price level, in each order book.",
+               (('{instrument="%s"}' % b.instrument.name, b.trade_count) for b in self.books))
+        metric("order_book_traded_volume_total", "counter", "Volume traded in each order book.",
+               (('{instrument="%s"}' % b.instrument.name, b.traded_volume) for b in self.books))
+
+        metric("timer_skipped_ticks_total", "counter", "Ticks skipped by each timer because the event loop was late.",
+               (('{timer="%s"}' % n, t.skipped_tick_count) for n, t in self.timers.items()))
+        if self.loop_metrics is not None:
+            metric("event_loop_lag_mean_seconds", "gauge", "Mean event loop lag over the last report interval.",
+                   (("", self.loop_metrics["LagMean"]),))
+            metric("event_loop_lag_max_seconds", "gauge", "Largest event loop lag over the last report interval.",
+                   (("", self.loop_metrics["LagMax"]),))
+            metric("event_loop_stalls_total", "counter", "Times the event loop stalled for longer than the threshold.",
+                   (("", self.loop_metrics["Stalls"]),))
+
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """A server of the exchange simulator's metrics over HTTP, on a TCP port or a Unix domain socket."""
+
+    def __init__(self, metrics: ExchangeMetrics, host: Optional[str] = None, port: Optional[int] = None,
+                 path: Optional[str] = None):
+        """Initialise a new instance of the MetricsServer class."""
+        self.host: Optional[str] = host
+        self.metrics: ExchangeMetrics = metrics
+        self.path: Optional[str] = path
+        self.port: Optional[int] = port
+
+        self.__logger: logging.Logger = logging.getLogger("METRICS")
+        self.__server: Optional[asyncio.AbstractServer] = None
+
+    def close(self) -> None:
+        """Close the server."""
+        if self.__server is not None:
+            self.__server.close()
+
+    async def __on_request(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Reply to a request with the current metrics, whatever the request was for."""
+        try:
+            while (await asyncio.wait_for(reader.readline(), REQUEST_TIMEOUT)).strip():
+                pass
+            body: bytes = self.metrics.render().encode()
+            writer.write(b"HTTP/1.0 200 OK\r\nContent-Type: %s\r\nContent-Length: %d\r\nConnection: close\r\n\r\n"
+                         % (CONTENT_TYPE.encode(), len(body)) + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError) as e:
+            self.__logger.info("metrics request failed: %s", e)
+        finally:
+            writer.close()
+
+    async def start(self) -> None:
+        """Start the server."""
+        if self.path is not None:
+            self.__logger.info("starting metrics server: path=%s", self.path)
+            self.__server = await asyncio.start_unix_server(self.__on_request, self.path)
+        else:
+            self.__logger.info("starting metrics server: host=%s port=%d", self.host, self.port)
+            self.__server = await asyncio.start_server(self.__on_request, self.host, self.port)
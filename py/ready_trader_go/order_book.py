@@ -15,11 +15,11 @@
 #     You should have received a copy of the GNU Affero General Public
 #     License along with Ready Trader Go.  If not, see
 #     <https://www.gnu.org/licenses/>.
-from bisect import bisect, insort_left
 import collections
 
-from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
 
+from .price_tracker import BestPriceTracker
 from .types import Instrument, Lifespan, Side
 
 
@@ -29,6 +29,8 @@ TOP_LEVEL_COUNT = 5
 
 
 class IOrderListener(object):
+    __slots__ = ()
+
     def on_order_amended(self, now: float, order, volume_removed: int) -> None:
         """Called when the order is amended."""
         pass
@@ -78,13 +80,16 @@ class OrderBook(object):
 
     def __init__(self, instrument: Instrument, maker_fee: float, taker_fee: float):
         """Initialise a new instance of the OrderBook class."""
+        self.insert_count: int = 0
         self.instrument: Instrument = instrument
         self.maker_fee: float = maker_fee
         self.taker_fee: float = taker_fee
+        self.trade_count: int = 0
+        self.traded_volume: int = 0
 
-        self.__ask_prices: List[int] = []
+        self.__ask_prices: BestPriceTracker = BestPriceTracker(Side.SELL)
         self.__ask_ticks: Dict[int, int] = collections.defaultdict(int)
-        self.__bid_prices: List[int] = []
+        self.__bid_prices: BestPriceTracker = BestPriceTracker(Side.BUY)
         self.__bid_ticks: Dict[int, int] = collections.defaultdict(int)
         self.__last_traded_price: Optional[int] = None
         self.__levels: Dict[int, Deque[Order]] = {}
@@ -117,11 +122,11 @@ class OrderBook(object):
 
     def best_ask(self) -> Optional[int]:
         """Return the current best ask price, or None if there are no ask orders."""
-        return -self.__ask_prices[-1] if self.__ask_prices else None
+        return self.__ask_prices.best()
 
     def best_bid(self) -> Optional[int]:
         """Return the current best ask price, or None if there are no ask orders."""
-        return self.__bid_prices[-1] if self.__bid_prices else None
+        return self.__bid_prices.best()
 
     def cancel(self, now: float, order: Order) -> None:
         """Cancel an order in this order book."""
@@ -134,9 +139,10 @@ class OrderBook(object):
 
     def insert(self, now: float, order: Order) -> None:
         """Insert a new order into this order book."""
-        if order.side == Side.SELL and self.__bid_prices and order.price <= self.__bid_prices[-1]:
+        self.insert_count += 1
+        if order.side == Side.SELL and self.__bid_prices.crosses(order.price):
             self.trade_ask(now, order)
-        elif order.side == Side.BUY and self.__ask_prices and order.price >= self.__ask_prices[-1]:
+        elif order.side == Side.BUY and self.__ask_prices.crosses(order.price):
             self.trade_bid(now, order)
 
         if order.remaining_volume > 0:
@@ -148,6 +154,14 @@ class OrderBook(object):
             else:
                 self.place(now, order)
 
+    def depth(self) -> Tuple[int, int, int, int]:
+        """Return the number of bid price levels, the bid volume, the number of ask price levels and the ask volume."""
+        total_volumes = self.__total_volumes
+        bid_prices = tuple(self.__bid_prices)
+        ask_prices = tuple(self.__ask_prices)
+        return (len(bid_prices), sum(total_volumes[p] for p in bid_prices), len(ask_prices),
+                sum(total_volumes[p] for p in ask_prices))
+
     def last_traded_price(self) -> Optional[int]:
         """Return the last traded price."""
         return self.__last_traded_price
@@ -155,7 +169,7 @@ class OrderBook(object):
     def midpoint_price(self) -> Optional[float]:
         """Return the midpoint price."""
         if self.__bid_prices and self.__ask_prices:
-            return (self.__bid_prices[-1] + -self.__ask_prices[-1]) / 2.0
+            return (self.__bid_prices.best() + self.__ask_prices.best()) / 2.0
         return None
 
     def place(self, now: float, order: Order) -> None:
@@ -166,9 +180,9 @@ class OrderBook(object):
             self.__levels[price] = collections.deque()
             self.__total_volumes[price] = 0
             if order.side == Side.SELL:
-                insort_left(self.__ask_prices, -price)
+                self.__ask_prices.add(price)
             else:
-                insort_left(self.__bid_prices, price)
+                self.__bid_prices.add(price)
 
         self.__levels[price].append(order)
         self.__total_volumes[price] += order.remaining_volume
@@ -181,64 +195,85 @@ class OrderBook(object):
             del self.__levels[price]
             del self.__total_volumes[price]
             if side == Side.SELL:
-                self.__ask_prices.pop(bisect(self.__ask_prices, -price) - 1)
+                self.__ask_prices.remove(price)
             elif side == Side.BUY:
-                self.__bid_prices.pop(bisect(self.__bid_prices, price) - 1)
+                self.__bid_prices.remove(price)
         else:
             self.__total_volumes[price] -= volume
 
+    def restore(self, last_traded_price: Optional[int], orders: Iterable[Order]) -> None:
+        """Restore the last traded price and resting orders (given in price-time priority) from a checkpoint."""
+        self.__last_traded_price = last_traded_price
+        for order in orders:
+            self.place(0.0, order)
+
+    def resting_orders(self) -> Iterator[Order]:
+        """Return an iterator over the orders resting in this order book in price-time priority.
+
+        Bid orders are produced first, starting from the best bid, followed by
+        ask orders starting from the best ask.
+        """
+        for price in self.__bid_prices:
+            for order in self.__levels[price]:
+                if order.remaining_volume > 0:
+                    yield order
+        for price in self.__ask_prices:
+            for order in self.__levels[price]:
+                if order.remaining_volume > 0:
+                    yield order
+
     def top_levels(self, ask_prices: List[int], ask_volumes: List[int], bid_prices: List[int],
-                   bid_volumes: List[int]) -> None:
+                   bid_volumes: List[int], depth: int = TOP_LEVEL_COUNT) -> None:
         """Populate the supplied lists with the top levels for this book."""
         i = 0
-        j = len(self.__ask_prices) - 1
-        while i < TOP_LEVEL_COUNT and j >= 0:
-            ask_prices[i] = -self.__ask_prices[j]
-            ask_volumes[i] = self.__total_volumes[ask_prices[i]]
+        for price in self.__ask_prices:
+            if i == depth:
+                break
+            ask_prices[i] = price
+            ask_volumes[i] = self.__total_volumes[price]
             i += 1
-            j -= 1
-        while i < TOP_LEVEL_COUNT:
+        while i < depth:
             ask_prices[i] = ask_volumes[i] = 0
             i += 1
 
         i = 0
-        j = len(self.__bid_prices) - 1
-        while i < TOP_LEVEL_COUNT and j >= 0:
-            bid_prices[i] = self.__bid_prices[j]
-            bid_volumes[i] = self.__total_volumes[bid_prices[i]]
+        for price in self.__bid_prices:
+            if i == depth:
+                break
+            bid_prices[i] = price
+            bid_volumes[i] = self.__total_volumes[price]
             i += 1
-            j -= 1
-        while i < TOP_LEVEL_COUNT:
+        while i < depth:
             bid_prices[i] = bid_volumes[i] = 0
             i += 1
 
     def trade_ask(self, now: float, order: Order) -> None:
         """Check to see if any existing bid orders match the specified ask order."""
-        best_bid = self.__bid_prices[-1]
+        best_bid = self.__bid_prices.best()
 
         while order.remaining_volume > 0 and best_bid >= order.price and self.__total_volumes[best_bid] > 0:
             self.trade_level(now, order, best_bid)
             if self.__total_volumes[best_bid] == 0:
                 del self.__levels[best_bid]
                 del self.__total_volumes[best_bid]
-                self.__bid_prices.pop()
+                self.__bid_prices.remove(best_bid)
                 if not self.__bid_prices:
                     break
-                best_bid = self.__bid_prices[-1]
+                best_bid = self.__bid_prices.best()
 
     def trade_bid(self, now: float, order: Order) -> None:
         """Check to see if any existing ask orders match the specified bid order."""
-        best_ask = -self.__ask_prices[-1]
+        best_ask = self.__ask_prices.best()
 
         while order.remaining_volume > 0 and best_ask <= order.price and self.__total_volumes[best_ask] > 0:
             self.trade_level(now, order, best_ask)
             if self.__total_volumes[best_ask] == 0:
                 del self.__levels[best_ask]
                 del self.__total_volumes[best_ask]
-                self.__ask_prices.pop()
+                self.__ask_prices.remove(best_ask)
                 if not self.__ask_prices:
                     break
-                best_ask = -self.__ask_prices[-1]
+                best_ask = self.__ask_prices.best()
 
     def trade_level(self, now: float, order: Order, best_price: int) -> None:
         """Match the specified order with existing orders at the given level."""
@@ -274,6 +309,8 @@ class OrderBook(object):
             order.listener.on_order_filled(now, order, best_price, traded_volume_at_this_level, fee)
 
         self.__last_traded_price = best_price
+        self.trade_count += 1
+        self.traded_volume += traded_volume_at_this_level
         for callback in self.trade_occurred:
             callback(self)
 
@@ -306,24 +343,22 @@ class OrderBook(object):
         total_value: int = 0
 
         if side == Side.ASK:
-            i = len(self.__bid_prices) - 1
-            while total_volume < volume and i >= 0 and self.__bid_prices[i] and self.__bid_prices[i] >= limit_price:
-                price: int = self.__bid_prices[i]
+            for price in self.__bid_prices:
+                if total_volume >= volume or price < limit_price:
+                    break
                 available: int = self.__total_volumes[price]
                 required: int = volume - total_volume
                 weight: int = required if required <= available else available
                 total_volume += weight
                 total_value += weight * price
-                i -= 1
         else:
-            i = len(self.__ask_prices) - 1
-            while total_volume < volume and i >= 0 and -self.__ask_prices[i] and -self.__ask_prices[i] <= limit_price:
-                price: int = -self.__ask_prices[i]
+            for price in self.__ask_prices:
+                if total_volume >= volume or price > limit_price:
+                    break
                 available: int = self.__total_volumes[price]
                 required: int = volume - total_volume
                 weight: int = required if required <= available else available
                 total_volume += weight
                 total_value += weight * price
-                i -= 1
 
         return total_volume, total_value // total_volume if total_volume > 0 else 0
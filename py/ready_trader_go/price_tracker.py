@@ -0,0 +1,98 @@
+# Copyright 2021 Optiver Asia Pacific Pty. Ltd.
+#
+# This file is part of Ready Trader Go.
+#
+#     Ready Trader Go is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU Affero General Public License
+#     as published by the Free Software Foundation, either version 3 of
+#     the License, or (at your option) any later version.
+#
+#     Ready Trader Go is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public
+#     License along with Ready Trader Go.  If not, see
+#     <https://www.gnu.org/licenses/>.
+from bisect import bisect_left, insort_left
+from typing import Dict, Iterator, List, Optional
+
+from .types import Side
+
+
+class BestPriceTracker(object):
+    """Count the orders at each price on one side of a market and keep track of the best price.
+
+    The best price can be read in constant time. Adding or removing an order
+    at a price which already has orders, or at the best price, is also
+    constant time. Adding or removing the only order at any other price
+    inserts the price into, or removes it from, an ordered list of the
+    distinct prices, which takes time proportional to the number of distinct
+    prices rather than constant time. Prices are unbounded integers, so a
+    constant time structure (such as an array indexed by tick) does not fit;
+    the list holds price levels rather than orders and is normally short.
+    """
+    __slots__ = ("__counts", "__keys", "__sign")
+
+    def __init__(self, side: Side):
+        """Initialise a new instance of the BestPriceTracker class."""
+        self.__counts: Dict[int, int] = {}
+        self.__keys: List[int] = []  # distinct prices, multiplied by the sign, from worst to best
+        self.__sign: int = 1 if side == Side.BUY else -1
+
+    def __bool__(self) -> bool:
+        """Return True if there are any orders."""
+        return bool(self.__keys)
+
+    def __contains__(self, price: int) -> bool:
+        """Return True if there are any orders at the given price."""
+        return price in self.__counts
+
+    def __iter__(self) -> Iterator[int]:
+        """Return an iterator over the distinct prices, starting with the best."""
+        sign: int = self.__sign
+        return (sign * key for key in reversed(self.__keys))
+
+    def __len__(self) -> int:
+        """Return the number of distinct prices."""
+        return len(self.__keys)
+
+    def add(self, price: int) -> bool:
+        """Add an order at the given price and return True if there were no other orders at that price."""
+        count: int = self.__counts.get(price, 0)
+        self.__counts[price] = count + 1
+        if count == 0:
+            key: int = self.__sign * price
+            if not self.__keys or key > self.__keys[-1]:
+                self.__keys.append(key)
+            else:
+                insort_left(self.__keys, key)
+            return True
+        return False
+
+    def best(self) -> Optional[int]:
+        """Return the best price, or None if there are no orders."""
+        return self.__sign * self.__keys[-1] if self.__keys else None
+
+    def count(self, price: int) -> int:
+        """Return the number of orders at the given price."""
+        return self.__counts.get(price, 0)
+
+    def crosses(self, price: int) -> bool:
+        """Return True if an order on the other side of the market at the given price would cross the best price."""
+        return bool(self.__keys) and self.__sign * price <= self.__keys[-1]
+
+    def remove(self, price: int) -> bool:
+        """Remove an order at the given price and return True if there are no more orders at that price."""
+        count: int = self.__counts[price] - 1
+        if count > 0:
+            self.__counts[price] = count
+            return False
+        del self.__counts[price]
+        key: int = self.__sign * price
+        if key == self.__keys[-1]:
+            self.__keys.pop()
+        else:
+            self.__keys.pop(bisect_left(self.__keys, key))
+        return True
@@ -0,0 +1,184 @@
+# Copyright 2021 Optiver Asia Pacific Pty. Ltd.
+#
+# This file is part of Ready Trader Go.
+#
+#     Ready Trader Go is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU Affero General Public License
+#     as published by the Free Software Foundation, either version 3 of
+#     the License, or (at your option) any later version.
+#
+#     Ready Trader Go is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public
+#     License along with Ready Trader Go.  If not, see
+#     <https://www.gnu.org/licenses/>.
+import cProfile
+import collections
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+
+from typing import Any, Callable, Counter, Dict, Iterable, List, Optional, Tuple
+
+
+# Profilers and the suffix of the profile files they write
+PROFILE_SUFFIXES: Dict[str, str] = {"cprofile": ".prof", "sample": ".samples"}
+
+DEFAULT_SAMPLE_INTERVAL: float = 0.005
+DEFAULT_TOP_COUNT: int = 30
+PROFILE_WAIT_TIMEOUT: float = 10.0  # seconds to wait for processes to write their profiles after a match
+
+FunctionKey = Tuple[str, int, str]  # filename, first line number and name
+
+
+class SamplingProfiler:
+    """A profiler which samples the stack of a thread from a background thread.
+
+    Unlike cProfile, the profiled thread does no extra work for each call,
+    so the timing of a match is barely affected.
+    """
+
+    def __init__(self, interval: float = DEFAULT_SAMPLE_INTERVAL, thread_id: Optional[int] = None):
+        """Initialise a new instance of the SamplingProfiler class."""
+        self.interval: float = interval
+        self.sample_count: int = 0
+        self.self_counts: Counter[FunctionKey] = collections.Counter()
+        self.total_counts: Counter[FunctionKey] = collections.Counter()
+        self.thread_id: int = thread_id if thread_id is not None else threading.get_ident()
+
+        self.__stopped: threading.Event = threading.Event()
+        self.__thread: threading.Thread = threading.Thread(target=self.__sample, name="sampler", daemon=True)
+
+    def __sample(self) -> None:
+        """Sample the profiled thread's stack until stopped."""
+        thread_id: int = self.thread_id
+        self_counts = self.self_counts
+        total_counts = self.total_counts
+        while not self.__stopped.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                continue
+            self.sample_count += 1
+            code = frame.f_code
+            self_counts[(code.co_filename, code.co_firstlineno, code.co_name)] += 1
+            seen = set()
+            while frame is not None:
+                code = frame.f_code
+                if code not in seen:
+                    seen.add(code)
+                    total_counts[(code.co_filename, code.co_firstlineno, code.co_name)] += 1
+                frame = frame.f_back
+
+    def start(self) -> None:
+        """Start sampling."""
+        self.__thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling."""
+        self.__stopped.set()
+        self.__thread.join()
+
+    def dump_stats(self, filename: str) -> None:
+        """Write the samples taken to the named file."""
+        with open(filename, "w") as samples_file:
+            json.dump({"Interval": self.interval, "Samples": self.sample_count,
+                       "Functions": [list(key) + [self.self_counts[key], total]
+                                     for key, total in self.total_counts.items()]}, samples_file)
+
+
+def run_profiled(kind: str, filename: str, function: Callable, *args) -> Any:
+    """Call the function under a profiler, write the profile to the named file and return its result."""
+    os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+    if kind == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+    else:
+        profiler = SamplingProfiler()
+        profiler.start()
+    try:
+        return function(*args)
+    finally:
+        if kind == "cprofile":
+            profiler.disable()
+        else:
+            profiler.stop()
+        profiler.dump_stats(filename)
+
+
+def sample_report(filenames: Iterable[str], top: int) -> str:
+    """Return a table of the functions seen most often in the given sample files."""
+    interval: float = 0.0
+    sample_count: int = 0
+    self_counts: Counter[FunctionKey] = collections.Counter()
+    total_counts: Counter[FunctionKey] = collections.Counter()
+    for filename in filenames:
+        with open(filename) as samples_file:
+            samples = json.load(samples_file)
+        interval = samples["Interval"]
+        sample_count += samples["Samples"]
+        for path, line, name, self_count, total_count in samples["Functions"]:
+            self_counts[(path, line, name)] += self_count
+            total_counts[(path, line, name)] += total_count
+
+    lines: List[str] = ["%d samples taken every %g seconds" % (sample_count, interval), "",
+                        "%8s %8s  %s" % ("self%", "total%", "function")]
+    for key, count in self_counts.most_common(top):
+        path, line, name = key
+        lines.append("%8.2f %8.2f  %s:%d(%s)" % (100.0 * count / sample_count, 100.0 * total_counts[key] / sample_count,
+                                                os.path.basename(path), line, name))
+    return "\n".join(lines) + "\n"
+
+
+def cprofile_report(filenames: Iterable[str], top: int) -> str:
+    """Return a table of the functions which took the most time in the given cProfile files."""
+    stream = io.StringIO()
+    stats = pstats.Stats(*filenames, stream=stream)
+    stats.strip_dirs().sort_stats(pstats.SortKey.TIME).print_stats(top)
+    return stream.getvalue()
+
+
+class ProcessProfiler:
+    """Run functions in other processes under a profiler and report on their profiles afterwards."""
+
+    def __init__(self, kind: str, directory: str):
+        """Initialise a new instance of the ProcessProfiler class."""
+        if kind not in PROFILE_SUFFIXES:
+            raise ValueError("profiler must be one of: %s" % ", ".join(PROFILE_SUFFIXES))
+        self.directory: str = directory
+        self.kind: str = kind
+        self.profiles: Dict[str, str] = dict()
+
+    def wrap(self, name: str, function: Callable, args: Tuple) -> Tuple[Callable, Tuple]:
+        """Return a function and arguments which call the given function under the profiler in another process."""
+        filename: str = os.path.join(self.directory, name + PROFILE_SUFFIXES[self.kind])
+        self.profiles[name] = filename
+        return run_profiled, (self.kind, filename, function) + tuple(args)
+
+    def report(self, top: int = DEFAULT_TOP_COUNT) -> str:
+        """Return the top functions of each process, and of all the processes together, as text."""
+        make_report = cprofile_report if self.kind == "cprofile" else sample_report
+        sections: List[str] = list()
+        written: List[str] = list()
+        for name, filename in self.profiles.items():
+            if os.path.exists(filename):
+                sections.append("==== %s (%s) ====\n\n%s" % (name, filename, make_report((filename,), top)))
+                written.append(filename)
+            else:
+                sections.append("==== %s: no profile was written ====\n" % name)
+        if len(written) > 1:
+            sections.append("==== all processes ====\n\n%s" % make_report(written, top))
+        return "\n".join(sections)
+
+    def write_report(self, top: int = DEFAULT_TOP_COUNT) -> str:
+        """Write the report to the profile directory and return the report file's name."""
+        filename: str = os.path.join(self.directory, "report.txt")
+        os.makedirs(self.directory, exist_ok=True)
+        with open(filename, "w") as report_file:
+            report_file.write(self.report(top))
+        return filename
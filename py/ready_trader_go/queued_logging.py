@@ -0,0 +1,153 @@
+# Copyright 2021 Optiver Asia Pacific Pty. Ltd.
+#
+# This file is part of Ready Trader Go.
+#
+#     Ready Trader Go is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU Affero General Public License
+#     as published by the Free Software Foundation, either version 3 of
+#     the License, or (at your option) any later version.
+#
+#     Ready Trader Go is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public
+#     License along with Ready Trader Go.  If not, see
+#     <https://www.gnu.org/licenses/>.
+import logging
+import logging.handlers
+import queue
+import time
+
+from typing import Dict, Optional, Tuple
+
+
+DEFAULT_BATCH_SIZE: int = 256
+LOG_FORMAT: str = "%(asctime)s [%(levelname)-7s] [%(name)s] %(message)s"
+
+
+class BatchingFileHandler(logging.FileHandler):
+    """A file handler which flushes after a batch of records rather than after every record."""
+
+    def __init__(self, filename: str, batch_size: int = DEFAULT_BATCH_SIZE):
+        """Initialise a new instance of the BatchingFileHandler class."""
+        logging.FileHandler.__init__(self, filename)
+        self.batch_size: int = batch_size
+        self.pending_count: int = 0
+
+    def close(self) -> None:
+        """Flush any pending records and close the file."""
+        self.flush_now()
+        logging.FileHandler.close(self)
+
+    def flush(self) -> None:
+        """Called after each record is written; flush only if a whole batch is pending."""
+        self.pending_count += 1
+        if self.pending_count >= self.batch_size:
+            self.flush_now()
+
+    def flush_now(self) -> None:
+        """Flush any pending records."""
+        self.pending_count = 0
+        logging.FileHandler.flush(self)
+
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """A queue listener which flushes its handlers whenever the queue is empty."""
+
+    def dequeue(self, block: bool) -> logging.LogRecord:
+        """Return the next record from the queue, flushing the handlers first if none is waiting."""
+        try:
+            return self.queue.get_nowait()
+        except queue.Empty:
+            for handler in self.handlers:
+                if isinstance(handler, BatchingFileHandler):
+                    handler.flush_now()
+            return self.queue.get(block)
+
+
+class DeferredFormatQueueHandler(logging.handlers.QueueHandler):
+    """A queue handler which leaves formatting to the listener's thread.
+
+    Only the message arguments are merged into the message, so that later
+    changes to the arguments do not change the record.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Merge the message arguments into the message."""
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class RateLimitFilter(logging.Filter):
+    """A filter which passes at most a given number of records per second from each logger.
+
+    When a logger's records are passed again, the first one says how many
+    were suppressed.
+    """
+
+    def __init__(self, rate: float):
+        """Initialise a new instance of the RateLimitFilter class."""
+        logging.Filter.__init__(self)
+        self.rate: float = rate
+        self.__buckets: Dict[str, Tuple[float, float, int]] = dict()  # tokens, last time and suppressed count
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Return True if the record should be logged."""
+        now: float = time.monotonic()
+        tokens, last_time, suppressed = self.__buckets.get(record.name, (self.rate, now, 0))
+        tokens = min(self.rate, tokens + (now - last_time) * self.rate)
+        if tokens < 1.0:
+            self.__buckets[record.name] = (tokens, now, suppressed + 1)
+            return False
+        if suppressed:
+            record.msg = "%s (%d earlier records suppressed)" % (record.getMessage(), suppressed)
+            record.args = None
+        self.__buckets[record.name] = (tokens - 1.0, now, 0)
+        return True
+
+
+class QueuedLogging:
+    """Logging to a file from a background thread.
+
+    Records are put on a queue by the logging thread and formatted and
+    written to the file by a listener thread, which flushes the file after
+    each batch of records or when it runs out of records to write. Once
+    stopped, records are written to the file directly.
+    """
+
+    def __init__(self, filename: str, level: int = logging.INFO, rate_limit: Optional[float] = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE):
+        """Initialise a new instance of the QueuedLogging class."""
+        self.file_handler: BatchingFileHandler = BatchingFileHandler(filename, batch_size)
+        self.file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        self.level: int = level
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.queue_handler: DeferredFormatQueueHandler = DeferredFormatQueueHandler(self.queue)
+        if rate_limit is not None:
+            self.queue_handler.addFilter(RateLimitFilter(rate_limit))
+
+        self.__listener: Optional[BatchingQueueListener] = None
+
+    def start(self) -> None:
+        """Send the records of every logger through the queue."""
+        root: logging.Logger = logging.getLogger()
+        root.setLevel(self.level)
+        root.addHandler(self.queue_handler)
+        self.__listener = BatchingQueueListener(self.queue, self.file_handler)
+        self.__listener.start()
+
+    def stop(self) -> None:
+        """Write any records in the queue and then write records to the file directly."""
+        if self.__listener is not None:
+            root: logging.Logger = logging.getLogger()
+            root.removeHandler(self.queue_handler)
+            self.__listener.stop()
+            self.__listener = None
+            self.file_handler.flush_now()
+            self.file_handler.batch_size = 1
+            for log_filter in self.queue_handler.filters:
+                self.file_handler.addFilter(log_filter)
+            root.addHandler(self.file_handler)
@@ -0,0 +1,171 @@
+# Copyright 2021 Optiver Asia Pacific Pty. Ltd.
+#
+# This file is part of Ready Trader Go.
+#
+#     Ready Trader Go is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU Affero General Public License
+#     as published by the Free Software Foundation, either version 3 of
+#     the License, or (at your option) any later version.
+#
+#     Ready Trader Go is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public
+#     License along with Ready Trader Go.  If not, see
+#     <https://www.gnu.org/licenses/>.
+import asyncio
+import contextlib
+import csv
+import functools
+import time
+
+from typing import Any, Dict, Optional
+
+from .account import ACCOUNT_FIELDS, AccountFactory, CompetitorAccount
+from .competitor import CompetitorManager
+from .execution import LOGIN_TIMER_RESOLUTION, ExecutionConnection
+from .journal import JournalRecordType, read_journal
+from .limiter import FrequencyLimiterFactory
+from .market_data_cache import market_data_events
+from .market_events import MarketEventsReader
+from .match_events import MatchEvents
+from .messages import HEADER_SIZE
+from .order_book import OrderBook
+from .timer import Timer
+from .timer_wheel import TimerWheel
+from .types import IController, Instrument
+from .unhedged_lots import UnhedgedLotsFactory, unhedged_lots_time_limit
+
+
+MATCH_EVENTS_HEADER = ("Time", "Competitor", "Operation", "OrderId", "Instrument", "Side", "Volume", "Price",
+                       "Lifespan", "Fee")
+
+
+class NullTransport(asyncio.Transport):
+    """A transport which discards everything written to it."""
+
+    def __init__(self):
+        """Initialise a new instance of the NullTransport class."""
+        super().__init__()
+        self.__closing: bool = False
+
+    def close(self) -> None:
+        """Close this transport."""
+        self.__closing = True
+
+    def is_closing(self) -> bool:
+        """Return True if this transport is closing or closed."""
+        return self.__closing
+
+    def write(self, data: Any) -> None:
+        """Discard the given data."""
+        pass
+
+
+class NullScoreBoard:
+    """A stand-in for the score board writer which discards scores."""
+
+    def breach(self, now: float, name: str, account: CompetitorAccount, etf_price: Optional[int],
+               future_price: Optional[int]) -> None:
+        """Discard a breach."""
+        pass
+
+    def disconnect(self, now: float, name: str, account: CompetitorAccount, etf_price: Optional[int],
+                   future_price: Optional[int]) -> None:
+        """Discard a disconnection."""
+        pass
+
+    def tick(self, now: float, name: str, account: CompetitorAccount, etf_price: Optional[int],
+             future_price: Optional[int], status: str) -> None:
+        """Discard a score."""
+        pass
+
+
+class RematchController(IController):
+    """A controller whose clock is set from the input journal."""
+
+    def __init__(self, market_events_reader: MarketEventsReader):
+        """Initialise a new instance of the RematchController class."""
+        self.market_events_reader: MarketEventsReader = market_events_reader
+        self.now: float = 0.0
+
+    def advance_time(self) -> float:
+        """Return the current time after accounting for events."""
+        self.market_events_reader.process_market_events(self.now)
+        return self.now
+
+
+def rematch(config: Dict[str, Any], journal_filename: str,
+            match_events_filename: Optional[str] = None) -> Dict[str, Any]:
+    """Rebuild a match from its market data and input journal, without any sockets, and return a summary.
+
+    The exchange simulator's own order books, competitors and execution
+    connections are driven by the journal's records as fast as possible. If
+    given, the match events are written to the named file.
+    """
+    engine = config["Engine"]
+    instrument = config["Instrument"]
+    limits = config["Limits"]
+
+    future_book = OrderBook(Instrument.FUTURE, 0.0, 0.0)
+    etf_book = OrderBook(Instrument.ETF, config["Fees"]["Maker"], config["Fees"]["Taker"])
+    match_events = MatchEvents()
+    market_events_reader = MarketEventsReader(engine["MarketDataFile"], None, future_book, etf_book, match_events)
+    controller = RematchController(market_events_reader)
+
+    tick_timer = Timer(engine["TickInterval"], engine["Speed"])
+    match_timers = TimerWheel(engine["TickInterval"], lambda: controller.now)
+    time_limit: float = unhedged_lots_time_limit(engine.get("UnhedgedLotsClock", "wall"), engine["Speed"])
+    tick_timer.timer_ticked.append(match_timers.on_timer_tick)
+    competitor_manager = CompetitorManager(limits, config["Traders"],
+                                           AccountFactory(instrument["EtfClamp"], instrument["TickSize"]), etf_book,
+                                           future_book, match_events, NullScoreBoard(), instrument["TickSize"],
+                                           tick_timer, UnhedgedLotsFactory(match_timers, time_limit))
+    competitor_manager.controller = controller
+
+    limiter_factory = FrequencyLimiterFactory(limits["MessageFrequencyInterval"] / engine["Speed"],
+                                              limits["MessageFrequencyLimit"])
+    login_timers = TimerWheel(LOGIN_TIMER_RESOLUTION, lambda: controller.now)
+    connections: Dict[int, ExecutionConnection] = dict()
+    record_count: int = 0
+
+    match_events_file = open(match_events_filename, "w", newline="") if match_events_filename else None
+    if match_events_file is not None:
+        csv_writer = csv.writer(match_events_file)
+        csv_writer.writerow(MATCH_EVENTS_HEADER)
+        match_events.event_occurred.append(csv_writer.writerow)
+
+    start_time: float = time.perf_counter()
+    with contextlib.closing(market_data_events(engine["MarketDataFile"])) as market_events:
+        market_events_reader.next_market_event = functools.partial(next, market_events, None)
+
+        for record_type, now, connection_id, typ, message in read_journal(journal_filename):
+            record_count += 1
+            controller.now = now
+            if record_type == JournalRecordType.MESSAGE:
+                connections[connection_id].on_message(typ, message, HEADER_SIZE, len(message))
+            elif record_type == JournalRecordType.MARKET_TICK:
+                market_events_reader.process_market_events(now)
+            elif record_type == JournalRecordType.TICK:
+                for callback in tick_timer.timer_ticked:
+                    callback(tick_timer, now, connection_id)
+            elif record_type == JournalRecordType.CONNECT:
+                connection = connections[connection_id] = ExecutionConnection(
+                    competitor_manager, limiter_factory.create(), controller, login_timers)
+                connection.connection_made(NullTransport())
+            elif record_type == JournalRecordType.DISCONNECT:
+                connection = connections.pop(connection_id)
+                connection.closing = True
+                connection.connection_lost(None)
+    elapsed: float = time.perf_counter() - start_time
+
+    if match_events_file is not None:
+        match_events_file.close()
+
+    return {"Records": record_count,
+            "MarketEvents": market_events_reader.processed_event_count(),
+            "Seconds": round(elapsed, 6),
+            "Teams": {c.name: dict({"status": c.status}, **{f: getattr(c.account, f) for f in ACCOUNT_FIELDS})
+                      for c in competitor_manager.get_competitors()}}
@@ -0,0 +1,254 @@
+# Copyright 2021 Optiver Asia Pacific Pty. Ltd.
+#
+# This file is part of Ready Trader Go.
+#
+#     Ready Trader Go is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU Affero General Public License
+#     as published by the Free Software Foundation, either version 3 of
+#     the License, or (at your option) any later version.
+#
+#     Ready Trader Go is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public
+#     License along with Ready Trader Go.  If not, see
+#     <https://www.gnu.org/licenses/>.
+import collections
+import csv
+import json
+import logging
+import pathlib
+
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .account import ACCOUNT_FIELDS, AccountFactory, CompetitorAccount
+from .match_events import MatchEvent, MatchEventOperation
+from .order_book import Order, OrderBook
+from .types import Instrument, Lifespan, Side
+
+
+CHECKPOINT_INTERVAL: float = 30.0  # seconds of match time between checkpoints
+INDEX_SUFFIX: str = ".idx"
+INDEX_VERSION: int = 2
+
+OPERATIONS: Dict[str, MatchEventOperation] = {name: op for op, name in MatchEvent.OPERATION_NAMES.items()}
+
+
+def iter_rows(path: pathlib.Path, offset: int = 0) -> Iterator[Tuple[int, List[str]]]:
+    """Yield the file offset and fields of each row of a match events file starting at the given offset."""
+    with path.open("rb") as match_events:
+        match_events.seek(offset)
+        if offset == 0:
+            offset += len(match_events.readline())  # Skip header
+        for line in match_events:
+            text: str = line.decode().rstrip("\r\n")
+            yield offset, text.split(",") if '"' not in text else next(csv.reader((text,)))
+            offset += len(line)
+
+
+class MatchState:
+    """The order books and accounts of a match as reconstructed from its match events."""
+
+    def __init__(self, account_factory: AccountFactory):
+        """Initialise a new instance of the MatchState class."""
+        self.accounts: Dict[str, CompetitorAccount] = collections.defaultdict(account_factory.create)
+        self.books: Tuple[OrderBook, ...] = tuple(OrderBook(i, 0.0, 0.0) for i in Instrument)
+        self.last_traded_prices: List[Optional[int]] = [None] * len(Instrument)
+        self.order_times: Dict[Order, float] = dict()
+        self.orders: Dict[str, Dict[int, Order]] = collections.defaultdict(dict)
+
+    def apply(self, row: List[str]) -> Optional[Tuple[MatchEventOperation, Tuple]]:
+        """Apply a row of a match events file and return the resulting event, if any."""
+        tm: float = float(row[0])
+        team: str = row[1]
+        operation: MatchEventOperation = OPERATIONS[row[2]]
+        order_id: int = int(row[3])
+
+        if operation == MatchEventOperation.INSERT:
+            order = Order(order_id, Instrument(int(row[4])), Lifespan[row[8]], Side[row[5]], int(row[7]), int(row[6]))
+            book = self.books[order.instrument]
+            book.insert(tm, order)
+            self.orders[team][order_id] = order
+            self.order_times[order] = tm
+            if book.last_traded_price() is not None:
+                self.last_traded_prices[order.instrument] = book.last_traded_price()
+            return operation, (team, tm, order_id, order.instrument, order.side, order.volume, order.price,
+                               order.lifespan)
+
+        if operation == MatchEventOperation.AMEND:
+            volume_delta = int(row[6])
+            order = self.orders[team].get(order_id)
+            if order is not None:
+                self.books[order.instrument].amend(tm, order, order.volume + volume_delta)
+                if order.remaining_volume == 0:
+                    del self.orders[team][order_id]
+                    del self.order_times[order]
+            return operation, (team, tm, order_id, volume_delta)
+
+        if operation == MatchEventOperation.CANCEL:
+            order = self.orders[team].pop(order_id, None)
+            if order:
+                self.books[order.instrument].cancel(tm, order)
+                del self.order_times[order]
+            return operation, (team, tm, order_id)
+
+        # Operation is hedge or trade
+        instrument = Instrument(int(row[4]))
+        side = Side[row[5]]
+        volume = int(row[6])
+        price = float(row[7]) if operation == MatchEventOperation.HEDGE else int(row[7])
+        fee = int(row[9]) if row[9] else 0
+        self.accounts[team].transact(instrument, side, price, volume, fee)
+        if operation == MatchEventOperation.TRADE:
+            if order_id in self.orders[team] and self.orders[team][order_id].remaining_volume == 0:
+                del self.order_times[self.orders[team].pop(order_id)]
+            return operation, (team, tm, order_id, side, volume, price, fee)
+        return None
+
+    def active_orders(self, team: str) -> Iterator[Tuple[float, Order]]:
+        """Yield the time of insertion and order for each of a team's orders with volume remaining."""
+        for order in self.orders[team].values():
+            if order.remaining_volume > 0:
+                yield self.order_times[order], order
+
+    def update_accounts(self) -> bool:
+        """Update the profit or loss of each account and return True if there are prices to do so."""
+        future_price: Optional[int] = self.last_traded_prices[Instrument.FUTURE]
+        etf_price: Optional[int] = self.last_traded_prices[Instrument.ETF]
+        if future_price is None or etf_price is None:
+            return False
+        for account in self.accounts.values():
+            account.update(future_price, etf_price)
+        return True
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return a representation of this state that can be stored as JSON."""
+        teams: Dict[int, str] = {id(o): team for team, orders in self.orders.items() for o in orders.values()}
+        resting: List[Order] = [o for book in self.books for o in book.resting_orders()]
+        resting_ids = set(id(o) for o in resting)
+        others = (o for orders in self.orders.values() for o in orders.values()
+                  if o.remaining_volume > 0 and id(o) not in resting_ids)
+        return {"Accounts": {team: [getattr(account, f) for f in ACCOUNT_FIELDS]
+                             for team, account in self.accounts.items()},
+                "LastTradedPrices": self.last_traded_prices,
+                "Orders": [[teams.get(id(o), ""), o.client_order_id, o.instrument, o.side, o.price, o.volume,
+                            o.remaining_volume, o.lifespan, id(o) in resting_ids, self.order_times[o]]
+                           for o in resting + list(others)]}
+
+    @staticmethod
+    def from_dict(state: Dict[str, Any], account_factory: AccountFactory) -> "MatchState":
+        """Return a new MatchState from the representation produced by to_dict."""
+        result = MatchState(account_factory)
+        for team, values in state["Accounts"].items():
+            account = result.accounts[team]
+            for field, value in zip(ACCOUNT_FIELDS, values):
+                setattr(account, field, value)
+        result.last_traded_prices[:] = state["LastTradedPrices"]
+        for team, order_id, instrument, side, price, volume, remaining, lifespan, is_resting, tm in state["Orders"]:
+            order = Order(order_id, Instrument(instrument), Lifespan(lifespan), Side(side), price, volume)
+            order.remaining_volume = remaining
+            result.orders[team][order_id] = order
+            result.order_times[order] = tm
+            if is_resting:
+                result.books[instrument].place(0.0, order)
+        return result
+
+
+class Checkpoint:
+    """The state of a match at a given time and the offset of the first match event after it."""
+    __slots__ = ("time", "offset", "state")
+
+    def __init__(self, time: float, offset: int, state: Dict[str, Any]):
+        """Initialise a new instance of the Checkpoint class."""
+        self.time: float = time
+        self.offset: int = offset
+        self.state: Dict[str, Any] = state
+
+
+class MatchEventsIndex:
+    """A sparse time index of a match events file."""
+
+    def __init__(self, end_time: float, teams: List[str], checkpoints: List[Checkpoint]):
+        """Initialise a new instance of the MatchEventsIndex class."""
+        self.checkpoints: List[Checkpoint] = checkpoints
+        self.end_time: float = end_time
+        self.teams: List[str] = teams
+
+    def checkpoint_before(self, when: float) -> Checkpoint:
+        """Return the latest checkpoint at or before the given time."""
+        result: Checkpoint = self.checkpoints[0]
+        for checkpoint in self.checkpoints:
+            if checkpoint.time > when:
+                break
+            result = checkpoint
+        return result
+
+    @staticmethod
+    def build(path: pathlib.Path, account_factory: AccountFactory,
+              interval: float = CHECKPOINT_INTERVAL) -> "MatchEventsIndex":
+        """Read a match events file from start to finish and return an index for it."""
+        state = MatchState(account_factory)
+        teams = set()
+        checkpoints: List[Checkpoint] = list()
+        next_checkpoint: float = 0.0
+        tm: float = 0.0
+
+        for offset, row in iter_rows(path):
+            tm = float(row[0])
+            if tm > next_checkpoint:
+                checkpoints.append(Checkpoint(next_checkpoint, offset, state.to_dict()))
+                while next_checkpoint < tm:
+                    next_checkpoint += interval
+            if row[1]:
+                teams.add(row[1])
+            state.apply(row)
+
+        if not checkpoints:
+            checkpoints.append(Checkpoint(0.0, 0, state.to_dict()))
+
+        return MatchEventsIndex(tm, sorted(teams), checkpoints)
+
+    @staticmethod
+    def load(filename: pathlib.Path, source: pathlib.Path) -> Optional["MatchEventsIndex"]:
+        """Return the index stored in a file if it is up to date with the source file, otherwise None."""
+        try:
+            with filename.open("r") as index_file:
+                index = json.load(index_file)
+        except (OSError, ValueError):
+            return None
+
+        stat = source.stat()
+        if (index.get("Version") != INDEX_VERSION or index.get("Size") != stat.st_size
+                or index.get("ModifiedTime") != stat.st_mtime_ns):
+            return None
+
+        return MatchEventsIndex(index["EndTime"], index["Teams"],
+                                [Checkpoint(c["Time"], c["Offset"], c["State"]) for c in index["Checkpoints"]])
+
+    def save(self, filename: pathlib.Path, source: pathlib.Path) -> None:
+        """Store this index in a file."""
+        stat = source.stat()
+        with filename.open("w") as index_file:
+            json.dump({"Version": INDEX_VERSION, "Size": stat.st_size, "ModifiedTime": stat.st_mtime_ns,
+                       "EndTime": self.end_time, "Teams": self.teams,
+                       "Checkpoints": [{"Time": c.time, "Offset": c.offset, "State": c.state}
+                                       for c in self.checkpoints]},
+                      index_file, separators=(",", ":"))
+
+
+def open_index(path: pathlib.Path, account_factory: AccountFactory,
+               interval: float = CHECKPOINT_INTERVAL) -> MatchEventsIndex:
+    """Return the index for a match events file, building and storing it next to the file if necessary."""
+    filename: pathlib.Path = path.with_name(path.name + INDEX_SUFFIX)
+    index: Optional[MatchEventsIndex] = MatchEventsIndex.load(filename, path)
+    if index is None:
+        logger = logging.getLogger("REPLAY")
+        logger.info("building index for match events file: filename=%s", path)
+        index = MatchEventsIndex.build(path, account_factory, interval)
+        try:
+            index.save(filename, path)
+        except OSError as e:
+            logger.warning("failed to save index for match events file: filename=%s", filename, exc_info=e)
+    return index
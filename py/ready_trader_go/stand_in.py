@@ -0,0 +1,134 @@
+# Copyright 2021 Optiver Asia Pacific Pty. Ltd.
+#
+# This file is part of Ready Trader Go.
+#
+#     Ready Trader Go is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU Affero General Public License
+#     as published by the Free Software Foundation, either version 3 of
+#     the License, or (at your option) any later version.
+#
+#     Ready Trader Go is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public
+#     License along with Ready Trader Go.  If not, see
+#     <https://www.gnu.org/licenses/>.
+import asyncio
+import logging
+
+from typing import Callable, Dict, List, Optional, Set
+
+from .messages import (AMEND_MESSAGE, AMEND_MESSAGE_SIZE, CANCEL_MESSAGE, CANCEL_MESSAGE_SIZE, HEADER,
+                       HEADER_SIZE, HEDGE_FILLED_MESSAGE, HEDGE_FILLED_MESSAGE_SIZE, HEDGE_MESSAGE, HEDGE_MESSAGE_SIZE,
+                       INSERT_MESSAGE, INSERT_MESSAGE_SIZE, LOGIN_MESSAGE, LOGIN_MESSAGE_SIZE, ORDER_STATUS_MESSAGE,
+                       ORDER_STATUS_MESSAGE_SIZE, Connection, MessageType)
+from .types import Lifespan
+
+
+class StandInExecutionConnection(Connection):
+    """An execution connection which acknowledges an auto-trader's orders without matching them.
+
+    Good-for-day orders rest until they are amended or cancelled, fill-and-
+    kill orders are cancelled straight away and hedge orders are filled in
+    full at their limit price.
+    """
+    __slots__ = ("__hedge_filled_message", "__order_status_message", "logger", "name", "orders", "server")
+
+    def __init__(self, server: "StandInExecutionServer"):
+        """Initialise a new instance of the StandInExecutionConnection class."""
+        Connection.__init__(self)
+
+        self.logger: logging.Logger = logging.getLogger("STAND_IN")
+        self.name: Optional[str] = None
+        self.orders: Dict[int, int] = dict()
+        self.server: StandInExecutionServer = server
+
+        self.__hedge_filled_message = bytearray(HEDGE_FILLED_MESSAGE_SIZE)
+        self.__order_status_message = bytearray(ORDER_STATUS_MESSAGE_SIZE)
+        HEADER.pack_into(self.__hedge_filled_message, 0, HEDGE_FILLED_MESSAGE_SIZE, MessageType.HEDGE_FILLED)
+        HEADER.pack_into(self.__order_status_message, 0, ORDER_STATUS_MESSAGE_SIZE, MessageType.ORDER_STATUS)
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        """Called when the connection is lost on the execution channel."""
+        self.server.connections.discard(self)
+        Connection.connection_lost(self, exc)
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        """Called when the execution connection is established."""
+        Connection.connection_made(self, transport)
+        self.server.connections.add(self)
+
+    def on_message(self, typ: int, data: bytes, start: int, length: int) -> None:
+        """Called when a message is received from the auto-trader."""
+        if typ == MessageType.INSERT_ORDER and length == INSERT_MESSAGE_SIZE:
+            client_order_id, _, _, volume, lifespan = INSERT_MESSAGE.unpack_from(data, start)
+            if lifespan == Lifespan.GOOD_FOR_DAY:
+                self.orders[client_order_id] = volume
+                self.send_order_status(client_order_id, volume)
+            else:
+                self.send_order_status(client_order_id, 0)
+        elif typ == MessageType.CANCEL_ORDER and length == CANCEL_MESSAGE_SIZE:
+            client_order_id, = CANCEL_MESSAGE.unpack_from(data, start)
+            if self.orders.pop(client_order_id, None) is not None:
+                self.send_order_status(client_order_id, 0)
+        elif typ == MessageType.AMEND_ORDER and length == AMEND_MESSAGE_SIZE:
+            client_order_id, volume = AMEND_MESSAGE.unpack_from(data, start)
+            if client_order_id in self.orders and volume < self.orders[client_order_id]:
+                if volume == 0:
+                    del self.orders[client_order_id]
+                else:
+                    self.orders[client_order_id] = volume
+                self.send_order_status(client_order_id, volume)
+        elif typ == MessageType.HEDGE_ORDER and length == HEDGE_MESSAGE_SIZE:
+            client_order_id, _, price, volume = HEDGE_MESSAGE.unpack_from(data, start)
+            HEDGE_FILLED_MESSAGE.pack_into(self.__hedge_filled_message, HEADER_SIZE, client_order_id, price, volume)
+            self._connection_transport.write(self.__hedge_filled_message)
+        elif typ == MessageType.LOGIN and length == LOGIN_MESSAGE_SIZE and self.name is None:
+            raw_name, _ = LOGIN_MESSAGE.unpack_from(data, start)
+            self.name = raw_name.rstrip(b"\x00").decode()
+            self.logger.info("fd=%d '%s' logged in", self._file_number, self.name)
+            self.server.on_login(self.name)
+        else:
+            self.logger.info("fd=%d received invalid message: length=%d type=%d", self._file_number, length, typ)
+            self.close()
+
+    def send_order_status(self, client_order_id: int, remaining_volume: int) -> None:
+        """Send an order status message, with no fills or fees, to the auto-trader."""
+        ORDER_STATUS_MESSAGE.pack_into(self.__order_status_message, HEADER_SIZE, client_order_id, 0,
+                                       remaining_volume, 0)
+        self._connection_transport.write(self.__order_status_message)
+
+
+class StandInExecutionServer:
+    """A server for stand-in execution connections, for testing auto-traders without an exchange simulator."""
+
+    def __init__(self, host: str, port: int):
+        """Initialise a new instance of the StandInExecutionServer class."""
+        self.connections: Set[StandInExecutionConnection] = set()
+        self.host: str = host
+        self.port: int = port
+
+        self.__logger: logging.Logger = logging.getLogger("STAND_IN")
+        self.__server: Optional[asyncio.AbstractServer] = None
+
+        # Signals
+        self.auto_trader_logged_in: List[Callable[[str], None]] = list()
+
+    def close(self) -> None:
+        """Close the server and any open connections."""
+        for connection in tuple(self.connections):
+            connection.close()
+        self.__server.close()
+
+    def on_login(self, name: str) -> None:
+        """Called when an auto-trader logs in."""
+        for callback in self.auto_trader_logged_in:
+            callback(name)
+
+    async def start(self) -> None:
+        """Start the server."""
+        self.__logger.info("starting stand-in execution server: host=%s port=%d", self.host, self.port)
+        self.__server = await asyncio.get_running_loop().create_server(lambda: StandInExecutionConnection(self),
+                                                                       self.host, self.port)
@@ -26,10 +26,17 @@ from typing import Any, Callable, List, Optional
 class Timer:
     """A timer."""
 
-    def __init__(self, tick_interval: float, speed: float):
-        """Initialise a new instance of the timer class."""
+    def __init__(self, tick_interval: float, speed: float, rng: Optional[random.Random] = None):
+        """Initialise a new instance of the timer class.
+
+        Tick jitter is drawn from the given random number generator, if any,
+        or from the random module otherwise.
+        """
+        self.skipped_tick_count: int = 0
+
         self.__event_loop: Optional[asyncio.AbstractEventLoop] = None
         self.__logger: logging.Logger = logging.getLogger("TIMER")
+        self.__random: Any = rng if rng is not None else random
         self.__speed: float = speed
         self.__start_time: float = 0.0
         self.__tick_timer_handle: Optional[asyncio.TimerHandle] = None
@@ -57,6 +64,7 @@ class Timer:
         if skipped_ticks:
             tick_time += self.__tick_interval * skipped_ticks
             tick_number += int(skipped_ticks)
+            self.skipped_tick_count += int(skipped_ticks)
 
         for callback in self.timer_ticked:
             callback(self, now, tick_number)
@@ -65,18 +73,19 @@ class Timer:
 
         # Generate random jitter, which can be +/- 20% of standard tick interval
         limit = self.__tick_interval * 0.2
-        jitter = random.uniform(-limit, +limit) / self.__speed
+        jitter = self.__random.uniform(-limit, +limit) / self.__speed
 
         self.__tick_timer_handle = self.__event_loop.call_at(self.__start_time + jitter + tick_time/self.__speed,
                                                              self.__on_timer_tick, tick_time, tick_number + 1)
 
-    def start(self) -> None:
-        """Start this timer."""
+    def start(self, elapsed: float = 0.0) -> None:
+        """Start this timer, optionally as though the given number of seconds had already passed."""
         self.__event_loop = asyncio.get_running_loop()
-        self.__start_time = time.monotonic()
+        self.__start_time = time.monotonic() - elapsed / self.__speed
         for callback in self.timer_started:
             callback(self, self.__start_time)
-        self.__on_timer_tick(0.0, 1)
+        ticks: int = int(elapsed // self.__tick_interval)
+        self.__on_timer_tick(ticks * self.__tick_interval, ticks + 1)
 
     def shutdown(self, now: float, reason: str) -> None:
         """Shut down this timer."""
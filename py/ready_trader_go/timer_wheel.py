@@ -0,0 +1,96 @@
+# Copyright 2021 Optiver Asia Pacific Pty. Ltd.
+#
+# This file is part of Ready Trader Go.
+#
+#     Ready Trader Go is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU Affero General Public License
+#     as published by the Free Software Foundation, either version 3 of
+#     the License, or (at your option) any later version.
+#
+#     Ready Trader Go is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU Affero General Public License for more details.
+#
+#     You should have received a copy of the GNU Affero General Public
+#     License along with Ready Trader Go.  If not, see
+#     <https://www.gnu.org/licenses/>.
+from typing import Any, Callable, Dict, List, Optional
+
+DEFAULT_SLOT_COUNT: int = 512
+
+
+class WheelTimer(object):
+    """A callback which a TimerWheel will call once a deadline has passed."""
+    __slots__ = ("callback", "deadline", "slot")
+
+    def __init__(self, deadline: float, callback: Callable[[], Any], slot: Dict["WheelTimer", None]):
+        """Initialise a new instance of the WheelTimer class."""
+        self.callback: Callable[[], Any] = callback
+        self.deadline: float = deadline
+        self.slot: Optional[Dict[WheelTimer, None]] = slot
+
+    def cancel(self) -> None:
+        """Cancel this timer if it has not already been called or cancelled."""
+        if self.slot is not None:
+            del self.slot[self]
+            self.slot = None
+
+    def cancelled(self) -> bool:
+        """Return True if this timer has been called or cancelled."""
+        return self.slot is None
+
+
+class TimerWheel(object):
+    """A hashed timer wheel which keeps many deadlines without using the event loop's timers.
+
+    Each timer is put into the slot for the interval of 'resolution' seconds
+    in which its deadline falls, so arming and cancelling a timer take
+    constant time. Calling advance visits only the slots for the intervals
+    which have passed and calls the callbacks whose deadlines have passed,
+    so a callback may be called up to 'resolution' seconds late. The clock
+    decides whether deadlines are measured in match time or wall time.
+    """
+
+    def __init__(self, resolution: float, clock: Callable[[], float], slot_count: int = DEFAULT_SLOT_COUNT):
+        """Initialise a new instance of the TimerWheel class."""
+        self.__clock: Callable[[], float] = clock
+        self.__current_interval: int = int(clock() // resolution)
+        self.__resolution: float = resolution
+        self.__slots: List[Dict[WheelTimer, None]] = [dict() for _ in range(slot_count)]
+
+    def advance(self, now: float) -> None:
+        """Call the callbacks of any timers whose deadlines are at or before the given time."""
+        slot_count: int = len(self.__slots)
+        last_interval: int = int(now // self.__resolution)
+        first_interval: int = max(self.__current_interval, last_interval - slot_count + 1)
+        self.__current_interval = last_interval
+
+        for interval in range(first_interval, last_interval + 1):
+            slot = self.__slots[interval % slot_count]
+            if slot:
+                for timer in [t for t in slot if t.deadline <= now]:
+                    if timer.slot is not None:
+                        del slot[timer]
+                        timer.slot = None
+                        timer.callback()
+
+    def empty(self) -> bool:
+        """Return True if no timers are waiting to be called."""
+        return not any(self.__slots)
+
+    def call_at(self, deadline: float, callback: Callable[[], Any]) -> WheelTimer:
+        """Arrange for the callback to be called once the clock reaches the given deadline."""
+        interval: int = max(int(deadline // self.__resolution), self.__current_interval)
+        slot = self.__slots[interval % len(self.__slots)]
+        timer = WheelTimer(deadline, callback, slot)
+        slot[timer] = None
+        return timer
+
+    def call_later(self, delay: float, callback: Callable[[], Any]) -> WheelTimer:
+        """Arrange for the callback to be called once the given number of seconds have passed."""
+        return self.call_at(self.__clock() + delay, callback)
+
+    def on_timer_tick(self, timer: Any, now: float, tick_number: int) -> None:
+        """Called on each tick of a timer to advance this wheel to the tick's time."""
+        self.advance(now)
@@ -17,6 +17,8 @@
 #     <https://www.gnu.org/licenses/>.
 import enum
 
+from typing import List
+
 
 class Instrument(enum.IntEnum):
     FUTURE = 0
@@ -44,6 +46,8 @@ class Lifespan(enum.IntEnum):
 
 
 class ICompetitor:
+    __slots__ = ()
+
     def disconnect(self, now: float) -> None:
         """Disconnect this competitor."""
         raise NotImplementedError()
@@ -73,10 +77,20 @@ class IController:
 
 
 class IExecutionConnection:
+    __slots__ = ()
+
     def close(self):
         """Close the execution channel."""
         raise NotImplementedError()
 
+    def message_times(self) -> List[float]:
+        """Return the times of the messages counted towards the message frequency limit."""
+        return []
+
+    def restore_message_times(self, message_times: List[float]) -> None:
+        """Restore the times of the messages counted towards the message frequency limit from a checkpoint."""
+        pass
+
     def send_error(self, client_order_id: int, error_message: bytes) -> None:
         """Send an error message to the auto-trader."""
         raise NotImplementedError()
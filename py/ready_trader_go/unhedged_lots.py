@@ -1,19 +1,34 @@
-import asyncio
-
 from typing import Any, Callable, Optional
 
+from .timer_wheel import TimerWheel, WheelTimer
+
 MAX_UNHEDGED_LOTS: int = 10
+UNHEDGED_LOTS_CLOCKS = ("match", "wall")
 UNHEDGED_LOTS_TIME_LIMIT: int = 60
 
 
+def unhedged_lots_time_limit(clock: str, speed: float) -> float:
+    """Return the unhedged lots time limit, in seconds of match time, when it is measured on the given clock.
+
+    On the wall clock (the default), the limit is sixty seconds of real time
+    whatever the speed of the match; on the match clock it is sixty seconds
+    of match time.
+    """
+    return UNHEDGED_LOTS_TIME_LIMIT if clock == "match" else UNHEDGED_LOTS_TIME_LIMIT * speed
+
+
 class UnhedgedLots:
     """Keep track of unhedged lots and call a callback if unhedged lots are held for too long."""
+    __slots__ = ("callback", "relative_position", "time_limit", "timer_handle", "timer_wheel")
 
-    def __init__(self, callback: Callable[[], Any]):
+    def __init__(self, callback: Callable[[], Any], timer_wheel: TimerWheel,
+                 time_limit: float = UNHEDGED_LOTS_TIME_LIMIT):
         """Initialise a new instance of the UnhedgedLots class."""
         self.callback: Callable[[], None] = callback
         self.relative_position: int = 0
-        self.timer_handle: Optional[asyncio.TimerHandle] = None
+        self.time_limit: float = time_limit
+        self.timer_handle: Optional[WheelTimer] = None
+        self.timer_wheel: TimerWheel = timer_wheel
 
     @property
     def unhedged_lot_count(self) -> int:
@@ -33,23 +48,40 @@ class UnhedgedLots:
                 self.timer_handle.cancel()
 
             if new_relative_position > MAX_UNHEDGED_LOTS >= self.relative_position:
-                self.timer_handle = asyncio.get_running_loop().call_later(UNHEDGED_LOTS_TIME_LIMIT, self.callback)
+                self.timer_handle = self.timer_wheel.call_later(self.time_limit, self.callback)
         elif delta < 0:
             if self.relative_position > MAX_UNHEDGED_LOTS >= new_relative_position:
                 self.timer_handle.cancel()
 
             if new_relative_position < -MAX_UNHEDGED_LOTS <= self.relative_position:
-                self.timer_handle = asyncio.get_running_loop().call_later(UNHEDGED_LOTS_TIME_LIMIT, self.callback)
+                self.timer_handle = self.timer_wheel.call_later(self.time_limit, self.callback)
 
         self.relative_position = new_relative_position
 
+    def restore(self, relative_position: int, deadline: Optional[float]) -> None:
+        """Restore the relative position and, if the time limit is running, its deadline from a checkpoint."""
+        self.relative_position = relative_position
+        if deadline is not None:
+            self.timer_handle = self.timer_wheel.call_at(deadline, self.callback)
+
+    def deadline(self) -> Optional[float]:
+        """Return the time by which unhedged lots must be hedged, or None if there are none."""
+        if self.timer_handle is None or self.timer_handle.cancelled():
+            return None
+        return self.timer_handle.deadline
+
 
 class UnhedgedLotsFactory:
     """A factory class for UnhedgedLots instances."""
 
-    def __init__(self):
-        """Initialise a new instance of the UnhedgedLotsFactory class."""
+    def __init__(self, timer_wheel: TimerWheel, time_limit: float = UNHEDGED_LOTS_TIME_LIMIT):
+        """Initialise a new instance of the UnhedgedLotsFactory class.
+
+        The time limit is in seconds of the timer wheel's clock.
+        """
+        self.time_limit: float = time_limit
+        self.timer_wheel: TimerWheel = timer_wheel
 
     def create(self, callback: Callable[[], Any]) -> UnhedgedLots:
         """Return a new instance of the UnhedgedLots class."""
-        return UnhedgedLots(callback)
+        return UnhedgedLots(callback, self.timer_wheel, self.time_limit)
@@ -16,6 +16,8 @@
 #     License along with Ready Trader Go.  If not, see
 #     <https://www.gnu.org/licenses/>.
 import argparse
+import asyncio
+import json
 import multiprocessing
 import pathlib
 import subprocess
@@ -24,6 +26,12 @@ import time
 import traceback
 
 import ready_trader_go.exchange
+import ready_trader_go.feed
+import ready_trader_go.loadgen
+import ready_trader_go.market_data_cache
+import ready_trader_go.market_data_generator
+import ready_trader_go.profiling
+import ready_trader_go.rematch
 import ready_trader_go.trader
 
 try:
@@ -31,6 +39,11 @@ try:
 except ImportError:
     hud_main = hud_replay = None
 
+try:
+    import ready_trader_go.analytics as analytics
+except ImportError:
+    analytics = None
+
 
 def no_heads_up_display() -> None:
     print("Cannot run the Ready Trader Go heads-up display. This could\n"
@@ -38,6 +51,100 @@ def no_heads_up_display() -> None:
           "see the README.md file for more information.", file=sys.stderr)
 
 
+def analyse(args) -> None:
+    """Analyse a match from a file or a running exchange simulator."""
+    if analytics is None:
+        print("Cannot analyse a match. This could mean that the NumPy module\n"
+              "has not been installed.", file=sys.stderr)
+        return
+
+    etf_clamp, tick_size = analytics.read_instrument_config()
+    if args.live:
+        series = asyncio.run(analytics.analyse_live(args.host, args.port, etf_clamp, tick_size))
+    else:
+        path: pathlib.Path = args.filename
+        if not path.is_file():
+            print("'%s' is not a regular file" % str(path), file=sys.stderr)
+            return
+        series = analytics.analyse_file(path, etf_clamp, tick_size)
+
+    if args.output is not None:
+        series.save(args.output)
+    json.dump(series.summary(), sys.stdout, indent=2)
+    print()
+
+
+def cache(args) -> None:
+    """Load market data files into, or remove them from, shared memory."""
+    for path in args.filename:
+        if not path.is_file():
+            print("'%s' is not a regular file" % str(path), file=sys.stderr)
+        elif args.remove:
+            if ready_trader_go.market_data_cache.remove_market_data(str(path)):
+                print("'%s': removed from shared memory" % str(path))
+            else:
+                print("'%s': not in shared memory" % str(path))
+        else:
+            block = ready_trader_go.market_data_cache.open_market_data(str(path))
+            print("'%s': %d market events in shared memory block '%s'" % (str(path), block.row_count, block.name))
+            block.close()
+
+
+def generate(args) -> None:
+    """Generate a synthetic market data file."""
+    try:
+        generator = ready_trader_go.market_data_generator.MarketDataGenerator(
+            args.duration, args.event_rate * args.scale, args.cancel_ratio, args.amend_ratio, args.fak_ratio,
+            args.volatility, args.correlation, args.depth, args.resting_orders, args.maximum_volume, args.start_price,
+            args.tick_size, args.seed)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return
+
+    if args.format == "binary":
+        count = ready_trader_go.market_data_generator.write_image(str(args.filename), generator.rows())
+    else:
+        count = ready_trader_go.market_data_generator.write_csv(str(args.filename), generator.rows())
+    print("'%s': %d market events over %g seconds" % (str(args.filename), count, args.duration))
+
+
+def loadgen(args) -> None:
+    """Measure the exchange simulator's throughput and latency with many pseudo-traders."""
+    with args.config.open() as config_file:
+        config = json.load(config_file)
+
+    if args.write_traders:
+        config["Traders"] = ready_trader_go.loadgen.traders_config(args.traders)
+        with args.config.open("w") as config_file:
+            json.dump(config, config_file, indent=2)
+        print("'%s': Traders configuration replaced with %d pseudo-traders" % (str(args.config), args.traders))
+        return
+
+    maximum_rate = ready_trader_go.loadgen.maximum_rate(config)
+    if args.rate is not None and args.rate > maximum_rate:
+        print("warning: a rate of %g messages per second exceeds the message frequency limit of %g"
+              % (args.rate, maximum_rate), file=sys.stderr)
+
+    summary = ready_trader_go.loadgen.main(config, args.traders, args.processes, args.rate, args.hedge_fraction,
+                                           args.duration)
+    json.dump(summary, sys.stdout, indent=2)
+    print()
+
+
+def rematch(args) -> None:
+    """Rebuild a match from its market data and input journal."""
+    path: pathlib.Path = args.journal
+    if not path.is_file():
+        print("'%s' is not a regular file" % str(path), file=sys.stderr)
+        return
+
+    with args.config.open() as config_file:
+        config = json.load(config_file)
+    output = str(args.output) if args.output is not None else None
+    json.dump(ready_trader_go.rematch.rematch(config, str(path), output), sys.stdout, indent=2)
+    print()
+
+
 def replay(args) -> None:
     """Replay a match from a file."""
     if hud_replay is None:
@@ -49,7 +156,7 @@ def replay(args) -> None:
         print("'%s' is not a regular file" % str(path), file=sys.stderr)
         return
 
-    hud_replay(path)
+    hud_replay(path, args.speed, args.start)
 
 
 def on_error(name: str, error: Exception) -> None:
@@ -57,40 +164,109 @@ def on_error(name: str, error: Exception) -> None:
     traceback.print_exception(type(error), error, error.__traceback__, file=sys.stderr)
 
 
-def run(args) -> None:
-    """Run a match."""
-    for auto_trader in args.autotrader:
+def check_auto_traders(auto_traders) -> bool:
+    """Return True if every auto-trader and its configuration file exist, otherwise print a message."""
+    for auto_trader in auto_traders:
         if auto_trader.suffix.lower == ".py" and auto_trader.parent != pathlib.Path("."):
             print("Python auto traders cannot be in a different directory: '%s'" % auto_trader, file=sys.stderr)
-            return
+            return False
         if not auto_trader.exists():
             print("'%s' does not exist" % auto_trader, file=sys.stderr)
-            return
+            return False
         if not auto_trader.with_suffix(".json").exists():
             print("'%s': configuration file is missing: %s" % (auto_trader, auto_trader.with_suffix(".json")))
-            return
+            return False
+    return True
+
+
+def start_auto_traders(pool, auto_traders, profiler=None) -> list:
+    """Start each auto-trader in the given process pool and return their asynchronous results.
+
+    If a profiler is given, Python auto-traders are run under it.
+    """
+    results = list()
+    for path in auto_traders:
+        if path.suffix.lower() == ".py":
+            function, arguments = ready_trader_go.trader.main, (path.with_suffix("").name,)
+            if profiler is not None:
+                function, arguments = profiler.wrap(path.with_suffix("").name, function, arguments)
+            results.append(pool.apply_async(function, arguments,
+                                            error_callback=lambda e: on_error("Auto-trader '%s'" % path, e)))
+        else:
+            resolved: pathlib.Path = path.resolve()
+            results.append(pool.apply_async(subprocess.run, ([resolved],), {"check": True, "cwd": resolved.parent},
+                                            error_callback=lambda e: on_error("Auto-trader '%s'" % path, e)))
+    return results
+
+
+def wait_for_profiles(results, timeout: float) -> None:
+    """Wait up to the given number of seconds for profiled processes to finish writing their profiles."""
+    deadline: float = time.monotonic() + timeout
+    for result in results:
+        result.wait(max(0.0, deadline - time.monotonic()))
+
+
+def play(args) -> None:
+    """Play a recorded information feed to auto-traders."""
+    path: pathlib.Path = args.feed
+    if not path.is_file():
+        print("'%s' is not a regular file" % str(path), file=sys.stderr)
+        return
+    if not check_auto_traders(args.autotrader):
+        return
+
+    with (multiprocessing.Manager() as manager,
+          multiprocessing.Pool(len(args.autotrader) + 1, maxtasksperchild=1) as pool):
+        player_ready = manager.Event()
+        player = pool.apply_async(ready_trader_go.feed.main, (str(path), args.speed, player_ready),
+                                  error_callback=lambda e: on_error("The feed player", e))
+
+        # Wait for the stand-in execution server to start accepting connections.
+        while not player_ready.wait(0.1):
+            if player.ready():
+                return
+
+        start_auto_traders(pool, args.autotrader)
+        count, duration = player.get()
+        print("played %d datagrams in %.3f seconds" % (count, duration))
 
-    with multiprocessing.Pool(len(args.autotrader) + 2, maxtasksperchild=1) as pool:
-        exchange = pool.apply_async(ready_trader_go.exchange.main,
-                                    error_callback=lambda e: on_error("The exchange simulator", e))
-
-        # Give the exchange simulator a chance to start up.
-        time.sleep(0.5)
-        
-        for path in args.autotrader:
-            if path.suffix.lower() == ".py":
-                pool.apply_async(ready_trader_go.trader.main, (path.with_suffix("").name,),
-                                 error_callback=lambda e: on_error("Auto-trader '%s'" % path, e))
-            else:
-                resolved: pathlib.Path = path.resolve()
-                pool.apply_async(subprocess.run, ([resolved],), {"check": True, "cwd": resolved.parent},
-                                 error_callback=lambda e: on_error("Auto-trader '%s'" % path, e))
+
+def run(args) -> None:
+    """Run a match."""
+    if not check_auto_traders(args.autotrader):
+        return
+
+    if args.resume_from is not None and not args.resume_from.is_file():
+        print("'%s' is not a regular file" % str(args.resume_from), file=sys.stderr)
+        return
+
+    with (multiprocessing.Manager() as manager,
+          multiprocessing.Pool(len(args.autotrader) + 2, maxtasksperchild=1) as pool):
+        exchange_ready = manager.Event()
+        resume_from = str(args.resume_from) if args.resume_from is not None else None
+        function, arguments = ready_trader_go.exchange.main, (exchange_ready, hud_main is not None, resume_from)
+        profiler = None
+        if args.profile is not None:
+            profiler = ready_trader_go.profiling.ProcessProfiler(args.profile, str(args.profile_dir))
+            function, arguments = profiler.wrap("exchange", function, arguments)
+        exchange = pool.apply_async(function, arguments, error_callback=lambda e: on_error("The exchange simulator", e))
+
+        # Wait for the exchange simulator to start accepting connections.
+        while not exchange_ready.wait(0.1):
+            if exchange.ready():
+                return
+
+        auto_traders = start_auto_traders(pool, args.autotrader, profiler)
 
         if hud_main is None:
             no_heads_up_display()
             exchange.get()
         else:
-            hud_main(args.host, args.port)
+            hud_main(args.host, args.port, args.snapshot_depth)
+
+        if profiler is not None:
+            wait_for_profiles([exchange] + auto_traders, ready_trader_go.profiling.PROFILE_WAIT_TIMEOUT)
+            print("profile report written to %s" % profiler.write_report(args.profile_top))
 
 
 def main() -> None:
@@ -107,6 +283,19 @@ def main() -> None:
                             help="host name of the exchange simulator (default '127.0.0.1')")
     run_parser.add_argument("--port", default=12347,
                             help="port number of the exchange simulator (default 12347)")
+    run_parser.add_argument("--snapshot-depth", default=0, type=int,
+                            help=("show order book snapshots of this many levels sent by the exchange simulator"
+                                  " instead of rebuilding the order books in the heads-up display (default 0)"))
+    run_parser.add_argument("--resume-from", type=pathlib.Path,
+                            help="resume the match from the state recorded in this checkpoint file")
+    run_parser.add_argument("--profile", choices=tuple(ready_trader_go.profiling.PROFILE_SUFFIXES),
+                            help=("profile the exchange simulator and Python auto-traders with cProfile or with a"
+                                  " sampling profiler, which barely affects the timing of the match"))
+    run_parser.add_argument("--profile-dir", default=pathlib.Path("profiles"), type=pathlib.Path,
+                            help="directory for the profile of each process and the report (default 'profiles')")
+    run_parser.add_argument("--profile-top", default=ready_trader_go.profiling.DEFAULT_TOP_COUNT, type=int,
+                            help="number of functions listed for each process in the report (default %d)"
+                                 % ready_trader_go.profiling.DEFAULT_TOP_COUNT)
     run_parser.add_argument("autotrader", nargs="*", type=pathlib.Path,
                             help="auto-traders to include in the match")
     run_parser.set_defaults(func=run)
@@ -118,8 +307,129 @@ def main() -> None:
     replay_parser.add_argument("filename", nargs="?", default=pathlib.Path("match_events.csv"),
                                help="name of the match events file to replay (default 'match_events.csv')",
                                type=pathlib.Path)
+    replay_parser.add_argument("--speed", default=1, type=int,
+                               help="replay speed as a multiple of real time, from 1 to 100 (default 1)")
+    replay_parser.add_argument("--start", default=0.0, type=float,
+                               help="time, in seconds, from which to start the replay (default 0)")
     replay_parser.set_defaults(func=replay)
 
+    analyse_parser = subparsers.add_parser("analyse", aliases=["an"],
+                                           description=("Analyse a Ready Trader Go match from a match events file"
+                                                        " or a running exchange simulator."),
+                                           help="analyse a Ready Trader Go match")
+    analyse_parser.add_argument("filename", nargs="?", default=pathlib.Path("match_events.csv"),
+                                help="name of the match events file to analyse (default 'match_events.csv')",
+                                type=pathlib.Path)
+    analyse_parser.add_argument("--live", action="store_true",
+                                help="analyse the match being run by the exchange simulator instead of a file")
+    analyse_parser.add_argument("--host", default="127.0.0.1",
+                                help="host name of the exchange simulator (default '127.0.0.1')")
+    analyse_parser.add_argument("--port", default=12347, type=int,
+                                help="port number of the exchange simulator (default 12347)")
+    analyse_parser.add_argument("--output", type=pathlib.Path,
+                                help="name of a NumPy .npz file in which to store the match's time series")
+    analyse_parser.set_defaults(func=analyse)
+
+    rematch_parser = subparsers.add_parser("rematch", aliases=["rm"],
+                                           description=("Rebuild a Ready Trader Go match from its market data and"
+                                                        " the input journal recorded by the exchange simulator."),
+                                           help="rebuild a Ready Trader Go match from an input journal")
+    rematch_parser.add_argument("journal", type=pathlib.Path,
+                                help="name of the input journal file")
+    rematch_parser.add_argument("--config", default=pathlib.Path("exchange.json"), type=pathlib.Path,
+                                help="name of the exchange simulator configuration file (default 'exchange.json')")
+    rematch_parser.add_argument("--output", type=pathlib.Path,
+                                help="name of a file in which to write the match events of the rebuilt match")
+    rematch_parser.set_defaults(func=rematch)
+
+    generate_parser = subparsers.add_parser("generate", aliases=["ge"],
+                                            description=("Generate a synthetic market data file from a random model of"
+                                                         " order flow, for testing and benchmarking."),
+                                            help="generate a synthetic market data file")
+    generate_parser.add_argument("filename", type=pathlib.Path,
+                                 help="name of the market data file to write")
+    generate_parser.add_argument("--format", choices=("csv", "binary"), default="csv",
+                                 help=("write a CSV file like the sample market data, or a binary market data image"
+                                       " which loads much faster (default csv)"))
+    generate_parser.add_argument("--duration", default=3600.0, type=float,
+                                 help="length of the market data in seconds (default %(default)g)")
+    generate_parser.add_argument("--event-rate", default=50.0, type=float,
+                                 help="average number of market events per second (default %(default)g)")
+    generate_parser.add_argument("--scale", default=1.0, type=float,
+                                 help="multiply the event rate by this, for example 10 or 100 (default %(default)g)")
+    generate_parser.add_argument("--cancel-ratio", default=0.3, type=float,
+                                 help="fraction of events which cancel a resting order (default %(default)g)")
+    generate_parser.add_argument("--amend-ratio", default=0.1, type=float,
+                                 help=("fraction of events which reduce the volume of a resting order"
+                                       " (default %(default)g)"))
+    generate_parser.add_argument("--fak-ratio", default=0.25, type=float,
+                                 help="fraction of new orders which are fill-and-kill orders (default %(default)g)")
+    generate_parser.add_argument("--volatility", default=0.005, type=float,
+                                 help="volatility of the fair value per square root of a second (default %(default)g)")
+    generate_parser.add_argument("--correlation", default=0.9, type=float,
+                                 help=("correlation between changes in the future and ETF fair values"
+                                       " (default %(default)g)"))
+    generate_parser.add_argument("--depth", default=5, type=int,
+                                 help="number of price levels either side of the fair value (default %(default)d)")
+    generate_parser.add_argument("--resting-orders", default=50, type=int,
+                                 help="most resting orders in each order book (default %(default)d)")
+    generate_parser.add_argument("--maximum-volume", default=50, type=int,
+                                 help="largest volume of a new order (default %(default)d)")
+    generate_parser.add_argument("--start-price", default=100.0, type=float,
+                                 help="starting fair value of both instruments (default %(default)g)")
+    generate_parser.add_argument("--tick-size", default=1.0, type=float,
+                                 help="tick size, which should match exchange.json (default %(default)g)")
+    generate_parser.add_argument("--seed", type=int,
+                                 help="seed for the random number generator, to generate the same data every time")
+    generate_parser.set_defaults(func=generate)
+
+    loadgen_parser = subparsers.add_parser("loadgen", aliases=["lg"],
+                                           description=("Measure the throughput and latency of a running exchange"
+                                                        " simulator by connecting many pseudo-traders which send a"
+                                                        " steady stream of orders."),
+                                           help="load test a running exchange simulator with pseudo-traders")
+    loadgen_parser.add_argument("--traders", default=100, type=int,
+                                help="number of pseudo-traders (default 100)")
+    loadgen_parser.add_argument("--processes", default=min(4, multiprocessing.cpu_count()), type=int,
+                                help="number of processes to run the pseudo-traders in (default %(default)d)")
+    loadgen_parser.add_argument("--rate", type=float,
+                                help=("messages per second sent by each pseudo-trader (default 80%% of the message"
+                                      " frequency limit)"))
+    loadgen_parser.add_argument("--hedge-fraction", default=ready_trader_go.loadgen.DEFAULT_HEDGE_FRACTION,
+                                type=float, help="fraction of messages which are hedge orders (default %(default)g)")
+    loadgen_parser.add_argument("--duration", default=ready_trader_go.loadgen.DEFAULT_DURATION, type=float,
+                                help="number of seconds to send messages for (default %(default)g)")
+    loadgen_parser.add_argument("--config", default=pathlib.Path("exchange.json"), type=pathlib.Path,
+                                help="name of the exchange simulator configuration file (default 'exchange.json')")
+    loadgen_parser.add_argument("--write-traders", action="store_true",
+                                help=("replace the Traders section of the configuration file with the pseudo-traders"
+                                      " and exit"))
+    loadgen_parser.set_defaults(func=loadgen)
+
+    play_parser = subparsers.add_parser("play", aliases=["pl"],
+                                        description=("Play an information feed recorded by the exchange simulator"
+                                                     " to auto-traders, whose orders are acknowledged but never"
+                                                     " traded."),
+                                        help="play a recorded information feed to auto-traders")
+    play_parser.add_argument("feed", type=pathlib.Path,
+                             help="name of the information feed file")
+    play_parser.add_argument("--speed", default=1.0, type=float,
+                             help=("playback speed as a multiple of match time, or 0 to play as fast as possible"
+                                   " (default 1)"))
+    play_parser.add_argument("autotrader", nargs="*", type=pathlib.Path,
+                             help="auto-traders to play the information feed to")
+    play_parser.set_defaults(func=play)
+
+    cache_parser = subparsers.add_parser("cache", aliases=["ca"],
+                                         description=("Load market data files into shared memory for use by"
+                                                      " exchange simulators with the SharedMarketData setting."),
+                                         help="load market data files into shared memory")
+    cache_parser.add_argument("filename", nargs="+", type=pathlib.Path,
+                              help="names of the market data files to load")
+    cache_parser.add_argument("--remove", action="store_true",
+                              help="remove the market data files from shared memory instead")
+    cache_parser.set_defaults(func=cache)
+
     args = parser.parse_args()
     args.func(args)
 